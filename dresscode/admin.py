@@ -1,40 +1,242 @@
-from django.contrib import admin
-from .models import Designer, Size, Style, Dress, DressRental, Profile, DressReview
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.text import Truncator
+from .deletion import bulk_delete, count_related
+from .models import (ArchivedDressRental, Designer, Size, Style, Dress, DressRecommendation, DressRental, Profile,
+                     DressReview, OutboundEmail, RentalEvent, User)
 
 
-class DressRentalInline(admin.TabularInline):
-    """Įterpiamas modelis, skirtas rodyti DressRental objektus DressAdmin puslapyje"""
+class BulkDeleteMixin:
+    """Trina įrašus per dresscode.deletion.bulk_delete: susiję įrašai trinami dalimis
+    tiesioginėmis užklausomis, o patvirtinimo puslapyje rodomi tik kiekvieno modelio įrašų skaičiai,
+    užuot įkėlus kiekvieną susijusį įrašą."""
+
+    max_listed_objects = 100
+
+    def delete_view(self, request, object_id, extra_context=None):
+        """ModelAdmin.delete_view visą trynimą vykdo vienoje transakcijoje, todėl bulk_delete dalys
+        taptų išsaugojimo taškais ir rašymo užraktas būtų laikomas iki pabaigos. Čia kiekviena
+        dalis patvirtinama atskirai, kaip ir komandoje bulk_delete."""
+        return self._delete_view(request, object_id, extra_context)
+
+    def delete_model(self, request, obj):
+        bulk_delete(type(obj)._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        bulk_delete(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        if not isinstance(objs, QuerySet):
+            objs = self.model._base_manager.filter(pk__in=[obj.pk for obj in objs])
+        counts = count_related(objs)
+        to_delete = [str(obj) for obj in objs[:self.max_listed_objects]]
+        if counts[self.model] > len(to_delete):
+            to_delete.append(f"... and {counts[self.model] - len(to_delete)} more")
+        model_count = {model._meta.verbose_name_plural: count for model, count in counts.items()}
+        perms_needed = set()
+        for model in counts:
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin is not None and not model_admin.has_delete_permission(request):
+                perms_needed.add(model._meta.verbose_name)
+        return to_delete, model_count, perms_needed, []
+
+
+class SharedSizeChoicesMixin:
+    """Dydžių pasirinkimai nuskaitomi vieną kartą visam formų rinkiniui,
+    o ne atskirai kiekvienai redaguojamai eilutei."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'size':
+            formfield.choices = [choice for choice in formfield.choices]
+        return formfield
+
+
+class LoadedRawIdWidget(ForeignKeyRawIdWidget):
+    """ForeignKeyRawIdWidget, kuris šalia lauko rodomą pavadinimą ima iš jau įkeltų objektų (objects),
+    o ne atskira užklausa kiekvienai formų rinkinio eilutei."""
+
+    objects = {}
+
+    def label_and_url_for_value(self, value):
+        obj = self.objects.get(str(value))
+        if obj is None:
+            return super().label_and_url_for_value(value)
+        opts = obj._meta
+        url = reverse(f'{self.admin_site.name}:{opts.app_label}_{opts.model_name}_change', args=(obj.pk,))
+        return Truncator(obj).words(14), url
+
+
+class RecentRentalsFormSet(BaseInlineFormSet):
+    """Inline formų rinkinys, kuris rodo tik naujausius suknelės nuomos įrašus,
+    kad suknelės puslapyje nebūtų įkeliama visa nuomų istorija."""
+
+    max_rows = 20
+
+    def get_queryset(self):
+        """Grąžina tik paskutinius max_rows nuomos įrašus."""
+        if not hasattr(self, '_recent_queryset'):
+            self._recent_queryset = super().get_queryset().order_by('-start_date', '-id')[:self.max_rows]
+        return self._recent_queryset
+
+    def add_fields(self, form, index):
+        """Vartotojo laukui perduoda su nuomomis jau įkeltus vartotojus."""
+        super().add_fields(form, index)
+        widget = form.fields['user'].widget
+        if isinstance(widget, LoadedRawIdWidget):
+            widget.objects = {str(rental.user_id): rental.user for rental in self.get_queryset()}
+
+
+class DressRentalInline(SharedSizeChoicesMixin, admin.TabularInline):
+    """Įterpiamas modelis, skirtas rodyti DressRental objektus DressAdmin puslapyje.
+    Rodomi tik naujausi įrašai, vartotojas pasirenkamas per paieškos langą."""
     model = DressRental
+    formset = RecentRentalsFormSet
     extra = 0
+    raw_id_fields = ('user',)
+    show_change_link = True
+
+    def get_queryset(self, request):
+        """Iš karto įkelia susijusias sukneles, vartotojus ir dydžius."""
+        return super().get_queryset(request).select_related('dress', 'user', 'size')
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'user':
+            kwargs['widget'] = LoadedRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
-class DressAdmin(admin.ModelAdmin):
+
+class DressAdmin(BulkDeleteMixin, admin.ModelAdmin):
     """Modelio Dress administravimo klasė.
 
             list_display: Laukeliai, kurie bus rodomi,
-            search_fields: Laukeliai, pagal kuriuos bus galima ieškoti,
+            list_select_related: Susiję modeliai, įkeliami ta pačia užklausa,
+            search_fields: Laukeliai, pagal kuriuos bus galima ieškoti (prekės kodas tiksliai,
+                           dizainerio pavardė pagal pradžią, kad būtų naudojami indeksai),
+            readonly_fields: Tik skaitomi laukeliai (suknelės su panašiomis nuotraukomis),
             inlines: Įterpiami modeliai (DressRentalInline)"""
 
     list_display = ('item_code', 'designer', 'display_sizes', 'display_styles')
-    search_fields = ('item_code', 'designer__surname')
+    list_select_related = ('designer',)
+    search_fields = ('=item_code', '^designer__surname')
+    readonly_fields = ('similar_photos',)
     inlines = (DressRentalInline,)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Iš anksto įkelia dydžius ir stilius, kad display_sizes ir display_styles
+        nevykdytų atskirų užklausų kiekvienai eilutei."""
+        return super().get_queryset(request).prefetch_related('sizes', 'styles')
+
+    @staticmethod
+    def find_similar(obj):
+        """Grąžina nuorodas į sukneles, kurių nuotraukos panašios į šios suknelės nuotrauką."""
+        if obj.pk is None or obj.photo_phash is None:
+            return ''
+        from .photohash import photo_index  # numpy neįkeliamas paleidžiant programą
+        similar = photo_index.similar(obj.photo_dhash, obj.photo_phash, exclude=obj.pk)
+        dresses = Dress.objects.only('item_code').in_bulk([dress_id for dress_id, _, _ in similar])
+        return format_html_join(', ', '<a href="{}">{}</a> ({} / {} bits)', (
+            (reverse('admin:dresscode_dress_change', args=(dress_id,)), dresses[dress_id], phash_distance,
+             dhash_distance)
+            for dress_id, phash_distance, dhash_distance in similar if dress_id in dresses))
+
+    @admin.display(description='Similar photos')
+    def similar_photos(self, obj):
+        return self.find_similar(obj) or '-'
+
+    def save_model(self, request, obj, form, change):
+        """Įspėja, jei įkelta nuotrauka panaši į kitos suknelės nuotrauką (galimas dublikatas)."""
+        super().save_model(request, obj, form, change)
+        if 'dresses_pics' in form.changed_data:
+            similar = self.find_similar(obj)
+            if similar:
+                self.message_user(request, format_html('The photo looks like a duplicate of {}.', similar),
+                                  messages.WARNING)
 
 
-class DressRentalAdmin(admin.ModelAdmin):
+class DressRentalAdmin(SharedSizeChoicesMixin, admin.ModelAdmin):
     """Modelio DressRental administravimo klasė.
 
             list_display: Laukeliai, kurie bus rodomi,
+            list_select_related: Susiję modeliai, įkeliami ta pačia užklausa,
             list_filter: Laukeliai, pagal kuriuos bus galima filtruoti,
             search_fields: Laukeliai, pagal kuriuos bus galima ieškoti,
-            list_editable: Laukeliai, kuriuos galima redaguoti"""
+            list_editable: Laukeliai, kuriuos galima redaguoti (vartotojas keičiamas tik
+                           įrašo puslapyje, kad sąraše nebūtų užklausos kiekvienai eilutei),
+            autocomplete_fields: Laukeliai, kurių reikšmės ieškomos, o ne įkeliamos visos"""
 
     list_display = ('dress', 'size', 'user', 'start_date', 'return_date', 'status')
-    list_filter = ('status', 'return_date', 'user')
-    search_fields = ('dress__item_code', 'dress__designer__surname')
-    list_editable = ('size', 'start_date', 'return_date', 'status', 'user')
+    list_select_related = ('dress', 'size', 'user')
+    list_filter = ('status', 'return_date')
+    search_fields = ('=dress__item_code', '^dress__designer__surname', '=user__username')
+    list_editable = ('size', 'start_date', 'return_date', 'status')
+    autocomplete_fields = ('dress', 'user')
+    show_full_result_count = False
 
 
-class DesignerAdmin(admin.ModelAdmin):
+class ArchivedDressRentalAdmin(admin.ModelAdmin):
+    """Modelio ArchivedDressRental administravimo klasė.
+
+            list_display: Laukeliai, kurie bus rodomi,
+            list_select_related: Susiję modeliai, įkeliami ta pačia užklausa,
+            raw_id_fields: Laukeliai, kurių reikšmės įvedamos ID, o ne įkeliamos visos"""
+
+    list_display = ('rental_id', 'dress', 'size', 'user', 'start_date', 'return_date', 'archived_at')
+    list_select_related = ('dress', 'size', 'user')
+    raw_id_fields = ('dress', 'user')
+    show_full_result_count = False
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Modelio OutboundEmail administravimo klasė.
+
+            list_display: Laukeliai, kurie bus rodomi,
+            list_filter: Laukeliai, pagal kuriuos bus galima filtruoti"""
+
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    show_full_result_count = False
+
+
+class DressRecommendationAdmin(admin.ModelAdmin):
+    """Modelio DressRecommendation administravimo klasė.
+
+            list_display: Laukeliai, kurie bus rodomi,
+            list_select_related: Susiję modeliai, įkeliami ta pačia užklausa,
+            raw_id_fields: Laukeliai, kurių reikšmės įvedamos ID, o ne įkeliamos visos"""
+
+    list_display = ('dress', 'rank', 'recommended', 'score', 'common_renters')
+    list_select_related = ('dress', 'recommended')
+    raw_id_fields = ('dress', 'recommended')
+    show_full_result_count = False
+
+
+class RentalEventAdmin(admin.ModelAdmin):
+    """Modelio RentalEvent administravimo klasė. Įvykių žurnalas tik peržiūrimas.
+
+            list_display: Laukeliai, kurie bus rodomi,
+            list_filter: Laukeliai, pagal kuriuos bus galima filtruoti,
+            search_fields: Laukeliai, pagal kuriuos bus galima ieškoti"""
+
+    list_display = ('rental_id', 'kind', 'previous_status', 'status', 'created_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('=rental_id',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class DesignerAdmin(BulkDeleteMixin, admin.ModelAdmin):
     """Modelio Designer administravimo klasė.
 
             list_display: Laukeliai, kurie bus rodomi"""
@@ -42,10 +244,20 @@ class DesignerAdmin(admin.ModelAdmin):
     list_display = ('name', 'surname')
 
 
+class DresscodeUserAdmin(BulkDeleteMixin, UserAdmin):
+    """Vartotojų administravimo klasė, kuri vartotojus (ir jų duomenis) trina dalimis."""
+
+
 admin.site.register(Designer, DesignerAdmin)
 admin.site.register(Size)
 admin.site.register(Style)
 admin.site.register(Dress, DressAdmin)
 admin.site.register(DressRental, DressRentalAdmin)
+admin.site.register(ArchivedDressRental, ArchivedDressRentalAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
+admin.site.register(DressRecommendation, DressRecommendationAdmin)
+admin.site.register(RentalEvent, RentalEventAdmin)
 admin.site.register(DressReview)
 admin.site.register(Profile)
+admin.site.unregister(User)
+admin.site.register(User, DresscodeUserAdmin)
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+
+WAITING, ADMITTED, REJECTED = 'waiting', 'admitted', 'rejected'
+
+
+class Waiter:
+    __slots__ = ('priority', 'state', 'wake')
+
+    def __init__(self, priority, wake):
+        self.priority = priority
+        self.state = WAITING
+        self.wake = wake
+
+
+def resolve_future(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Pool:
+    """ Endpoint'ų grupės lygiagretumo riba su ribota prioritetine laukimo eile.
+
+        Atributai:
+            limit (int): Kiek šios grupės užklausų vykdoma vienu metu.
+            queue (int): Kiek užklausų gali laukti laisvos vietos. Kai eilė pilna, naujai užklausai
+                vietą užleidžia žemesnio prioriteto laukianti užklausa, o jei tokios nėra, nauja atmetama.
+            timeout (float): Kiek sekundžių užklausa laukia eilėje, kol atmetama.
+
+        Būsena laikoma procese: kiekvienas darbinis procesas riboja savo gijas ar korutinas.
+        Tas pats objektas tinka ir gijoms (WSGI), ir asyncio korutinoms (ASGI): gija laukia
+        threading.Event, korutina - asyncio.Future, kurį vietą atlaisvinusi gija pažadina per
+        loop.call_soon_threadsafe, todėl laukianti korutina gijos neužima. Atlaisvinta vieta
+        atiduodama svarbiausiai (mažiausias prioriteto skaičius), o tarp lygių - seniausiai laukiančiai."""
+
+    def __init__(self, limit, queue=0, timeout=5.0):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.waiting = []  # heap: (prioritas, eilės numeris, Waiter); atmestieji išmetami juos ištraukus
+        self.counter = itertools.count()
+        self.service_time = 0.1  # slenkamasis vidurkis, sekundėmis
+
+    def __repr__(self):
+        return f"Pool(limit={self.limit}, queue={self.queue}, timeout={self.timeout})"
+
+    def enter(self, priority, wake):
+        """Grąžina ADMITTED, REJECTED arba eilėje laukiantį Waiter. Kviečiama su self.lock."""
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return ADMITTED
+        if self.queued >= self.queue:
+            live = [entry for entry in self.waiting if entry[2].state is WAITING]
+            worst = max(live, key=lambda entry: entry[:2], default=None)
+            if worst is None or worst[0] <= priority:
+                return REJECTED
+            worst[2].state = REJECTED
+            worst[2].wake()
+            self.queued -= 1
+        if len(self.waiting) > 2 * self.queue + 8:
+            self.waiting = [entry for entry in self.waiting if entry[2].state is WAITING]
+            heapq.heapify(self.waiting)
+        waiter = Waiter(priority, wake)
+        heapq.heappush(self.waiting, (priority, next(self.counter), waiter))
+        self.queued += 1
+        return waiter
+
+    def settle(self, waiter):
+        """Baigia laukimą (pažadinus ar pasibaigus laikui). Grąžina, ar vieta gauta."""
+        with self.lock:
+            if waiter.state is WAITING:
+                waiter.state = REJECTED
+                self.queued -= 1
+            return waiter.state is ADMITTED
+
+    def acquire(self, priority=1):
+        """Užima vietą iš gijos; jei reikia, laukia iki timeout. Grąžina, ar vieta gauta."""
+        event = threading.Event()
+        with self.lock:
+            waiter = self.enter(priority, event.set)
+        if not isinstance(waiter, Waiter):
+            return waiter is ADMITTED
+        event.wait(self.timeout)
+        return self.settle(waiter)
+
+    async def acquire_async(self, priority=1):
+        """Tas pats kaip acquire(), bet laukia neblokuodama įvykių ciklo."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            waiter = self.enter(priority, lambda: loop.call_soon_threadsafe(resolve_future, future))
+        if not isinstance(waiter, Waiter):
+            return waiter is ADMITTED
+        try:
+            await asyncio.wait((future,), timeout=self.timeout)
+        except asyncio.CancelledError:
+            if self.settle(waiter):
+                self.release()
+            raise
+        return self.settle(waiter)
+
+    def release(self, elapsed=None):
+        """Atlaisvina vietą: ji atiduodama kitai laukiančiai užklausai arba grąžinama.
+        elapsed - užklausos vykdymo trukmė, iš kurios vertinama Retry-After."""
+        with self.lock:
+            if elapsed is not None:
+                self.service_time += (elapsed - self.service_time) * 0.2
+            while self.waiting:
+                waiter = heapq.heappop(self.waiting)[2]
+                if waiter.state is WAITING:
+                    waiter.state = ADMITTED
+                    self.queued -= 1
+                    waiter.wake()
+                    return
+            self.active -= 1
+
+    def retry_after(self):
+        """Po kiek sekundžių verta bandyti vėl: per tiek laiko įprastai ištuštėja dabartinė eilė."""
+        return max(1, math.ceil(self.service_time * (self.active + self.queued + 1) / self.limit))
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from .models import Designer, Dress, Style
+from .versions import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    """Paieškos raktas palyginamas be tarpų kraštuose ir didžiųjų raidžių."""
+    return ' '.join((text or '').split()).casefold()
+
+
+class PrefixIndex:
+    """ Procese laikomas automatinio užbaigimo indeksas: surikiuotas raktų sąrašas ir
+        lygiagretus pasiūlymų sąrašas. Raktai, prasidedantys įvestu tekstu, randami su bisect,
+        todėl paieška trunka O(log n + rezultatų sk.) ir nesikreipia į duomenų bazę.
+
+        Indeksuojami suknelių prekės kodai, spalvos, stiliai ir dizainerių vardai bei pavardės.
+        Kelių žodžių pavadinimai indeksuojami ir nuo kiekvieno žodžio. Įrašų skaičius ribojamas
+        AUTOCOMPLETE_MAX_ENTRIES, todėl atminties kiekis nepriklauso nuo katalogo dydžio.
+
+        Pasikeitus katalogui (versija 'autocomplete' bendrame podėlyje), indeksas perkuriamas
+        foninėje gijoje, o kol jis kuriamas, užklausos aptarnaujamos iš senojo.
+
+        Metodai:
+            build(): Sukuria indeksą iš duomenų bazės.
+            suggest(): Grąžina pasiūlymus įvestam tekstui.
+            invalidate(): Pažymi visų procesų indeksus pasenusiais."""
+
+    version_name = 'autocomplete'
+    check_interval = 1.0
+
+    def __init__(self):
+        self.snapshot = None  # (raktai, pasiūlymai, versija)
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+        self.rebuilding = False
+
+    def _entries(self):
+        """Grąžina (indeksuojamas tekstas, (rūšis, pavadinimas, objekto ID)) poras.
+        Nuorodos sudaromos tik grąžinamiems pasiūlymams, todėl indekse jų nelaikome."""
+        for dress_id, item_code in Dress.objects.values_list('id', 'item_code').iterator():
+            yield item_code, ('dress', item_code, dress_id)
+        for color in Dress.objects.values_list('color', flat=True).distinct():
+            yield color, ('color', color, None)
+        for name in Style.objects.values_list('name', flat=True):
+            yield name, ('style', name, None)
+        for designer_id, name, surname in Designer.objects.values_list('id', 'name', 'surname'):
+            label = f"{name} {surname}"
+            yield label, ('designer', label, designer_id)
+
+    def build(self):
+        """Sukuria naują indeksą ir pakeičia juo senąjį vienu priskyrimu, todėl skaitytojams užrakto nereikia."""
+        version = get_version(self.version_name)
+        max_entries = settings.AUTOCOMPLETE_MAX_ENTRIES
+        rows = set()
+        for text, suggestion in self._entries():
+            words = normalize(text).split(' ')
+            for start in range(len(words)):
+                rows.add((' '.join(words[start:]), suggestion))
+            if len(rows) >= max_entries:
+                logger.warning('Autocomplete index truncated at %d entries', max_entries)
+                break
+        rows = sorted(rows)
+        self.snapshot = ([key for key, _ in rows], [suggestion for _, suggestion in rows], version)
+
+    def _rebuild_in_background(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception:
+                logger.exception('Autocomplete index rebuild failed')
+            finally:
+                self.rebuilding = False
+                connections.close_all()  # uždaroma tik šios gijos jungtis
+
+        threading.Thread(target=run, name='autocomplete-rebuild', daemon=True).start()
+
+    def current(self):
+        """Grąžina dabartinį indeksą. Pirmą kartą jis sukuriamas iškart, vėliau perkuriamas fone."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.lock:
+                if self.snapshot is None:
+                    self.build()
+            return self.snapshot
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            if get_version(self.version_name) != snapshot[2]:
+                self._rebuild_in_background()
+        return snapshot
+
+    def suggest(self, text, limit=10):
+        """Grąžina iki limit pasiūlymų [(rūšis, pavadinimas, objekto ID)], kurių kuris nors žodis prasideda tekstu."""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        keys, suggestions, _ = self.current()
+        results = []
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix) and len(results) < limit:
+            if suggestions[position] not in results:
+                results.append(suggestions[position])
+            position += 1
+        return results
+
+    @staticmethod
+    def url(kind, label, pk):
+        """Grąžina pasiūlymo nuorodą: suknelės ar dizainerio puslapį arba paieškos rezultatus."""
+        if kind == 'dress':
+            return reverse('dress-one', args=(pk,))
+        if kind == 'designer':
+            return reverse('designer-one', args=(pk,))
+        return f"{reverse('search')}?{urlencode({'search_text': label})}"
+
+    def invalidate(self):
+        bump_version(self.version_name)
+
+
+prefix_index = PrefixIndex()
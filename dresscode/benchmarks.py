@@ -0,0 +1,80 @@
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .models import Designer, Dress, DressRental, Profile, Size, Style, User
+
+
+@contextmanager
+def rolled_back():
+    """Vykdo bloką transakcijoje, kuri pabaigoje atšaukiama,
+    kad testiniai duomenys neliktų duomenų bazėje."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat=5):
+    """Iškviečia funkciją kelis kartus ir grąžina
+    vidutinę trukmę milisekundėmis bei užklausų skaičių per vieną kvietimą."""
+    func()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = time.perf_counter() - start
+    return elapsed * 1000 / repeat, len(queries) // repeat
+
+
+def make_client(user=None):
+    """Sukuria testinį klientą, kurio užklausos praeina ALLOWED_HOSTS patikrą."""
+    client = Client(HTTP_HOST='localhost')
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def seed_catalog(designers=10, dresses=200, prefix='bench'):
+    """Sukuria dizainerius, dydžius, stilius ir sukneles. Grąžina suknelių sąrašą."""
+    sizes = Size.objects.bulk_create([Size(name=name) for name in ('XS', 'S', 'M', 'L', 'XL')])
+    styles = Style.objects.bulk_create([Style(name=name) for name in ('Evening', 'Cocktail', 'Wedding')])
+    designer_objs = Designer.objects.bulk_create(
+        [Designer(name=f'{prefix}{i}', surname=f'Designer{i}') for i in range(designers)])
+    dress_objs = Dress.objects.bulk_create(
+        [Dress(item_code=f'{prefix[:2]}{i:07d}', color=('red', 'blue', 'black', 'white')[i % 4],
+               designer=designer_objs[i % designers]) for i in range(dresses)])
+    Dress.sizes.through.objects.bulk_create(
+        [Dress.sizes.through(dress_id=dress.id, size_id=size.id)
+         for i, dress in enumerate(dress_objs) for size in sizes[i % 3:i % 3 + 3]])
+    Dress.styles.through.objects.bulk_create(
+        [Dress.styles.through(dress_id=dress.id, style_id=styles[i % 3].id) for i, dress in enumerate(dress_objs)])
+    return dress_objs
+
+
+def seed_users(count, start=0, prefix='bench'):
+    """Sukuria vartotojus ir jų profilius be slaptažodžio maišos skaičiavimo ir be signalų."""
+    users = User.objects.bulk_create(
+        [User(username=f'{prefix}_user_{i}', email=f'{prefix}_user_{i}@example.com', password='!')
+         for i in range(start, start + count)], batch_size=2000)
+    Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=2000)
+    return users
+
+
+def seed_rentals(count, dresses, users, batch_size=5000):
+    """Sukuria nurodytą kiekį nuomos įrašų, paskirstytų tarp suknelių ir vartotojų."""
+    statuses = [status for status, _ in DressRental.RENTAL_STATUS]
+    today = date.today()
+    sizes = list(Size.objects.all()[:5])
+    for offset in range(0, count, batch_size):
+        DressRental.objects.bulk_create([
+            DressRental(dress=dresses[i % len(dresses)],
+                        user=users[(i * 7) % len(users)],
+                        size=sizes[i % len(sizes)],
+                        start_date=today - timedelta(days=i % 700 + 3),
+                        return_date=today - timedelta(days=i % 700),
+                        status=statuses[i % len(statuses)])
+            for i in range(offset, min(offset + batch_size, count))])
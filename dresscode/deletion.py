@@ -0,0 +1,156 @@
+from collections import Counter
+
+from django.db import models, router, transaction
+from django.db.models import FileField, ProtectedError
+
+from . import lookups
+from .autocomplete import prefix_index
+from .facets import facet_index
+from .models import Designer, Dress, DressReview, Size, Style
+from .prerender import dress_paths, prerenderer
+from .versions import bump_version
+
+
+def related_relations(model):
+    """Grąžina visus ryšius, kurie rodo į modelį (kaip Django Collector),
+    įskaitant ManyToMany tarpines lenteles."""
+    return [field for field in model._meta.get_fields(include_hidden=True)
+            if field.auto_created and not field.concrete and (field.one_to_one or field.one_to_many)]
+
+
+def related_queryset(relation, model, pks):
+    """Grąžina susijusio modelio įrašus, kurie rodo į nurodytus įrašus."""
+    field = relation.field
+    if field.target_field.primary_key:
+        values = pks
+    else:
+        values = model._base_manager.filter(pk__in=pks).values(field.target_field.attname)
+    return relation.related_model._base_manager.filter(**{f"{field.name}__in": values})
+
+
+def count_related(queryset):
+    """ Suskaičiuoja, kiek įrašų būtų ištrinta kiekviename modelyje. Grąžina Counter {modelis: kiekis}.
+
+        Skaičiuojama COUNT užklausomis su įdėtinėmis užklausomis, neįkeliant įrašų į atmintį."""
+    counts = Counter({queryset.model: queryset.count()})
+    for relation in related_relations(queryset.model):
+        if relation.field.remote_field.on_delete is not models.CASCADE:
+            continue
+        children = related_queryset(relation, queryset.model, queryset.values('pk'))
+        counts.update(count_related(children))
+    return +counts
+
+
+class BulkDeleter:
+    """ Ištrina įrašus su visais susijusiais įrašais dalimis, tiesioginėmis DELETE ir UPDATE užklausomis.
+
+        Django Collector įkelia kiekvieną susijusį įrašą ir siunčia signalus po vieną, todėl
+        didelio dizainerio ar vartotojo ištrynimas užtrunka ilgai ir užima daug atminties.
+        Čia ryšiai (on_delete) apeinami pagal modelių aprašus: CASCADE - vaikai ištrinami
+        iki chunk_size dydžio dalimis, SET_NULL - atnaujinami viena UPDATE užklausa, PROTECT ir
+        RESTRICT - sustabdo trynimą. Kiekviena dalis trinama atskiroje trumpoje transakcijoje.
+
+        Signalai nesiunčiami, todėl jų darbas atliekamas čia: pabaigoje vieną kartą
+        invaliduojami katalogo indeksai ir podėlis, o nebenaudojami paveikslėlių failai ištrinami
+        tik patvirtinus transakciją.
+
+        Atributai:
+            stats (Counter): Ištrintų ({modelis}) ir atnaujintų ({modelis} set null) įrašų skaičiai."""
+
+    def __init__(self, chunk_size=500, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = Counter()
+        self.reviewed_dresses = set()
+
+    def delete(self, queryset):
+        """Ištrina visus queryset įrašus. Grąžina stats."""
+        model = queryset.model
+        using = router.db_for_write(model)
+        pks = queryset.values_list('pk', flat=True)
+        while True:
+            chunk = list(model._base_manager.using(using).filter(pk__in=pks)
+                         .order_by('pk').values_list('pk', flat=True)[:self.chunk_size])
+            if not chunk:
+                break
+            self._delete_rows(model, chunk, using)
+        transaction.on_commit(self._invalidate, using=using)
+        return self.stats
+
+    def _delete_rows(self, model, pks, using):
+        """Pirma apdoroja vaikinius įrašus (jų dalys patvirtinamos atskirai), tada vienoje trumpoje
+        transakcijoje atnaujina SET_NULL ryšius ir ištrina pačius įrašus. Kiekvieno žingsnio metu
+        išorinių raktų ryšiai išlieka teisingi, todėl nutraukus trynimą duomenys lieka vientisi."""
+        relations = []
+        for relation in related_relations(model):
+            on_delete = relation.field.remote_field.on_delete
+            if on_delete is models.CASCADE:
+                child_pks = related_queryset(relation, model, pks).using(using).values_list('pk', flat=True)
+                while True:
+                    chunk = list(child_pks.order_by('pk')[:self.chunk_size])
+                    if not chunk:
+                        break
+                    self._delete_rows(relation.related_model, chunk, using)
+            elif on_delete is not models.DO_NOTHING:
+                relations.append((relation, on_delete))
+
+        with transaction.atomic(using=using):
+            for relation, on_delete in relations:
+                related = related_queryset(relation, model, pks).using(using)
+                if on_delete in (models.PROTECT, models.RESTRICT):
+                    protected = list(related[:10])
+                    if protected:
+                        raise ProtectedError(f"Cannot delete {model._meta.verbose_name}: referenced through "
+                                             f"{relation.related_model.__name__}.{relation.field.name}", protected)
+                elif on_delete is models.SET_NULL:
+                    if relation.related_model is DressReview:
+                        self.reviewed_dresses.update(related.values_list('dress_id', flat=True).distinct())
+                    updated = related.update(**{relation.field.name: None})
+                    self.stats[f"{relation.related_model._meta.label} (set null)"] += updated
+                else:
+                    raise ValueError(f"Unsupported on_delete for "
+                                     f"{relation.related_model.__name__}.{relation.field.name}")
+
+            rows = model._base_manager.using(using).filter(pk__in=pks)
+            if model is DressReview:
+                self.reviewed_dresses.update(rows.values_list('dress_id', flat=True).distinct())
+            files = [(field, name)
+                     for field in model._meta.concrete_fields if isinstance(field, FileField)
+                     for name in rows.exclude(**{field.attname: ''}).exclude(**{f"{field.attname}__isnull": True})
+                     .values_list(field.attname, flat=True)]
+            self.stats[model._meta.label] += rows._raw_delete(using)
+            if files:
+                transaction.on_commit(lambda: delete_files(files), using=using)
+        if self.progress:
+            self.progress(self.stats)
+
+    def _invalidate(self):
+        """Tai, ką kitu atveju atliktų post_delete signalai, atliekama vieną kartą."""
+        deleted = {label for label, count in self.stats.items() if count}
+        if deleted & {Dress._meta.label, Designer._meta.label, Style._meta.label, Size._meta.label}:
+            facet_index.invalidate()
+            prefix_index.invalidate()
+            bump_version('catalog')
+            bump_version('recommendations')
+            bump_version('photohash')
+            prerenderer.invalidate_all()
+        if Size._meta.label in deleted:
+            lookups.sizes.invalidate()
+        if Style._meta.label in deleted:
+            lookups.styles.invalidate()
+        for dress_id in self.reviewed_dresses:
+            bump_version(f'reviews:{dress_id}')
+        prerenderer.invalidate(dress_paths(self.reviewed_dresses))
+
+
+def delete_files(files):
+    """Ištrina failus, į kuriuos nebenurodo joks įrašas. Numatytosios laukų reikšmės paliekamos."""
+    for field, name in files:
+        if name == field.default:
+            continue
+        field.storage.delete(name)  # ContentHashStorage pati patikrina, ar failo nenaudoja kiti įrašai
+
+
+def bulk_delete(queryset, chunk_size=500, progress=None):
+    """Ištrina queryset įrašus su susijusiais įrašais dalimis (žr. BulkDeleter). Grąžina statistiką."""
+    return BulkDeleter(chunk_size, progress).delete(queryset)
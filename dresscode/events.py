@@ -0,0 +1,81 @@
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import RentalEvent
+
+
+class EventBatch:
+    """Vienos transakcijos įvykiai. Įrašomi viena bulk_create užklausa, kai transakcija patvirtinama."""
+
+    def __init__(self, using):
+        self.using = using
+        self.pending = []  # silpnos nuorodos į PendingEvent; atšaukto savepoint įvykiai išnyksta patys
+        self.written = False
+
+    def write(self):
+        if self.written:
+            return
+        self.written = True
+        events = [pending.event for pending in (ref() for ref in self.pending) if pending is not None]
+        RentalEvent.objects.using(self.using).bulk_create(events, batch_size=500)
+
+
+class PendingEvent:
+    """transaction.on_commit callback'as vienam įvykiui. Pirmas įvykdytas įrašo visą paketą."""
+
+    __slots__ = ('batch', 'event', '__weakref__')
+
+    def __init__(self, batch, event):
+        self.batch = batch
+        self.event = event
+
+    def __call__(self):
+        self.batch.write()
+
+
+class EventWriter:
+    """ Kaupia nuomos įvykius ir įrašo juos paketais, po vieną kiekvienai transakcijai.
+
+        Kiekvienas įvykis registruojamas transaction.on_commit kaip PendingEvent, o paketas
+        (EventBatch) laiko tik silpnas nuorodas į juos. Atšaukus savepoint ar transakciją, Django
+        pamiršta jame užregistruotus callback'us ir jų įvykiai iš paketo dingsta, todėl atšaukti
+        pakeitimai į žurnalą nepatenka. Patvirtinus transakciją, pirmas callback'as viena užklausa
+        įrašo visus likusius įvykius. Paketas saugomas pagal jungtį (WeakValueDictionary) ir išnyksta
+        kartu su paskutiniu savo įvykiu. Be transakcijos (autocommit) įvykis įrašomas iškart."""
+
+    def __init__(self):
+        self.batches = weakref.WeakValueDictionary()
+
+    def add(self, event, using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        if not connection.in_atomic_block:
+            RentalEvent.objects.using(using).bulk_create([event])
+            return
+        batch = self.batches.get(id(connection))
+        if batch is None or batch.written:
+            batch = self.batches[id(connection)] = EventBatch(using)
+        pending = PendingEvent(batch, event)
+        batch.pending.append(weakref.ref(pending))
+        transaction.on_commit(pending, using=using)
+
+
+event_writer = EventWriter()
+
+
+def remember_status(instance):
+    """Įsimena iš duomenų bazės įkeltą statusą. Jei statusas neįkeltas (only/defer), jis nenuskaitomas."""
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+def record_rental_save(instance, created, using, update_fields=None):
+    """Įrašo 'created' įvykį naujai nuomai arba 'status' įvykį, jei statusas pasikeitė.
+    Jei statusas nebuvo įkeltas, ankstesnis statusas nežinomas ir įvykis neįrašomas."""
+    previous = getattr(instance, '_loaded_status', None)
+    if created:
+        event_writer.add(RentalEvent(rental_id=instance.pk, kind='created', status=instance.status), using)
+    elif (previous is not None and instance.status != previous
+          and (update_fields is None or 'status' in update_fields)):
+        event_writer.add(RentalEvent(rental_id=instance.pk, kind='status', status=instance.status,
+                                     previous_status=previous), using)
+    remember_status(instance)
@@ -0,0 +1,269 @@
+import threading
+from collections import defaultdict
+
+from . import lookups
+from .models import Designer, Dress
+from .versions import bump_version, get_version
+
+FACETS = ('size', 'style', 'designer', 'color')
+FACET_LABELS = {'size': 'Size', 'style': 'Style', 'designer': 'Designer', 'color': 'Color'}
+
+
+def normalize_color(color):
+    """Spalvos reikšmė palyginama be tarpų ir didžiųjų raidžių."""
+    return (color or '').strip().lower()
+
+
+def iter_positions(bits):
+    """Grąžina bitų aibėje pažymėtas pozicijas didėjimo tvarka."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index * 8
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield base + bit
+
+
+class FacetResult:
+    """ Filtruotas suknelių sąrašas, kurį galima perduoti Paginator klasei.
+
+        Suknelės laikomos bitų aibėje (bitas - suknelės pozicija indekse, dress_ids - pozicijų ID),
+        o iš duomenų bazės nuskaitomos tik rodomo puslapio suknelės."""
+
+    model = Dress
+
+    def __init__(self, bits, dress_ids):
+        self.bits = bits
+        self.dress_ids = dress_ids
+
+    def count(self):
+        return self.bits.bit_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        ids = []
+        for index, position in enumerate(iter_positions(self.bits)):
+            if index >= stop:
+                break
+            if index >= start and self.dress_ids[position] is not None:
+                ids.append(self.dress_ids[position])
+        dresses = Dress.objects.select_related('designer').defer('description', 'description_html').in_bulk(ids)
+        return [dresses[dress_id] for dress_id in ids if dress_id in dresses]
+
+
+class FacetIndex:
+    """ Atvirkštinis indeksas: kiekvienai filtro reikšmei (dydžiui, stiliui, dizaineriui, spalvai)
+        saugoma suknelių bitų aibė (Python int). Bitai numeruojami tankiai: n-tasis bitas reiškia
+        suknelę dress_ids[n], o positions atvirkščiai susieja ID su bitu, todėl aibių dydis priklauso
+        nuo suknelių skaičiaus, o ne nuo didžiausio ID. Pozicijos paskirstomos ID didėjimo tvarka;
+        kai ištrintų suknelių skylių pasidaro daug arba nauja suknelė turi mažesnį ID nei esamos,
+        indeksas perkuriamas.
+
+        Filtruotas sąrašas ir filtrų reikšmių skaičiai apskaičiuojami bitų aibių sankirta atmintyje.
+        Indeksas kuriamas vieną kartą procese, o vėliau atnaujinamas po vieną suknelę.
+        Jei kitas procesas pakeitė katalogą (pasikeitė bendra versija), indeksas perkuriamas.
+
+        Metodai:
+            build(): Sukuria indeksą iš duomenų bazės.
+            update_dress(): Atnaujina vienos suknelės reikšmes indekse.
+            remove_dress(): Pašalina suknelę iš indekso.
+            invalidate(): Pažymi indeksą pasenusiu.
+            select(): Grąžina filtrus atitinkančias sukneles (FacetResult).
+            counts(): Grąžina kiekvienos filtro reikšmės suknelių skaičių."""
+
+    version_name = 'facets'
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.postings = {facet: defaultdict(int) for facet in FACETS}
+        self.dress_values = {}
+        self.positions = {}
+        self.dress_ids = []
+        self.last_id = 0
+        self.unordered = False
+        self.all_ids = 0
+
+    def build(self):
+        """Sukuria indeksą iš duomenų bazės keturiomis užklausomis."""
+        with self.lock:
+            version = get_version(self.version_name)
+            values = defaultdict(lambda: {facet: set() for facet in FACETS})
+            for dress_id, color, designer_id in Dress.objects.values_list('id', 'color', 'designer_id').iterator():
+                values[dress_id]['color'].add(normalize_color(color))
+                values[dress_id]['designer'].add(designer_id)
+            for dress_id, size_id in Dress.sizes.through.objects.values_list('dress_id', 'size_id').iterator():
+                if dress_id in values:
+                    values[dress_id]['size'].add(size_id)
+            for dress_id, style_id in Dress.styles.through.objects.values_list('dress_id', 'style_id').iterator():
+                if dress_id in values:
+                    values[dress_id]['style'].add(style_id)
+
+            self.postings = {facet: defaultdict(int) for facet in FACETS}
+            self.dress_values = {}
+            self.positions = {}
+            self.dress_ids = []
+            self.last_id = 0
+            self.unordered = False
+            self.all_ids = 0
+            for dress_id in sorted(values):
+                self._add(dress_id, values[dress_id])
+            self.version = version
+
+    def ensure_current(self):
+        """Perkuria indeksą, jei jis dar nesukurtas arba kitas procesas pakeitė katalogą."""
+        if self.version != get_version(self.version_name):
+            self.build()
+
+    def _add(self, dress_id, dress_values):
+        position = self.positions.get(dress_id)
+        if position is None:
+            if dress_id < self.last_id:
+                self.unordered = True
+            self.last_id = dress_id
+            position = self.positions[dress_id] = len(self.dress_ids)
+            self.dress_ids.append(dress_id)
+        bit = 1 << position
+        self.all_ids |= bit
+        self.dress_values[dress_id] = dress_values
+        for facet, facet_values in dress_values.items():
+            for value in facet_values:
+                self.postings[facet][value] |= bit
+
+    def _discard(self, dress_id):
+        dress_values = self.dress_values.pop(dress_id, None)
+        if dress_values is None:
+            return
+        mask = ~(1 << self.positions[dress_id])
+        self.all_ids &= mask
+        for facet, facet_values in dress_values.items():
+            for value in facet_values:
+                bits = self.postings[facet][value] & mask
+                if bits:
+                    self.postings[facet][value] = bits
+                else:
+                    del self.postings[facet][value]
+
+    def _release(self, dress_id):
+        """Atlaisvina ištrintos suknelės poziciją; ji lieka tuščia iki indekso perkūrimo."""
+        position = self.positions.pop(dress_id, None)
+        if position is not None:
+            self.dress_ids[position] = None
+
+    def _apply(self, change):
+        """Pritaiko pakeitimą vietiniam indeksui ir padidina bendrą versiją.
+        Jei tarp paskutinio atnaujinimo ir šio versiją pakeitė kitas procesas,
+        indeksas pažymimas pasenusiu ir bus perkurtas kitos užklausos metu."""
+        with self.lock:
+            new_version = bump_version(self.version_name)
+            if self.version is not None and new_version == self.version + 1:
+                change()
+                self.version = None if self.needs_rebuild() else new_version
+            else:
+                self.version = None
+
+    def needs_rebuild(self):
+        """Ar pozicijos nebeatitinka ID tvarkos arba daugiau nei pusė jų - ištrintų suknelių skylės."""
+        return self.unordered or len(self.dress_ids) > 2 * len(self.positions) + 64
+
+    def update_dress(self, dress_id):
+        """Iš naujo nuskaito vienos suknelės reikšmes ir atnaujina jos bitus."""
+        def change():
+            self._discard(dress_id)
+            row = Dress.objects.filter(pk=dress_id).values_list('color', 'designer_id').first()
+            if row is None:
+                self._release(dress_id)
+                return
+            self._add(dress_id, {
+                'color': {normalize_color(row[0])},
+                'designer': {row[1]},
+                'size': set(Dress.sizes.through.objects.filter(dress_id=dress_id).values_list('size_id', flat=True)),
+                'style': set(Dress.styles.through.objects.filter(dress_id=dress_id).values_list('style_id', flat=True)),
+            })
+        self._apply(change)
+
+    def remove_dress(self, dress_id):
+        """Pašalina ištrintą suknelę iš visų bitų aibių."""
+        def change():
+            self._discard(dress_id)
+            self._release(dress_id)
+        self._apply(change)
+
+    def invalidate(self):
+        """Pažymi indeksą pasenusiu visuose procesuose, kai pakeitimo negalima pritaikyti po vieną suknelę."""
+        with self.lock:
+            bump_version(self.version_name)
+            self.version = None
+
+    def _union(self, facet, values):
+        bits = 0
+        for value in values:
+            bits |= self.postings[facet].get(value, 0)
+        return bits
+
+    def select(self, filters):
+        """Grąžina filtrus atitinkančias sukneles (FacetResult) ID didėjimo tvarka.
+        Vieno filtro reikšmės jungiamos ARBA, skirtingi filtrai - IR."""
+        with self.lock:
+            self.ensure_current()
+            bits = self.all_ids
+            for facet, values in filters.items():
+                if values:
+                    bits &= self._union(facet, values)
+            return FacetResult(bits, self.dress_ids)
+
+    def counts(self, filters):
+        """Grąžina {filtras: {reikšmė: suknelių skaičius}}.
+        Kiekvieno filtro skaičiai apskaičiuojami pritaikius visus kitus filtrus,
+        todėl vartotojas mato, kiek suknelių bus, pažymėjęs dar vieną reikšmę."""
+        with self.lock:
+            self.ensure_current()
+            unions = {facet: self._union(facet, values) for facet, values in filters.items() if values}
+            result = {}
+            for facet in FACETS:
+                base = self.all_ids
+                for other, bits in unions.items():
+                    if other != facet:
+                        base &= bits
+                result[facet] = {value: (bits & base).bit_count() for value, bits in self.postings[facet].items()}
+            return result
+
+
+facet_index = FacetIndex()
+
+
+def parse_filters(query):
+    """Iš užklausos parametrų (size, style, designer, color) sudaro filtrų žodyną."""
+    filters = {}
+    for facet in ('size', 'style', 'designer'):
+        filters[facet] = {int(value) for value in query.getlist(facet) if value.isdigit()}
+    filters['color'] = {normalize_color(value) for value in query.getlist('color') if value.strip()}
+    return filters
+
+
+def facet_options(filters, counts):
+    """Paruošia filtrų reikšmes šablonui: pavadinimą, suknelių skaičių ir ar reikšmė pažymėta."""
+    labels = {
+        'size': {size.pk: size.name for size in lookups.sizes.all()},
+        'style': {style.pk: style.name for style in lookups.styles.all()},
+        'designer': {designer.id: str(designer) for designer in Designer.objects.all()},
+        'color': {value: value for value in counts['color']},
+    }
+    options = []
+    for facet in FACETS:
+        values = [{'value': value,
+                   'label': labels[facet].get(value, value),
+                   'count': count,
+                   'selected': value in filters[facet]}
+                  for value, count in counts[facet].items()]
+        values.sort(key=lambda item: str(item['label']))
+        options.append({'name': facet, 'label': FACET_LABELS[facet], 'values': values})
+    return options
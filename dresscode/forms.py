@@ -1,6 +1,10 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
 
-from .models import DressReview, Profile, User, DressRental, Size
+from . import lookups
+from .models import DressReview, Profile, User, DressRental
+from .utils import validate_rental
 
 
 class DressReviewForm(forms.ModelForm):
@@ -33,17 +37,55 @@ class DateInput(forms.DateInput):
     input_type = 'date'
 
 
+class PrefetchedChoiceField(forms.ModelChoiceField):
+    """ Pasirinkimo laukas, kurio pasirinkimai ir tikrinimas remiasi jau įkeltais objektais.
+
+        Skirtingai nei ModelChoiceField, nevykdo užklausos nei rodydamas pasirinkimus,
+        nei tikrindamas pateiktą reikšmę."""
+
+    def __init__(self, *args, **kwargs):
+        self.objects = {}
+        kwargs.setdefault('queryset', None)
+        super().__init__(*args, **kwargs)
+
+    def set_objects(self, objects):
+        """Nustato galimus pasirinkimus (objektų sąrašą)."""
+        self.objects = {str(obj.pk): obj for obj in objects}
+        self.widget.choices = self.choices
+
+    def _get_choices(self):
+        choices = [(obj.pk, str(obj)) for obj in self.objects.values()]
+        if self.empty_label is not None:
+            choices.insert(0, ('', self.empty_label))
+        return choices
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        key = str(value.pk if isinstance(value, models.Model) else value)
+        if key not in self.objects:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                  params={'value': value})
+        return self.objects[key]
+
+    def validate(self, value):
+        forms.Field.validate(self, value)
+
+
 class UserDressRentalCreateForm(forms.ModelForm):
     """Sukuria formą suknelės nuomai, slepiant vartotojo ir statuso laukus,
-    tačiau leidžiant pasirinkti suknelę, pradžios ir pabaigos datas, dydį."""
-    size = forms.ModelChoiceField(queryset=Size.objects.none(), empty_label="--------")
+    tačiau leidžiant pasirinkti suknelę, pradžios ir pabaigos datas, dydį.
+    Suknelės ir dydžio pasirinkimai imami iš jau įkeltų objektų, todėl
+    forma nerodo viso katalogo ir nevykdo papildomų užklausų."""
+    dress = PrefetchedChoiceField(empty_label=None)
+    size = PrefetchedChoiceField(empty_label="--------")
 
     class Meta:
         model = DressRental
-        fields = ('dress', 'user', 'start_date', 'return_date', 'status', 'size')
+        fields = ('dress', 'start_date', 'return_date', 'size')
         widgets = {
-            'user': forms.HiddenInput(),
-            'status': forms.HiddenInput(),
             'start_date': DateInput(),
             'return_date': DateInput()
         }
@@ -55,17 +97,33 @@ class UserDressRentalCreateForm(forms.ModelForm):
 
         dress = kwargs.pop('dress', None)  # perduodam pasirinktą suknelę į formą
         super().__init__(*args, **kwargs)
+        self.fields['dress'].disabled = True
 
         if self.instance.pk:  # Jei atnaujiname esamą suknelės nuomos formą
-            self.fields['dress'].disabled = True
             self.fields['start_date'].disabled = True
             self.fields['size'].disabled = True
+            self.fields['dress'].set_objects([self.instance.dress])  # suknelė įkelta kartu su nuoma
 
-            if self.instance.size:  # Jei buvo pasirinktas dydis, nustatome jį
-                self.fields['size'].queryset = Size.objects.filter(id=self.instance.size.id)
-                self.fields['size'].initial = self.instance.size  # pradinė reikšmė pagal jau pasirinkto dydžio objektą
+            size = lookups.sizes.get(self.instance.size_id)
+            if size:  # Jei buvo pasirinktas dydis, nustatome jį (be užklausos, iš Size lentelės kopijos)
+                self.fields['size'].set_objects([size])
+                self.fields['size'].initial = size.id  # pradinė reikšmė pagal jau pasirinkto dydžio ID
 
         elif dress:  # Jei kuriame naują nuomos formą per suknelės puslapį
             self.fields['dress'].initial = dress
-            self.fields['dress'].disabled = True
-            self.fields['size'].queryset = dress.sizes.all()  # tik pasirinktos suknelės dydžiai
+            self.fields['dress'].set_objects([dress])
+            self.fields['size'].set_objects(dress.sizes.all())  # iš anksto įkelti suknelės dydžiai
+
+    def clean(self):
+        """Tikrina datas ir ar suknelė tuo metu laisva (ta pati patikra naudojama ir JSON užklausai)."""
+        cleaned_data = super().clean()
+        dress = cleaned_data.get('dress')
+        if dress is None or self.errors:
+            return cleaned_data
+        size = cleaned_data.get('size')
+        errors = validate_rental(dress, size.pk if size else None,
+                                 cleaned_data.get('start_date'), cleaned_data.get('return_date'),
+                                 rental_id=self.instance.pk, current_size_id=self.instance.size_id)
+        for field, message in errors.items():
+            self.add_error(field if field in self.fields else None, message)
+        return cleaned_data
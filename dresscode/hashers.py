@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import Argon2PasswordHasher, check_password, make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """ Argon2 slaptažodžių maiša, kurios parametrai nustatomi settings.py.
+
+        Numatytieji Django Argon2 parametrai (100 MiB atminties vienam slaptažodžiui)
+        per masinius prisijungimus išnaudoja visą serverio atmintį ir procesorių.
+        Pakeitus parametrus, seni maišai automatiškai perskaičiuojami sėkmingo prisijungimo metu."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+def get_executor():
+    """Grąžina bendrą, ribotą slaptažodžių maišos gijų telkinį (PASSWORD_HASHING_WORKERS gijų)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS,
+                                           thread_name_prefix='password-hashing')
+    return _executor
+
+
+def run_hashing(func, *args):
+    """Vykdo maišos skaičiavimą telkinyje ir laukia rezultato.
+    Vienu metu skaičiuojamų maišų skaičius ribojamas, todėl per prisijungimų bangą
+    užklausos laukia eilėje, o ne konkuruoja dėl procesoriaus. Kviečianti gija (WSGI)
+    lieka užimta visą laiką; asinchroniniam kodui skirta arun_hashing."""
+    return get_executor().submit(func, *args).result()
+
+
+async def arun_hashing(func, *args):
+    """Asinchroninė run_hashing versija: įvykių ciklas neblokuojamas, kol skaičiuojama maiša."""
+    return await asyncio.wrap_future(get_executor().submit(func, *args))
+
+
+def verify_password(password, encoded):
+    """Patikrina slaptažodį. Grąžina porą (ar slaptažodis teisingas, ar maišą reikia perskaičiuoti)."""
+    must_update = []
+    is_correct = check_password(password, encoded, setter=lambda raw_password: must_update.append(True))
+    return is_correct, bool(must_update)
+
+
+class PooledModelBackend(ModelBackend):
+    """ Autentifikavimo klasė, kuri slaptažodžio maišą skaičiuoja ribotame gijų telkinyje.
+
+        Jei sėkmingai prisijungusio vartotojo maiša sukurta senu algoritmu ar parametrais,
+        ji perskaičiuojama pageidaujamu algoritmu ir išsaugoma.
+
+        aauthenticate() - asinchroninis variantas, kurio laukimas neužima nei įvykių ciklo, nei gijos.
+        Django 4.2 django.contrib.auth.authenticate() jo nekviečia (asinchroninis aauthenticate()
+        atsirado 5.0), todėl asinchroninis kodas jį kviečia tiesiogiai."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Maiša skaičiuojama ir neegzistuojančiam vartotojui, kad atsakymo laikas neišduotų vartotojų.
+            run_hashing(make_password, password)
+            return None
+        is_correct, must_update = run_hashing(verify_password, password, user.password)
+        if is_correct and must_update:
+            user.password = run_hashing(make_password, password)
+            user.save(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await sync_to_async(user_model._default_manager.get_by_natural_key)(username)
+        except user_model.DoesNotExist:
+            await arun_hashing(make_password, password)
+            return None
+        is_correct, must_update = await arun_hashing(verify_password, password, user.password)
+        if is_correct and must_update:
+            user.password = await arun_hashing(make_password, password)
+            await sync_to_async(user.save)(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
+
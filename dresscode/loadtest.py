@@ -0,0 +1,121 @@
+"""
+    Apkrovos testų (bench_scaling, bench_admission) serverio ir klientų procesų funkcijos.
+
+    Modulis neįkelia Django modelių, todėl funkcijas galima paleisti ir 'spawn' procesuose
+    (Windows, macOS), ne tik 'fork': serverio procesas pats iškviečia django.setup().
+"""
+import logging
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI serveris su fiksuotu gijų skaičiumi (kaip gunicorn --threads): perteklinės užklausos laukia eilėje."""
+
+    request_queue_size = 128
+    threads = 16
+
+    def server_activate(self):
+        super().server_activate()
+        self.executor = ThreadPoolExecutor(self.threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def slowed(view, seconds):
+    def wrapper(request, *args, **kwargs):
+        time.sleep(seconds)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def configure_admission(threads, admission, slow):
+    """bench_admission serverio nustatymai. Paieška sulėtinama slow sekundžių,
+    lyg tai būtų lėta užklausa didelėje bazėje."""
+    from django.conf import settings
+    from dresscode.urls import urlpatterns
+
+    settings.ADMISSION_ENABLED = admission
+    settings.RATELIMIT_ENABLED = False
+    logging.getLogger('django.request').setLevel(logging.ERROR)  # kiekvienas 503 būtų įspėjimas žurnale
+    for pattern in urlpatterns:
+        if pattern.name == 'search':
+            pattern.callback = slowed(pattern.callback, slow)
+    PooledWSGIServer.threads = threads
+
+
+def serve(port, ready, server_class=WSGIServer, configure=None, args=()):
+    """ Serverio procesas: WSGI serveris nurodytame prievade.
+
+        configure(*args) - modulio lygio funkcija, iškviečiama po django.setup(), bet prieš
+        sukuriant WSGI programą (pvz. nustatymams pakeisti)."""
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+    if configure is not None:
+        configure(*args)
+    server = make_server('127.0.0.1', port, get_wsgi_application(), server_class=server_class,
+                         handler_class=QuietHandler)
+    ready.set()
+    server.serve_forever()
+
+
+def load(urls, duration):
+    """Kliento procesas: nuosekliai siunčia užklausas duration sekundžių. Grąžina (sėkmingos, klaidos)."""
+    done, failed = 0, 0
+    deadline = time.perf_counter() + duration
+    index = 0
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(urls[index % len(urls)], timeout=10) as response:
+                response.read()
+            done += 1
+        except Exception:
+            failed += 1
+        index += 1
+    return done, failed
+
+
+def timed_load(urls, duration):
+    """ Kliento procesas: nuosekliai siunčia užklausas duration sekundžių.
+        Grąžina (sėkmingų užklausų trukmės ms, atsakymų kodų skaičiai). Gavęs 503, klientas
+        palaukia Retry-After (ne ilgiau nei sekundę), kaip tai darytų naršyklė ar kitas klientas."""
+    latencies, statuses = [], Counter()
+    deadline = time.perf_counter() + duration
+    index = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urls[index % len(urls)], timeout=60) as response:
+                response.read()
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[200] += 1
+        except urllib.error.HTTPError as error:
+            statuses[error.code] += 1
+            if error.code == 503:
+                time.sleep(min(float(error.headers.get('Retry-After') or 1), 1.0))
+        except OSError:
+            statuses['error'] += 1
+        index += 1
+    return latencies, statuses
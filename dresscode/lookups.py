@@ -0,0 +1,66 @@
+import threading
+import time
+
+from django.apps import apps
+
+from .versions import bump_version, get_version
+
+
+class LookupTable:
+    """ Procese laikoma mažos, retai keičiamos lentelės (Size, Style) kopija.
+
+        Lentelė įkeliama viena užklausa ir naudojama tol, kol nepasikeičia jos versija bendrame podėlyje.
+        Versija padidinama išsaugojus ar ištrynus įrašą, todėl visi procesai perkrauna savo kopijas.
+        Versija tikrinama ne dažniau nei kas check_interval sekundžių.
+
+        Metodai:
+            get(): Grąžina objektą pagal ID arba None.
+            name(): Grąžina pavadinimą pagal ID.
+            names(): Grąžina kelių ID pavadinimus, atskirtus kableliais.
+            all(): Grąžina visus objektus.
+            invalidate(): Pažymi visų procesų kopijas pasenusiomis."""
+
+    check_interval = 1.0
+
+    def __init__(self, model_label):
+        self.model_label = model_label
+        self.version_name = f"lookup:{model_label.lower()}"
+        self.version = None
+        self.checked_at = 0.0
+        self.rows = {}
+        self.lock = threading.Lock()
+
+    def _rows(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < self.check_interval:
+            return self.rows
+        version = get_version(self.version_name)
+        if version != self.version:
+            with self.lock:
+                model = apps.get_model(self.model_label)
+                self.rows = {obj.pk: obj for obj in model._default_manager.order_by('pk')}
+                self.version = version
+        self.checked_at = now
+        return self.rows
+
+    def get(self, pk):
+        return self._rows().get(pk)
+
+    def name(self, pk):
+        obj = self.get(pk)
+        return obj.name if obj is not None else ''
+
+    def names(self, pks):
+        rows = self._rows()
+        return ', '.join(rows[pk].name for pk in pks if pk in rows)
+
+    def all(self):
+        return list(self._rows().values())
+
+    def invalidate(self):
+        self.version = None
+        bump_version(self.version_name)
+
+
+sizes = LookupTable('dresscode.Size')
+styles = LookupTable('dresscode.Style')
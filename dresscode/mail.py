@@ -0,0 +1,174 @@
+import base64
+import logging
+import smtplib
+import uuid
+from datetime import timedelta
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Klaidos, po kurių jungtis su pašto serveriu nebetinkama. SMTPException paveldi OSError,
+# todėl pavieniams laiškams skirtos klaidos (pvz. atmestas gavėjas) čia nepatenka.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def encode_content(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return base64.b64encode(content).decode('ascii')
+
+
+def outbound_email(message):
+    """ Iš Django el. laiško sukuria OutboundEmail įrašą (neišsaugotą).
+
+        Išsaugomos visos alternatyvios versijos, priedai ((failas, turinys, MIME tipas) pavidalu)
+        ir content_subtype. Laiškų, kurių taip išsaugoti negalima (priedai MIMEBase objektais,
+        kitokia koduotė), eilėje laikyti nepavyktų - jiems keliama ValueError, kad laiškas
+        nedingtų tyliai."""
+    if message.encoding and message.encoding.lower() not in ('utf-8', 'utf8'):
+        raise ValueError(f"Cannot queue an email with encoding {message.encoding!r}.")
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            raise ValueError('Cannot queue an email with MIMEBase attachments, attach (filename, content, mimetype).')
+        filename, content, mimetype = attachment
+        attachments.append({'filename': filename, 'content': encode_content(content), 'mimetype': mimetype})
+    html_body = ''
+    alternatives = []
+    for content, mimetype in getattr(message, 'alternatives', ()):
+        if mimetype == 'text/html' and not html_body:
+            html_body = content
+        else:
+            alternatives.append({'content': content, 'mimetype': mimetype})
+    return OutboundEmail(subject=message.subject, body=message.body, html_body=html_body,
+                         content_subtype=message.content_subtype, alternatives=alternatives, attachments=attachments,
+                         from_email=message.from_email, to=list(message.to), cc=list(message.cc),
+                         bcc=list(message.bcc), reply_to=list(message.reply_to), headers=dict(message.extra_headers))
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """ El. pašto klasė, kuri laiškų nesiunčia, o įrašo juos į OutboundEmail lentelę.
+
+        Jei laiškas siunčiamas transakcijos viduje, jis įrašomas toje pačioje transakcijoje,
+        todėl atšaukus pakeitimą neišsiunčiamas ir laiškas. Laiškus išsiunčia komanda send_outbox
+        per OUTBOX_EMAIL_BACKEND (pvz. SMTP)."""
+
+    def send_messages(self, email_messages):
+        rows = [outbound_email(message) for message in email_messages if message.recipients()]
+        OutboundEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def build_message(outbound, connection=None):
+    """Iš eilės įrašo sukuria Django el. laišką."""
+    message = EmailMultiAlternatives(subject=outbound.subject, body=outbound.body, from_email=outbound.from_email,
+                                     to=outbound.to, cc=outbound.cc, bcc=outbound.bcc, reply_to=outbound.reply_to,
+                                     headers=outbound.headers, connection=connection)
+    message.content_subtype = outbound.content_subtype
+    if outbound.html_body:
+        message.attach_alternative(outbound.html_body, 'text/html')
+    for alternative in outbound.alternatives:
+        message.attach_alternative(alternative['content'], alternative['mimetype'])
+    for attachment in outbound.attachments:
+        message.attach(attachment['filename'], base64.b64decode(attachment['content']), attachment['mimetype'])
+    return message
+
+
+def retry_delay(attempts):
+    """Laukimo laikas iki kito bandymo: OUTBOX_RETRY_DELAY, dvigubinamas po kiekvienos nesėkmės
+    (iki OUTBOX_RETRY_DELAY_MAX sekundžių)."""
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_RETRY_DELAY_MAX))
+
+
+def due_emails(now=None):
+    """Siųsti paruošti laiškai: laukiantys eilėje ir pasiimti siuntėjo, kurio laikas
+    (OUTBOX_CLAIM_TIMEOUT) baigėsi."""
+    return (OutboundEmail.objects.filter(status__in=('queued', 'sending'), next_attempt_at__lte=now or timezone.now())
+            .order_by('next_attempt_at', 'id'))
+
+
+def claim(batch_size):
+    """ Pasiima iki batch_size paruoštų laiškų: sąlyginiu UPDATE pažymi juos 'sending' su šio siuntėjo
+        žyme ir next_attempt_at = dabar + OUTBOX_CLAIM_TIMEOUT. Lygiagrečiai veikiantis kitas
+        siuntėjas tų pačių laiškų nebegauna; jei šis siuntėjas nutrūksta, laiškai vėl tampa
+        paruošti pasibaigus OUTBOX_CLAIM_TIMEOUT. Grąžina (žymė, laiškų sąrašas)."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    ids = list(due_emails(now).values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return token, []
+    (OutboundEmail.objects.filter(status__in=('queued', 'sending'), id__in=ids, next_attempt_at__lte=now)
+     .update(status='sending', claim=token, next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)))
+    return token, list(OutboundEmail.objects.filter(claim=token, status='sending').order_by('next_attempt_at', 'id'))
+
+
+def send_queued(batch_size=None, backend=None):
+    """ Išsiunčia vieną paruoštų siųsti laiškų dalį per vieną pašto serverio jungtį.
+
+        Laiškai pirmiausia pasiimami (claim), todėl kelios vienu metu veikiančios komandos
+        to paties laiško neišsiunčia dukart. Nepavykęs laiškas bandomas vėliau (retry_delay),
+        o po OUTBOX_MAX_ATTEMPTS bandymų pažymimas 'failed'. Jei nepavyksta prisijungti prie
+        serverio arba jungtis nutrūksta siunčiant (CONNECTION_ERRORS), likę dalies laiškai
+        atidedami OUTBOX_RETRY_DELAY sekundžių, bandymai neskaičiuojami.
+        Grąžina porą (išsiųsta, nepavyko)."""
+    token, due = claim(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not due:
+        return 0, 0
+
+    sent, failed = 0, 0
+    connection = get_connection(backend or settings.OUTBOX_EMAIL_BACKEND, fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        logger.warning('Could not connect to the mail server, %d emails deferred: %s', len(due), error)
+        release(token, error)
+        return 0, 0
+    try:
+        for outbound in due:
+            try:
+                connection.send_messages([build_message(outbound, connection)])
+            except CONNECTION_ERRORS as error:
+                deferred = release(token, error)
+                logger.warning('Lost the connection to the mail server, %d emails deferred: %s', deferred, error)
+                break
+            except Exception as error:
+                mark_failed(outbound, error, token)
+                failed += 1
+            else:
+                OutboundEmail.objects.filter(pk=outbound.pk, claim=token).update(
+                    status='sent', sent_at=timezone.now(), last_error='', claim='')
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def release(token, error):
+    """Grąžina dar neišsiųstus šio siuntėjo pasiimtus laiškus į eilę po OUTBOX_RETRY_DELAY sekundžių,
+    neskaičiuodama bandymo. Grąžina atidėtų laiškų skaičių."""
+    return OutboundEmail.objects.filter(claim=token, status='sending').update(
+        status='queued', claim='', last_error=f"{type(error).__name__}: {error}",
+        next_attempt_at=timezone.now() + timedelta(seconds=settings.OUTBOX_RETRY_DELAY))
+
+
+def mark_failed(outbound, error, token):
+    """ Užregistruoja nepavykusį bandymą ir nustato kito bandymo laiką.
+
+        Įrašas keičiamas tik jei jis vis dar pasiimtas su šia žyme: jei siuntėjo laikas baigėsi
+        ir laišką jau pasiėmė kitas siuntėjas, jo rezultatas neperrašomas. Grąžina, ar įrašas pakeistas."""
+    attempts = outbound.attempts + 1
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        status, next_attempt_at = 'failed', outbound.next_attempt_at
+    else:
+        status, next_attempt_at = 'queued', timezone.now() + retry_delay(attempts)
+    updated = OutboundEmail.objects.filter(pk=outbound.pk, claim=token).update(
+        attempts=attempts, last_error=f"{type(error).__name__}: {error}", status=status,
+        next_attempt_at=next_attempt_at, claim='')
+    return bool(updated)
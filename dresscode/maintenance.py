@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.utils import timezone
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+class LockMetrics:
+    """ Kiekvieno priežiūros žingsnio trukmės: kiek laukta užrakto (waited) ir kiek jis laikytas (held).
+
+        Žingsniai, kurie kartojami (atsarginės kopijos dalys, inkrementinio VACUUM dalys),
+        sumuojami po tuo pačiu pavadinimu, todėl matyti ir bendra, ir ilgiausia vieno
+        užrakto trukmė - būtent ji parodo, kiek ilgiausiai galėjo laukti svetainės rašytojai."""
+
+    def __init__(self):
+        self.steps = defaultdict(list)
+
+    def add(self, name, held, waited=0.0):
+        self.steps[name].append((waited, held))
+
+    @contextmanager
+    def held(self, name):
+        """Matuoja veiksmą, kuris užraktą gauna ir atleidžia pats (pvz. ANALYZE be transakcijos)."""
+        start = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start)
+
+    @contextmanager
+    def write_transaction(self, connection, name):
+        """BEGIN IMMEDIATE ... COMMIT: atskirai matuojama, kiek laukta rašymo užrakto ir kiek jis laikytas."""
+        start = time.perf_counter()
+        connection.execute('BEGIN IMMEDIATE')
+        acquired = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self.add(name, time.perf_counter() - acquired, acquired - start)
+
+    def rows(self):
+        """Grąžina (žingsnis, kartai, laukta ms iš viso, laikyta ms iš viso, ilgiausiai laikyta ms)."""
+        for name, values in self.steps.items():
+            waited = [value[0] for value in values]
+            held = [value[1] for value in values]
+            yield name, len(values), sum(waited) * 1000, sum(held) * 1000, max(held) * 1000
+
+
+def backup(source, path, metrics, pages=256, pause=0.01, max_restarts=3):
+    """ Padaro veikiančios duomenų bazės kopiją SQLite online backup API, po pages puslapių.
+
+        Kiekvienas žingsnis trumpam užrakina šaltinį skaitymui, o tarp žingsnių daroma pause
+        sekundžių pertrauka, kad rašytojai nebūtų blokuojami ilgiau nei vieną žingsnį.
+        Jei tarp žingsnių į bazę rašo kitas procesas, SQLite kopijavimą pradeda iš naujo
+        (likusių puslapių nesumažėja); po max_restarts tokių kartų kopija daroma VACUUM INTO,
+        kuris skaito vieną nuoseklią būseną ir WAL režime rašytojų neblokuoja.
+
+        Kopija įrašoma laikinu pavadinimu, patikrinama (quick_check) ir tik tada pervadinama.
+        Grąžina kopijos dydį baitais."""
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.unlink(missing_ok=True)
+    state = {'last': time.perf_counter(), 'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        now = time.perf_counter()
+        metrics.add('backup step', now - state['last'])
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise BackupRestarted
+        state['remaining'] = remaining
+        if remaining:
+            time.sleep(pause)
+        state['last'] = time.perf_counter()
+
+    target = sqlite3.connect(temp_path)
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    except BackupRestarted:
+        target.close()
+        temp_path.unlink(missing_ok=True)
+        with metrics.held('backup vacuum into'):
+            source.execute('VACUUM INTO ?', (str(temp_path),))
+        target = sqlite3.connect(temp_path)
+    try:
+        problems = [row[0] for row in target.execute('PRAGMA quick_check')]
+    finally:
+        target.close()
+    if problems != ['ok']:
+        temp_path.unlink(missing_ok=True)
+        raise sqlite3.DatabaseError(f"Backup failed the integrity check: {problems[:5]}")
+    os.replace(temp_path, path)
+    return path.stat().st_size
+
+
+def backup_name(now=None):
+    return f"db-{(now or timezone.now()):%Y%m%d-%H%M%S}.sqlite3"
+
+
+def rotate_backups(directory, keep):
+    """Palieka keep naujausių kopijų (pagal pavadinime esantį laiką), kitas ištrina. Grąžina ištrintas."""
+    backups = sorted(Path(directory).glob('db-*.sqlite3'))
+    removed = backups[:-keep] if keep else []
+    for old in removed:
+        old.unlink()
+    return removed
+
+
+def analyze(connection, metrics, full=False, analysis_limit=1000):
+    """ Atnaujina užklausų planuotojo statistiką (sqlite_stat1).
+
+        Jei statistikos dar nėra arba full, vykdomas ANALYZE visoms lentelėms, kitaip
+        PRAGMA optimize, kuris analizuoja tik tas lenteles, kurių statistika paseno.
+        analysis_limit riboja, kiek kiekvieno indekso eilučių perskaitoma, todėl
+        užrakto trukmė nepriklauso nuo lentelių dydžio."""
+    connection.execute(f'PRAGMA analysis_limit={int(analysis_limit)}')
+    has_stats = connection.execute(
+        "SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0]
+    statement, name = ('ANALYZE', 'analyze') if full or not has_stats else ('PRAGMA optimize', 'optimize')
+    with metrics.write_transaction(connection, name):
+        connection.execute(statement)
+    return name
+
+
+def incremental_vacuum(connection, metrics, pages=256, pause=0.01):
+    """ Grąžina laisvus puslapius operacinei sistemai po pages puslapių atskirose trumpose
+        transakcijose, tarp jų darant pause pertrauką. Veikia tik su auto_vacuum=INCREMENTAL
+        (žr. enable_incremental_vacuum). Grąžina atlaisvintų puslapių skaičių."""
+    freed = 0
+    while True:
+        free_pages = connection.execute('PRAGMA freelist_count').fetchone()[0]
+        if not free_pages:
+            break
+        # Kiekvienas execute() įvykdo vieną PRAGMA žingsnį, t.y. atlaisvina vieną puslapį.
+        # executescript netinka: prieš vykdydamas jis patvirtintų atidarytą transakciją.
+        with metrics.write_transaction(connection, 'incremental vacuum step'):
+            for _ in range(min(int(pages), free_pages)):
+                connection.execute('PRAGMA incremental_vacuum(1)')
+        freed += free_pages - connection.execute('PRAGMA freelist_count').fetchone()[0]
+        time.sleep(pause)
+    with metrics.held('wal checkpoint'):
+        connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+    return freed
+
+
+def auto_vacuum_mode(connection):
+    return {0: 'none', 1: 'full', 2: 'incremental'}[connection.execute('PRAGMA auto_vacuum').fetchone()[0]]
+
+
+def enable_incremental_vacuum(connection, metrics):
+    """Perjungia bazę į auto_vacuum=INCREMENTAL. Tam reikia vieno pilno VACUUM, kuris visą laiką
+    laiko išskirtinį užraktą, todėl tai daroma tik paprašius ir verčiau ramiu metu."""
+    connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    with metrics.held('vacuum (exclusive)'):
+        connection.execute('VACUUM')
+
+
+def integrity_check(connection, metrics, full=False, max_errors=100):
+    """ Patikrina bazės vientisumą: PRAGMA quick_check (arba integrity_check, jei full, kuris
+        tikrina ir indeksų turinį) bei foreign_key_check. Grąžina rastų problemų sąrašą."""
+    pragma = f"integrity_check({int(max_errors)})" if full else f"quick_check({int(max_errors)})"
+    with metrics.held('integrity check' if full else 'quick check'):
+        problems = [row[0] for row in connection.execute(f'PRAGMA {pragma}')]
+    if problems == ['ok']:
+        problems = []
+    with metrics.held('foreign key check'):
+        problems += [f"{table} row {rowid} references missing {parent}"
+                     for table, rowid, parent, _ in connection.execute('PRAGMA foreign_key_check')]
+    return problems
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dresscode.models import ArchivedDressRental, DressRental
+
+ARCHIVED_FIELDS = ('id', 'start_date', 'return_date', 'dress_id', 'user_id', 'size_id', 'status')
+
+
+class Command(BaseCommand):
+    """ Perkelia senai grąžintų suknelių nuomos įrašus į ArchivedDressRental lentelę.
+
+        Įrašai perkeliami dalimis (--batch-size): kiekviena dalis nukopijuojama į archyvą
+        ir ištrinama iš DressRental atskiroje trumpoje transakcijoje, todėl lentelė
+        ilgam neužrakinama, o nutraukus komandą ją galima tiesiog paleisti iš naujo."""
+
+    help = 'Moves returned rentals older than the cutoff into the archive table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Archive rentals returned more than this many days ago (default: 365).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rentals that would be archived.')
+
+    def handle(self, *args, **options):
+        cutoff = date.today() - timedelta(days=options['days'])
+        old_rentals = DressRental.objects.filter(status='returned', return_date__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f"Rentals to archive (returned before {cutoff}): {old_rentals.count()}")
+            return
+
+        archived = 0
+        while True:
+            with transaction.atomic():
+                rows = list(old_rentals.order_by('id').values_list(*ARCHIVED_FIELDS)[:options['batch_size']])
+                if not rows:
+                    break
+                ArchivedDressRental.objects.bulk_create(
+                    [ArchivedDressRental(rental_id=rental_id, start_date=start_date, return_date=return_date,
+                                         dress_id=dress_id, user_id=user_id, size_id=size_id, status=status)
+                     for rental_id, start_date, return_date, dress_id, user_id, size_id, status in rows],
+                    ignore_conflicts=True)
+                DressRental.objects.filter(id__in=[row[0] for row in rows]).delete()
+            archived += len(rows)
+            self.stdout.write(f"Archived {archived} rentals")
+        self.stdout.write(self.style.SUCCESS(f"Done, archived {archived} rentals returned before {cutoff}."))
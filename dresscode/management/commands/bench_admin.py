@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from dresscode.benchmarks import (make_client, measure, rolled_back, seed_catalog, seed_rentals,
+                                  seed_users)
+from dresscode.models import User
+
+
+class Command(BaseCommand):
+    """ Matuoja administravimo puslapių trukmę ir užklausų skaičių didėjant duomenų kiekiui.
+
+        Duomenys kuriami transakcijoje, kuri pabaigoje atšaukiama, todėl duomenų bazė nepakinta.
+        Puslapiai turi išlikti vienodai greiti ir vykdyti tiek pat užklausų
+        nepriklausomai nuo nuomų ir vartotojų skaičiaus."""
+
+    help = 'Benchmarks admin changelists and change forms at growing data volumes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rentals', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--steps', type=int, default=3,
+                            help='Number of data volume steps up to --rentals/--users.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            admin_user = User.objects.create_superuser('bench_admin', 'bench_admin@example.com', 'bench')
+            client = make_client(admin_user)
+            dresses = seed_catalog()
+            dress = dresses[0]
+
+            pages = {
+                'rental changelist': reverse('admin:dresscode_dressrental_changelist'),
+                'rental filter': reverse('admin:dresscode_dressrental_changelist') + '?status__exact=rented',
+                'rental search': reverse('admin:dresscode_dressrental_changelist') + f'?q={dress.item_code}',
+                'dress changelist': reverse('admin:dresscode_dress_changelist'),
+                'dress change form': reverse('admin:dresscode_dress_change', args=(dress.pk,)),
+            }
+
+            users, rentals = [], 0
+            self.stdout.write(f"{'rentals':>9} {'users':>7}  {'page':<20} {'ms':>8} {'queries':>8}")
+            for step in range(1, options['steps'] + 1):
+                target_users = options['users'] * step // options['steps']
+                target_rentals = options['rentals'] * step // options['steps']
+                users += seed_users(target_users - len(users), start=len(users))
+                seed_rentals(target_rentals - rentals, dresses, users)
+                rentals = target_rentals
+
+                for label, url in pages.items():
+                    ms, queries = measure(lambda: client.get(url), repeat=options['repeat'])
+                    self.stdout.write(f"{rentals:>9} {len(users):>7}  {label:<20} {ms:>8.1f} {queries:>8}")
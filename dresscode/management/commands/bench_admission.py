@@ -0,0 +1,91 @@
+import multiprocessing
+import statistics
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from dresscode.loadtest import PooledWSGIServer, configure_admission, serve, timed_load
+from dresscode.models import Designer, Dress
+
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        return [latencies[0] if latencies else 0.0] * 3
+    cuts = statistics.quantiles(latencies, n=100)
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    """ Apkrovos testas, rodantis, kaip lygiagretumo ribojimas (AdmissionControlMiddleware)
+        apsaugo pigių puslapių vėlinimą, kai brangus endpoint'as perkrautas.
+
+        Serveris turi --threads gijų. --slow-clients klientų siunčia paieškos užklausas,
+        kurios sulėtinamos --slow-ms milisekundžių, o --fast-clients klientų vienu metu atidaro
+        suknelės ir dizainerio puslapius. Be ribojimo lėtos užklausos užima visas gijas ir
+        pigūs puslapiai laukia eilėje už jų; su ribojimu paieškos perteklius gauna 503,
+        o pigių puslapių p99 lieka artimas jų įprastai trukmei. Duomenys tik skaitomi.
+
+        Jei su ribojimu pigių puslapių p99 nesumažėja, komanda baigiasi klaida."""
+
+    help = 'Load-tests a slow endpoint alongside cheap pages with and without admission control.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--slow-clients', type=int, default=24)
+        parser.add_argument('--fast-clients', type=int, default=4)
+        parser.add_argument('--slow-ms', type=float, default=500)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--port', type=int, default=18100)
+
+    def handle(self, *args, **options):
+        dress = Dress.objects.order_by('id').first()
+        designer = Designer.objects.order_by('id').first()
+        if dress is None or designer is None:
+            raise CommandError('The database needs at least one dress and designer.')
+        base = f"http://127.0.0.1:{options['port']}"
+        fast_urls = [base + reverse('dress-one', args=(dress.pk,)), base + reverse('designer-one', args=(designer.pk,))]
+        slow_urls = [base + reverse('search') + '?search_text=red']
+        connections.close_all()
+
+        context = multiprocessing.get_context()
+        self.stdout.write(f"{options['threads']} threads, {options['slow_clients']} clients on search "
+                          f"(+{options['slow_ms']:.0f} ms), {options['fast_clients']} clients on cheap pages")
+        self.stdout.write(f"{'admission':<10} {'fast req':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                          f"{'errors':>7} {'slow ok':>8} {'slow 503':>9} {'slow p50':>9}")
+        p99 = {}
+        for admission in (False, True):
+            ready = context.Event()
+            server = context.Process(target=serve, daemon=True, args=(
+                options['port'], ready, PooledWSGIServer, configure_admission,
+                (options['threads'], admission, options['slow_ms'] / 1000)))
+            server.start()
+            try:
+                if not ready.wait(30):
+                    raise CommandError('Server did not start.')
+                timed_load(fast_urls + slow_urls, 0.5)  # įšildymas
+                tasks = [(slow_urls, options['duration'])] * options['slow_clients']
+                tasks += [(fast_urls, options['duration'])] * options['fast_clients']
+                with context.Pool(len(tasks)) as pool:
+                    results = pool.starmap(timed_load, tasks)
+            finally:
+                server.terminate()
+                server.join()
+
+            slow, fast = results[:options['slow_clients']], results[options['slow_clients']:]
+            fast_latencies = [latency for latencies, _ in fast for latency in latencies]
+            fast_statuses = sum((statuses for _, statuses in fast), Counter())
+            slow_latencies = [latency for latencies, _ in slow for latency in latencies]
+            slow_statuses = sum((statuses for _, statuses in slow), Counter())
+            p50, p95, p99[admission] = percentiles(fast_latencies)
+            label = 'on' if admission else 'off'
+            self.stdout.write(f"{label:<10} {len(fast_latencies):>8} {p50:>8.1f} {p95:>8.1f} {p99[admission]:>8.1f} "
+                              f"{sum(fast_statuses.values()) - fast_statuses[200]:>7} {slow_statuses[200]:>8} "
+                              f"{slow_statuses[503]:>9} {percentiles(slow_latencies)[0]:>9.1f}")
+
+        if p99[True] >= p99[False]:
+            raise CommandError(f"Admission control did not lower the cheap pages' p99 "
+                               f"({p99[True]:.1f} ms vs {p99[False]:.1f} ms without it).")
+        self.stdout.write(self.style.SUCCESS(
+            f"Admission control lowered the cheap pages' p99 from {p99[False]:.1f} ms to {p99[True]:.1f} ms."))
@@ -0,0 +1,49 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from dresscode.hashers import run_hashing, verify_password
+
+
+class Command(BaseCommand):
+    """ Matuoja slaptažodžių maišų greitį.
+
+        Kiekvienam PASSWORD_HASHERS algoritmui išmatuojama, kiek slaptažodžių patikrinimų
+        (prisijungimų) per sekundę atlieka vienas procesoriaus branduolys, ir kiek
+        patikrinimų per sekundę atlieka ribotas maišos telkinys, kai jį vienu metu kviečia --clients gijų."""
+
+    help = 'Benchmarks password verifications (logins) per second per core.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+        parser.add_argument('--clients', type=int, default=16,
+                            help='Number of concurrent request threads for the pooled benchmark.')
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        cores = os.cpu_count() or 1
+        self.stdout.write(f"CPU cores: {cores}, hashing workers: {settings.PASSWORD_HASHING_WORKERS}")
+
+        for path in settings.PASSWORD_HASHERS:
+            hasher = import_string(path)()
+            encoded = make_password('bench-password', hasher=hasher)
+
+            start = time.perf_counter()
+            for _ in range(logins):
+                verify_password('bench-password', encoded)
+            single = logins / (time.perf_counter() - start)
+            self.stdout.write(f"{hasher.algorithm:<16} {single:8.1f} logins/s per core")
+
+        encoded = make_password('bench-password')
+        with ThreadPoolExecutor(max_workers=options['clients']) as clients:
+            start = time.perf_counter()
+            list(clients.map(lambda _: run_hashing(verify_password, 'bench-password', encoded), range(logins * 2)))
+            pooled = logins * 2 / (time.perf_counter() - start)
+        self.stdout.write(f"Pooled default hasher: {pooled:.1f} logins/s total, "
+                          f"{pooled / min(cores, settings.PASSWORD_HASHING_WORKERS):.1f} per core "
+                          f"with {options['clients']} concurrent clients")
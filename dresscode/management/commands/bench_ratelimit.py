@@ -0,0 +1,87 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from dresscode import urls
+from dresscode.benchmarks import make_client, measure, rolled_back, seed_catalog, seed_users
+from dresscode.middleware import RateLimitMiddleware
+from dresscode.ratelimit import Rate
+
+
+class Command(BaseCommand):
+    """ Matuoja užklausų ribojimo (RateLimitMiddleware) kainą.
+
+            process_view: vieno middleware kvietimo trukmė mikrosekundėmis URL be taisyklės,
+                leidžiamai ir atmetamai užklausai (su nustatytu RATELIMIT_CACHE);
+            search: paieškos puslapio trukmė su įjungtu ir išjungtu ribojimu.
+
+        Jei leidžiamos užklausos kaina viršija --budget-us, komanda baigiasi klaida.
+        Pabaigoje patikrinama, kad viršijus ribą grąžinamas 429 su Retry-After."""
+
+    help = 'Benchmarks the per-request overhead of the rate limiting middleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--budget-us', type=float, default=100,
+                            help='Maximum overhead of an allowed, rate limited request in microseconds.')
+
+    def handle(self, *args, **options):
+        middleware = RateLimitMiddleware(lambda request: None)
+        factory = RequestFactory()
+
+        def per_call(url, rule):
+            # Kiekvienam matavimui naujas IP, kad kibirai nesidalytų ir podėlio valyti nereikėtų.
+            request = factory.get(url, REMOTE_ADDR=f"bench-{uuid.uuid4().hex}")
+            request.resolver_match = resolve(request.path)
+            urls.ratelimits['search'] = rule
+            start = time.perf_counter()
+            for _ in range(options['iterations']):
+                middleware.process_view(request, None, (), {})
+            return (time.perf_counter() - start) * 1e6 / options['iterations']
+
+        original = urls.ratelimits['search']
+        try:
+            results = {
+                'no rule': per_call(reverse('dresses-all'), original),
+                'allowed': per_call(reverse('search'), Rate('1000000000/s')),
+                'rejected': per_call(reverse('search'), Rate('1/d')),
+            }
+            self.stdout.write(f"process_view ({settings.CACHES[settings.RATELIMIT_CACHE]['BACKEND']})")
+            for label, microseconds in results.items():
+                self.stdout.write(f"    {label:<10} {microseconds:8.2f} us")
+
+            with rolled_back():
+                seed_catalog()
+                user = seed_users(1, prefix='bench_rl')[0]
+                search = reverse('search') + '?search_text=red'
+                urls.ratelimits['search'] = Rate('1000000000/s')
+                client = make_client(user)
+                enabled_ms, _ = measure(lambda: client.get(search), options['repeat'])
+                with override_settings(RATELIMIT_ENABLED=False):
+                    client = make_client(user)
+                    disabled_ms, _ = measure(lambda: client.get(search), options['repeat'])
+                self.stdout.write(f"search page: {enabled_ms:.2f} ms with rate limiting, "
+                                  f"{disabled_ms:.2f} ms without")
+
+                urls.ratelimits['search'] = Rate('60/m', burst=5)
+                client = make_client(user)
+                client.defaults['REMOTE_ADDR'] = f"bench-{uuid.uuid4().hex}"
+                responses = [client.get(search) for _ in range(8)]
+                statuses = [response.status_code for response in responses]
+                self.stdout.write(f"60/m, burst 5, 8 requests: {statuses}, "
+                                  f"Retry-After {responses[-1].headers.get('Retry-After')}")
+                if statuses.count(429) != 3:
+                    raise CommandError('Expected the last 3 requests to be rejected.')
+        finally:
+            urls.ratelimits['search'] = original
+
+        if results['allowed'] > options['budget_us']:
+            raise CommandError(f"Rate limiting costs {results['allowed']:.1f} us per request, "
+                               f"budget is {options['budget_us']:.0f} us")
+        self.stdout.write(self.style.SUCCESS('Rate limiting overhead is within budget.'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from dresscode.benchmarks import rolled_back
+from dresscode.registration import register
+
+
+class Command(BaseCommand):
+    """ Matuoja registracijos pralaidumą (registracijų per sekundę) ir užklausų skaičių vienai registracijai.
+
+        Vartotojai kuriami transakcijoje, kuri pabaigoje atšaukiama.
+        Su --hasher galima nurodyti kitą slaptažodžių maišos klasę, pvz.
+        django.contrib.auth.hashers.MD5PasswordHasher, kad būtų matuojama tik duomenų bazės dalis."""
+
+    help = 'Benchmarks sign-up throughput of the registration service.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100)
+        parser.add_argument('--hasher', help='Dotted path of the password hasher to use.')
+
+    def handle(self, *args, **options):
+        hashers = {'PASSWORD_HASHERS': [options['hasher']]} if options['hasher'] else {}
+        with override_settings(**hashers), rolled_back(), CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for i in range(options['count']):
+                register(username=f'bench_signup_{i}', email=f'bench_signup_{i}@example.com',
+                         password='bench-password', iban=f'LT{i:018d}')
+            elapsed = time.perf_counter() - start
+
+        count = options['count']
+        self.stdout.write(f"Sign-ups: {count} in {elapsed:.2f} s ({count / elapsed:.1f}/s), "
+                          f"{len(queries) / count:.1f} queries per sign-up")
@@ -0,0 +1,71 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from dresscode.loadtest import load, serve
+from dresscode.models import Designer, Dress
+
+
+class Command(BaseCommand):
+    """ Apkrovos testas keliems darbiniams procesams: matuoja, kaip pralaidumas (užklausos per sekundę)
+        auga didinant procesų skaičių.
+
+        Kiekvienas darbinis procesas turi savo WSGI serverį (kaip atskiri serveriai už apkrovos
+        balansavimo įrenginio), o klientų procesai užklausas paskirsto tarp jų paeiliui.
+        Procesai dalijasi tik duomenų baze, podėliu ir media katalogu, todėl tiesinis augimas
+        rodo, kad darbiniai procesai nelaiko būsenos. Puslapiai tik skaitomi, duomenys nekeičiami.
+        Rezultatai tikslesni su DJANGO_DEBUG=0 ir bendru podėliu (DJANGO_CACHE_BACKEND)."""
+
+    help = 'Load-tests 1..N worker processes and reports throughput scaling.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--clients-per-worker', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--port', type=int, default=18000)
+
+    def handle(self, *args, **options):
+        dress = Dress.objects.order_by('id').first()
+        designer = Designer.objects.order_by('id').first()
+        if dress is None or designer is None:
+            raise CommandError('The database needs at least one dress and designer.')
+        paths = [reverse('dresses-all'), reverse('dress-one', args=(dress.pk,)),
+                 reverse('designers-all'), reverse('designer-one', args=(designer.pk,))]
+        connections.close_all()
+
+        context = multiprocessing.get_context()
+        baseline = None
+        self.stdout.write(f"{'workers':>7} {'clients':>7} {'req/s':>9} {'errors':>7} {'scaling':>8}")
+        for workers in options['workers']:
+            ports = [options['port'] + i for i in range(workers)]
+            servers = []
+            for port in ports:
+                ready = context.Event()
+                process = context.Process(target=serve, args=(port, ready), daemon=True)
+                process.start()
+                servers.append((process, ready))
+            try:
+                for process, ready in servers:
+                    if not ready.wait(30):
+                        raise CommandError('Worker did not start.')
+                urls = [f"http://127.0.0.1:{port}{path}" for path in paths for port in ports]
+                load(urls, 0.5)  # įšildymas
+
+                clients = workers * options['clients_per_worker']
+                with context.Pool(clients) as pool:
+                    start = time.perf_counter()
+                    results = pool.starmap(load, [(urls[i:] + urls[:i], options['duration']) for i in range(clients)])
+                    elapsed = time.perf_counter() - start
+            finally:
+                for process, _ in servers:
+                    process.terminate()
+                    process.join()
+
+            throughput = sum(done for done, _ in results) / elapsed
+            errors = sum(failed for _, failed in results)
+            baseline = baseline or throughput / workers
+            self.stdout.write(f"{workers:>7} {clients:>7} {throughput:>9.1f} {errors:>7} "
+                              f"{throughput / (baseline * workers):>7.0%}")
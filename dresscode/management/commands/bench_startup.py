@@ -0,0 +1,83 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': 'import mainproject.wsgi',
+}
+
+
+def parse_importtime(output):
+    """Iš -X importtime išvesties grąžina {modulis: (savas laikas, bendras laikas)} mikrosekundėmis."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_target(code, preload):
+    """Paleidžia naują Python procesą su -X importtime. Grąžina (trukmė ms, importų laikai)."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'mainproject.settings'),
+               DJANGO_PRELOAD='1' if preload else '0')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR, env=env,
+                            capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(result.stderr)
+
+
+class Command(BaseCommand):
+    """ Matuoja proceso paleidimo trukmę (django.setup() ir mainproject.wsgi importą) naujuose procesuose.
+
+        Parodo daugiausiai laiko užimančius importus ir patikrina, ar paleidimas telpa į --budget-ms,
+        o sunkios bibliotekos (--forbid, pvz. PIL) neimportuojamos paleidžiant django.setup().
+        Jei biudžetas viršijamas, komanda baigiasi klaida, todėl ją galima naudoti CI."""
+
+    help = 'Measures cold-start time with -X importtime and checks it against a budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--budget-ms', type=float, default=1000,
+                            help='Maximum median django.setup() time in milliseconds (default: 1000).')
+        parser.add_argument('--forbid', nargs='*', default=['PIL', 'numpy'],
+                            help='Top-level packages that must not be imported by django.setup().')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--preload', action='store_true',
+                            help='Run the wsgi preload hook when measuring mainproject.wsgi.')
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, code in TARGETS.items():
+            runs = [run_target(code, options['preload']) for _ in range(options['repeat'])]
+            results[label] = statistics.median(ms for ms, _ in runs), runs[-1][1]
+
+        for label, (median_ms, modules) in results.items():
+            self.stdout.write(f"{label:<6} median {median_ms:8.1f} ms, {len(modules)} modules imported")
+            packages = defaultdict(int)
+            for name, (self_us, _) in modules.items():
+                packages[name.split('.')[0]] += self_us
+            for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+                self.stdout.write(f"    {package:<30} {self_us / 1000:8.1f} ms")
+
+        errors = []
+        setup_ms, setup_modules = results['setup']
+        if setup_ms > options['budget_ms']:
+            errors.append(f"django.setup() takes {setup_ms:.1f} ms, budget is {options['budget_ms']:.0f} ms")
+        forbidden = sorted({name.split('.')[0] for name in setup_modules} & set(options['forbid']))
+        if forbidden:
+            errors.append(f"django.setup() imports {', '.join(forbidden)}")
+        if errors:
+            raise CommandError('; '.join(errors))
+        self.stdout.write(self.style.SUCCESS('Startup is within budget.'))
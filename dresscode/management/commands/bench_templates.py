@@ -0,0 +1,74 @@
+import copy
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from dresscode import profiling
+from dresscode.benchmarks import make_client, measure, rolled_back, seed_catalog, seed_users
+from dresscode.models import DressReview
+from dresscode.versions import bump_version
+
+
+def uncached_templates():
+    """Grąžina TEMPLATES nustatymą be cached.Loader, kad šablonai būtų kompiliuojami kiekvieną kartą."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        loaders = engine['OPTIONS'].get('loaders', [])
+        engine['OPTIONS']['loaders'] = [loader for entry in loaders
+                                        for loader in (entry[1] if isinstance(entry, tuple) else [entry])]
+    return templates
+
+
+class Command(BaseCommand):
+    """ Matuoja puslapių atvaizdavimo trukmę trimis režimais:
+
+            uncached loader: šablonai kompiliuojami kiekvienos užklausos metu, fragmentų podėlis tuščias;
+            cached loader: šablonai laikomi atmintyje, fragmentų podėlis tuščias;
+            fragments: šablonai atmintyje, suknelių kortelės ir atsiliepimai imami iš podėlio.
+
+        Pabaigoje parodomi šablonai, kurių atvaizdavimas užtrunka ilgiausiai."""
+
+    help = 'Benchmarks page rendering with and without the cached loader and fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            dresses = seed_catalog()
+            user = seed_users(1, prefix='bench_tpl')[0]
+            dress = dresses[0]
+            DressReview.objects.bulk_create([DressReview(dress=dress, reviewer=user, content=f'Review {i} ' * 20)
+                                             for i in range(options['reviews'])])
+            client = make_client(user)
+            pages = {
+                'dresses': reverse('dresses-all'),
+                'dress': reverse('dress-one', args=(dress.pk,)),
+            }
+
+            def cold(url):
+                def request():
+                    bump_version('catalog')
+                    bump_version(f'reviews:{dress.pk}')
+                    client.get(url)
+                return request
+
+            self.stdout.write(f"{'page':<10} {'mode':<16} {'ms':>8} {'queries':>8}")
+            for label, url in pages.items():
+                results = []
+                with override_settings(TEMPLATES=uncached_templates()):
+                    results.append(('uncached loader', measure(cold(url), repeat=options['repeat'])))
+                results.append(('cached loader', measure(cold(url), repeat=options['repeat'])))
+                results.append(('fragments', measure(lambda: client.get(url), repeat=options['repeat'])))
+                for mode, (ms, queries) in results:
+                    gain = results[0][1][0] / ms if ms else 0
+                    self.stdout.write(f"{label:<10} {mode:<16} {ms:>8.1f} {queries:>8}  x{gain:.1f}")
+
+                profiling.install()
+                with profiling.profile_templates() as stats:
+                    cold(url)()
+                for name, count, total, self_ms in stats.rows()[:5]:
+                    self.stdout.write(f"    {name:<40} {count:>4} renders {total:>8.1f} ms {self_ms:>8.1f} ms self")
@@ -0,0 +1,54 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import ProtectedError
+
+from dresscode.deletion import bulk_delete, count_related
+
+
+class Command(BaseCommand):
+    """ Ištrina įrašus (pvz. dizainerį su visomis suknelėmis ar vartotoją su jo duomenimis)
+        dalimis tiesioginėmis užklausomis, neįkeliant susijusių įrašų į atmintį.
+
+        Pavyzdžiai:
+            manage.py bulk_delete dresscode.Designer 12
+            manage.py bulk_delete auth.User 5 6 7 --dry-run
+
+        Kiekviena --chunk-size dalis trinama atskiroje transakcijoje, po kiekvienos parodoma eiga.
+        Nutraukus komandą, ją galima paleisti iš naujo - jau ištrinti įrašai praleidžiami."""
+
+    help = 'Deletes objects and everything that cascades from them in chunked raw DELETE/UPDATE statements.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Model label, e.g. dresscode.Designer or auth.User.')
+        parser.add_argument('pks', nargs='+', help='Primary keys of the objects to delete.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted.')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        queryset = model._base_manager.filter(pk__in=options['pks'])
+
+        counts = count_related(queryset)
+        for related_model, count in counts.most_common():
+            self.stdout.write(f"{related_model._meta.label:<30} {count:>10}")
+        if options['dry_run'] or not counts:
+            return
+
+        start = time.perf_counter()
+
+        def progress(stats):
+            done = sum(count for label, count in stats.items() if not label.endswith('(set null)'))
+            self.stdout.write(f"{time.perf_counter() - start:7.1f}s  deleted {done} rows")
+
+        try:
+            stats = bulk_delete(queryset, options['chunk_size'], progress)
+        except ProtectedError as error:
+            raise CommandError(error.args[0])
+        for label, count in sorted(stats.items()):
+            self.stdout.write(f"{label:<40} {count:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - start:.1f}s."))
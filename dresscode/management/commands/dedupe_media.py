@@ -0,0 +1,73 @@
+import os
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dresscode.prerender import prerenderer
+from dresscode.storage import hashed_file_fields
+from dresscode.versions import bump_version
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{64}(\.[^./]*)?$')
+
+
+class Command(BaseCommand):
+    """ Perskaičiuoja seniau įkeltų media failų turinio maišą ir sujungia vienodo turinio failus.
+
+        Failai, įkelti prieš įdiegiant ContentHashStorage, turi įkėlimo pavadinimus, todėl ta pati
+        nuotrauka diske gali būti kelis kartus. Kiekvienas įrašų naudojamas failas, kurio pavadinimas
+        dar nėra turinio maiša, įrašomas maišos pavadinimu (jei tokio failo dar nėra), įrašai
+        perjungiami į jį, o senas failas ištrinamas, kai į jį nebenurodo joks įrašas.
+        Laukų numatytosios reikšmės (pvz. default-user.png) nekeičiamos. Komandą galima kartoti."""
+
+    help = 'Renames legacy media files to their content hash and merges duplicates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be renamed or merged.')
+
+    def handle(self, *args, **options):
+        renamed, merged, missing, freed = 0, 0, 0, 0
+        planned = set()  # --dry-run: maišų pavadinimai, kurie jau būtų sukurti
+        for field in hashed_file_fields():
+            storage = field.storage
+            names = (field.model._default_manager
+                     .exclude(**{field.name: ''})
+                     .exclude(**{f"{field.name}__isnull": True})
+                     .order_by().values_list(field.name, flat=True).distinct())
+            for name in list(names):
+                if name == field.default or HASHED_NAME_RE.match(os.path.basename(name)):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"Missing: {name}")
+                    continue
+                size = storage.size(name)
+                with storage.open(name) as content:
+                    new_name = storage.hashed_name(name, content)
+                    duplicate = new_name in planned or storage.exists(new_name)
+                    if not options['dry_run'] and not duplicate:
+                        storage.save(name, content)
+                planned.add(new_name)
+                if duplicate:
+                    merged += 1
+                else:
+                    renamed += 1
+                self.stdout.write(f"{'Merge' if duplicate else 'Rename'}: {name} -> {new_name}")
+                if options['dry_run']:
+                    continue
+                with transaction.atomic():
+                    for other in hashed_file_fields():
+                        if other.storage is storage:
+                            other.model._default_manager.filter(**{other.name: name}).update(**{other.name: new_name})
+                storage.delete(name)
+                if not storage.exists(name):
+                    freed += size if duplicate else 0
+
+        if (renamed or merged) and not options['dry_run']:
+            bump_version('catalog')  # kortelėse ir puslapiuose yra senų failų URL
+            prerenderer.invalidate_all()
+        action = 'Would rename' if options['dry_run'] else 'Renamed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {renamed} files, merged {merged} duplicates ({freed / 1024:.1f} KiB freed), "
+            f"{missing} missing files."))
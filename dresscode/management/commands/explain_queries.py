@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dresscode.query_plans import check_plans
+
+
+class Command(BaseCommand):
+    """ Vykdo EXPLAIN kiekvienai registruotai dažnai užklausai (dresscode/query_plans.py)
+        ir praneša apie užklausas, kurios skaito visą lentelę vietoje indekso.
+
+        Jei randama tokių užklausų, komanda baigiasi klaida, todėl ją galima naudoti CI."""
+
+    help = 'Runs EXPLAIN on the hot queries of every view and flags full table scans.'
+
+    def handle(self, *args, **options):
+        flagged = 0
+        for name, plan, scans in check_plans():
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(f"SCAN  {name}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f"ok    {name}")
+            if scans or options['verbosity'] > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+        if flagged:
+            raise CommandError(f'{flagged} queries read whole tables.')
@@ -0,0 +1,64 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from dresscode.storage import content_hash_storage, hashed_file_fields, reference_counts
+
+
+def iter_files(root):
+    """Po vieną grąžina visų katalogo medžio failų kelius, neįkeliant viso sąrašo į atmintį."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class Command(BaseCommand):
+    """ Ištrina media failus, į kuriuos nerodo nė vienas duomenų bazės įrašas.
+
+        Peržiūrimi tik tų laukų katalogai, kurie naudoja ContentHashStorage
+        (pvz. designers_pics, dresses_pics, profile_pics). Ką tik įkelti failai
+        (jaunesni nei --min-age sekundžių) praleidžiami, nes jų įrašas dar gali būti nesukurtas."""
+
+    help = 'Removes orphaned media files that are not referenced by any model.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list orphaned files, do not delete them.')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Skip files younger than this many seconds (default: 3600).')
+
+    def handle(self, *args, **options):
+        counts = reference_counts()
+        shared = sum(1 for count in counts.values() if count > 1)
+        self.stdout.write(f"Referenced files: {len(counts)}, shared by several records: {shared}")
+
+        upload_dirs = sorted({field.upload_to for field in hashed_file_fields()
+                              if isinstance(field.upload_to, str)})
+        cutoff = time.time() - options['min_age']
+        removed = 0
+        freed = 0
+
+        for upload_dir in upload_dirs:
+            root = content_hash_storage.path(upload_dir)
+            if not os.path.isdir(root):
+                continue
+            for entry in iter_files(root):
+                name = os.path.relpath(entry.path, content_hash_storage.location).replace(os.sep, '/')
+                if name in counts:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if options['dry_run']:
+                    self.stdout.write(f"Orphan: {name}")
+                else:
+                    os.remove(entry.path)
+
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{action} {removed} files ({freed / 1024:.1f} KiB)"))
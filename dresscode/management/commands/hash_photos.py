@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from dresscode.models import Dress
+from dresscode.photohash import photo_index, stored_photo_hashes
+
+
+class Command(BaseCommand):
+    """ Apskaičiuoja suknelių nuotraukų dHash ir pHash toms suknelėms, kurioms jų dar nėra
+        (su --all - visoms), ir parodo panašių nuotraukų poras.
+
+        Nuotraukos skaitomos ir hash'ai skaičiuojami --workers lygiagrečiuose procesuose
+        (numatytai tiek, kiek procesoriaus branduolių), kurie duomenų bazės nenaudoja.
+        Rezultatai įrašomi pagrindiniame procese --batch-size dydžio bulk_update užklausomis,
+        todėl nutrauktą komandą galima paleisti iš naujo. Naujai įkeltų nuotraukų hash'ai
+        apskaičiuojami išsaugant suknelę."""
+
+    help = 'Computes perceptual hashes of dress photos in parallel and reports near-duplicate photos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute hashes that are already stored.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-distance', type=int, default=None,
+                            help='Report pairs within this many bits (default PHOTO_HASH_MAX_DISTANCE).')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        dresses = Dress.objects.exclude(Q(dresses_pics='') | Q(dresses_pics__isnull=True))
+        if not options['all']:
+            dresses = dresses.filter(Q(photo_dhash__isnull=True) | Q(photo_phash__isnull=True))
+        tasks = list(dresses.order_by('id').values_list('id', 'dresses_pics'))
+
+        hashed = failed = 0
+        batch = []
+        for pk, dhash, phash in self.hash(tasks, options['workers']):
+            if phash is None:
+                failed += 1
+                self.stderr.write(f"Dress {pk}: photo could not be read")
+                continue
+            batch.append(Dress(pk=pk, photo_dhash=dhash, photo_phash=phash))
+            if len(batch) >= options['batch_size']:
+                hashed += self.save(batch)
+                batch = []
+        hashed += self.save(batch)
+        photo_index.invalidate()
+        self.stdout.write(f"Hashed {hashed} of {len(tasks)} photos ({failed} unreadable) "
+                          f"with {options['workers']} workers in {time.perf_counter() - start:.1f}s.")
+
+        pairs = photo_index.pairs(options['max_distance'])
+        dresses = Dress.objects.only('item_code', 'dresses_pics').in_bulk({pk for pair in pairs for pk in pair[:2]})
+        for first, second, phash_distance, dhash_distance in pairs:
+            self.stdout.write(f"{dresses[first].item_code:<10} {dresses[second].item_code:<10} "
+                              f"pHash {phash_distance:>2}  dHash {dhash_distance:>2}  "
+                              f"{dresses[first].dresses_pics.name}  {dresses[second].dresses_pics.name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(pairs)} near-duplicate photo pairs."))
+
+    @staticmethod
+    def hash(tasks, workers):
+        if workers <= 1 or len(tasks) <= 1:
+            return map(stored_photo_hashes, tasks)
+        # Darbiniai procesai atsišakoja nuo šio, todėl atviros jungtys uždaromos.
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+
+        def results():
+            with pool:
+                yield from pool.imap_unordered(stored_photo_hashes, tasks,
+                                               chunksize=max(1, len(tasks) // (workers * 8)))
+        return results()
+
+    @staticmethod
+    def save(batch):
+        Dress.objects.bulk_update(batch, ['photo_dhash', 'photo_phash'])
+        return len(batch)
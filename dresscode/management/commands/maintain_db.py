@@ -0,0 +1,102 @@
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dresscode import maintenance
+
+logger = logging.getLogger('dresscode.maintenance')
+
+STEPS = ('check', 'backup', 'analyze', 'vacuum')
+
+
+class Command(BaseCommand):
+    """ SQLite duomenų bazės priežiūra, kurią galima vykdyti svetainei veikiant.
+
+            check:   PRAGMA quick_check (--full-check - integrity_check) ir foreign_key_check;
+            backup:  kopija į DB_BACKUP_DIR online backup API po --pages puslapių (žr.
+                     dresscode.maintenance.backup), paliekamos --keep naujausios kopijos;
+            analyze: ANALYZE, kai statistikos dar nėra, vėliau PRAGMA optimize;
+            vacuum:  inkrementinis VACUUM po --vacuum-pages puslapių ir WAL checkpoint.
+
+        Be argumentų vykdomi visi žingsniai. Pabaigoje parodoma, kiek kiekvienas žingsnis
+        laukė užrakto ir kiek jį laikė (ilgiausias laikymas - kiek galėjo laukti rašytojai).
+        Pavyzdžiui, cron kiekvieną naktį:
+
+            30 3 * * *  cd /srv/dresscode && python manage.py maintain_db
+
+        Radus vientisumo problemų, komanda baigiasi klaida (kopija tada nedaroma)."""
+
+    help = 'Checks, backs up, analyzes and incrementally vacuums the SQLite database without stopping the site.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('steps', nargs='*', help=f"Steps to run: {', '.join(STEPS)} (default: all).")
+        parser.add_argument('--backup-dir', default=settings.DB_BACKUP_DIR)
+        parser.add_argument('--keep', type=int, default=7, help='Number of backups to keep.')
+        parser.add_argument('--pages', type=int, default=256, help='Pages copied per backup step.')
+        parser.add_argument('--pause', type=float, default=0.01, help='Seconds between backup/vacuum steps.')
+        parser.add_argument('--vacuum-pages', type=int, default=256)
+        parser.add_argument('--full-check', action='store_true', help='Run integrity_check instead of quick_check.')
+        parser.add_argument('--full-analyze', action='store_true', help='Run ANALYZE even if statistics exist.')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch to auto_vacuum=INCREMENTAL (runs one full, blocking VACUUM).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('maintain_db only supports SQLite; use pg_dump and autovacuum for PostgreSQL.')
+        steps = options['steps'] or STEPS
+        unknown = set(steps) - set(STEPS)
+        if unknown:
+            raise CommandError(f"Unknown steps: {', '.join(sorted(unknown))}. Choose from {', '.join(STEPS)}.")
+        connection.ensure_connection()
+        raw = connection.connection
+        metrics = maintenance.LockMetrics()
+        start = time.perf_counter()
+
+        if 'check' in steps:
+            problems = maintenance.integrity_check(raw, metrics, full=options['full_check'])
+            for problem in problems:
+                self.stderr.write(problem)
+            if problems:
+                self.report(metrics)
+                raise CommandError(f"Integrity check found {len(problems)} problems.")
+            self.stdout.write('Integrity check: ok')
+
+        if 'backup' in steps:
+            directory = Path(options['backup_dir'])
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / maintenance.backup_name()
+            size = maintenance.backup(raw, path, metrics, pages=options['pages'], pause=options['pause'])
+            removed = maintenance.rotate_backups(directory, options['keep'])
+            self.stdout.write(f"Backup: {path} ({size / 1e6:.1f} MB), removed {len(removed)} old backups")
+
+        if 'analyze' in steps:
+            done = maintenance.analyze(raw, metrics, full=options['full_analyze'])
+            self.stdout.write(f"Statistics: {done}")
+
+        if 'vacuum' in steps:
+            mode = maintenance.auto_vacuum_mode(raw)
+            if mode != 'incremental' and options['enable_incremental_vacuum']:
+                maintenance.enable_incremental_vacuum(raw, metrics)
+                mode = maintenance.auto_vacuum_mode(raw)
+            if mode == 'incremental':
+                freed = maintenance.incremental_vacuum(raw, metrics, pages=options['vacuum_pages'],
+                                                       pause=options['pause'])
+                self.stdout.write(f"Incremental vacuum: freed {freed} pages")
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"Incremental vacuum skipped: auto_vacuum is {mode}, "
+                    f"run once with --enable-incremental-vacuum at a quiet time."))
+
+        self.report(metrics)
+        self.stdout.write(self.style.SUCCESS(f"Maintenance done in {time.perf_counter() - start:.1f}s."))
+
+    def report(self, metrics):
+        self.stdout.write(f"{'step':<26} {'count':>6} {'waited ms':>10} {'held ms':>10} {'max held ms':>12}")
+        for name, count, waited, held, max_held in metrics.rows():
+            self.stdout.write(f"{name:<26} {count:>6} {waited:>10.1f} {held:>10.1f} {max_held:>12.1f}")
+            logger.info('maintain_db %s: %d times, waited %.1f ms, held %.1f ms (max %.1f ms)',
+                        name, count, waited, held, max_held)
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from dresscode.prerender import PRERENDERED_URLS, all_pages, page_file, pages_of, render_page
+
+
+def render_task(task):
+    path, page = task
+    return path, page, render_page(path, page)
+
+
+class Command(BaseCommand):
+    """ Atvaizduoja viešus katalogo puslapius (dizainerių ir suknelių sąrašai bei puslapiai)
+        į PRERENDER_ROOT katalogą, iš kurio juos neprisijungusiems vartotojams atiduoda
+        PrerenderedPageMiddleware arba priekinis serveris.
+
+        Pavyzdžiai:
+            manage.py prerender                      visi puslapiai, pasenę failai pašalinami
+            manage.py prerender --missing            tik puslapiai, kurių failų nėra
+            manage.py prerender /dresscode/dresses/5 tik nurodyti keliai
+
+        Puslapiai atvaizduojami --workers lygiagrečiuose procesuose (numatytai tiek, kiek
+        procesoriaus branduolių). Pakeitimų paveikti puslapiai signalais pašalinami ir
+        atvaizduojami iš naujo, todėl --missing užtenka paleisti periodiškai, pvz. cron."""
+
+    help = 'Renders the public catalog pages to static HTML files in PRERENDER_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Only render these URL paths (all of their pages).')
+        parser.add_argument('--missing', action='store_true', help='Only render pages that have no file.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['paths']:
+            for path in options['paths']:
+                try:
+                    url_name = resolve(path).url_name
+                except Resolver404:
+                    url_name = None
+                if url_name not in PRERENDERED_URLS:
+                    raise CommandError(f"{path} is not a prerendered page.")
+            tasks = [(path, page) for path in options['paths'] for page in pages_of(path)]
+        else:
+            tasks = all_pages()
+        if options['missing']:
+            tasks = [(path, page) for path, page in tasks if not page_file(path, page).exists()]
+
+        rendered = total = 0
+        for path, page, size in self.render(tasks, options['workers']):
+            if size is not None:
+                rendered += 1
+                total += size
+        self.stdout.write(f"Rendered {rendered} of {len(tasks)} pages ({total / 1e6:.1f} MB) "
+                          f"with {options['workers']} workers in {time.perf_counter() - start:.1f}s.")
+
+        if not options['paths'] and not options['missing']:
+            removed = self.prune({page_file(path, page) for path, page in tasks})
+            if removed:
+                self.stdout.write(f"Removed {removed} stale pages.")
+        self.stdout.write(self.style.SUCCESS(f"Pages are in {settings.PRERENDER_ROOT}."))
+
+    @staticmethod
+    def render(tasks, workers):
+        if workers <= 1 or len(tasks) <= 1:
+            return map(render_task, tasks)
+        # Darbiniai procesai atsišakoja nuo šio, todėl atviros jungtys uždaromos - kiekvienas atsidaro savo.
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+
+        def results():
+            with pool:
+                yield from pool.imap_unordered(render_task, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+        return results()
+
+    @staticmethod
+    def prune(current):
+        """Pašalina puslapius, kurių nebėra (ištrinti įrašai, sumažėjęs puslapių skaičius)."""
+        removed = 0
+        for file in Path(settings.PRERENDER_ROOT).rglob('*.html'):
+            if file not in current:
+                file.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from dresscode.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    """ Perskaičiuoja rekomendacijas "Kartu su šia suknele dar nuomojosi".
+
+        Iš nuomos istorijos sudaroma reta vartotojų ir suknelių matrica, o kiekvienai suknelei
+        su NumPy apskaičiuojamos panašiausios suknelės pagal bendrus nuomininkus. Rezultatai
+        įrašomi į DressRecommendation lentelę, todėl puslapiui nieko skaičiuoti nereikia.
+        Paprastai perskaičiuojamos tik naujų nuomų paveiktos suknelės; --full perskaičiuoja visas."""
+
+    help = 'Rebuilds the precomputed "customers also rented" recommendations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=6, help='Recommendations per dress (default: 6).')
+        parser.add_argument('--min-common', type=int, default=1,
+                            help='Minimum number of shared renters (default: 1).')
+        parser.add_argument('--full', action='store_true', help='Recompute every dress, not only changed ones.')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        updated = refresh_recommendations(options['top_k'], options['min_common'], options['full'],
+                                          options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated recommendations for {updated} dresses."))
@@ -0,0 +1,112 @@
+import heapq
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dresscode.models import ArchivedDressRental, DressRental, RentalEvent
+
+UPDATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """ Atkuria nuomų būseną iš RentalEvent žurnalo ir apskaičiuoja laiką kiekviename statuse.
+
+        Įvykiai skaitomi srautu pagal nuomą (indeksas rental_id, id), o kartu ta pačia tvarka
+        skaitomos DressRental ir ArchivedDressRental lentelės, todėl atmintyje laikomi tik vienos
+        nuomos įvykiai ir statistika, nepriklausomai nuo įvykių skaičiaus.
+
+        Atkurta būsena palyginama su lentelėmis. Su --apply nesutampantys DressRental statusai
+        pakeičiami atkurtais (be signalų, todėl nauji įvykiai neįrašomi).
+        Laikas skaičiuojamas tik tarp žinomų įvykių: intervalai, prasidėję 'snapshot' įvykiu
+        (nuomos, buvusios iki žurnalo įdiegimo), neįskaitomi."""
+
+    help = 'Replays the rental event log to rebuild rental state and time-in-status metrics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true',
+                            help='Update DressRental.status where it differs from the replayed state.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        events = (RentalEvent.objects.order_by('rental_id', 'id')
+                  .values_list('rental_id', 'kind', 'status', 'created_at').iterator(chunk_size=chunk_size))
+        rentals = heapq.merge(
+            DressRental.objects.order_by('id').values_list('id', 'status').iterator(chunk_size=chunk_size),
+            ArchivedDressRental.objects.order_by('rental_id').values_list('rental_id', 'status')
+            .iterator(chunk_size=chunk_size))
+
+        durations = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+        open_ages = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+        transitions = Counter()
+        totals = Counter()
+        fixes = defaultdict(list)
+
+        current = next(rentals, None)
+        for rental_id, rental_events in groupby(events, key=lambda event: event[0]):
+            while current is not None and current[0] < rental_id:
+                totals['unlogged'] += 1
+                current = next(rentals, None)
+
+            previous = None
+            for _, kind, status, created_at in rental_events:
+                totals['events'] += 1
+                if previous is not None:
+                    transitions[previous[1], status] += 1
+                    if previous[0] != 'snapshot':
+                        self.add(durations[previous[1]], (created_at - previous[2]).total_seconds())
+                previous = (kind, status, created_at)
+            totals['rentals'] += 1
+            if previous[1] in DressRental.ACTIVE_STATUSES and previous[0] != 'snapshot':
+                self.add(open_ages[previous[1]], (now - previous[2]).total_seconds())
+
+            if current is None or current[0] != rental_id:
+                totals['deleted'] += 1
+                continue
+            if current[1] != previous[1]:
+                totals['mismatched'] += 1
+                if options['apply']:
+                    fixes[previous[1]].append(rental_id)
+                    if len(fixes[previous[1]]) >= UPDATE_BATCH_SIZE:
+                        self.apply(previous[1], fixes.pop(previous[1]))
+            current = next(rentals, None)
+        while current is not None:
+            totals['unlogged'] += 1
+            current = next(rentals, None)
+
+        for status, rental_ids in fixes.items():
+            self.apply(status, rental_ids)
+
+        self.stdout.write(f"{'status':<10} {'intervals':>9} {'avg h':>9} {'max h':>9} "
+                          f"{'open now':>9} {'open avg h':>10}")
+        for status, _ in DressRental.RENTAL_STATUS:
+            closed, current_open = durations[status], open_ages[status]
+            self.stdout.write(f"{status:<10} {closed['count']:>9} {self.average_hours(closed):>9.1f} "
+                              f"{closed['max'] / 3600:>9.1f} {current_open['count']:>9} "
+                              f"{self.average_hours(current_open):>10.1f}")
+        for (source, target), count in sorted(transitions.items()):
+            self.stdout.write(f"{source} -> {target}: {count}")
+        self.stdout.write(f"Replayed {totals['events']} events for {totals['rentals']} rentals; "
+                          f"{totals['mismatched']} status mismatches"
+                          f"{' fixed' if options['apply'] else ''}, {totals['deleted']} deleted rentals, "
+                          f"{totals['unlogged']} rentals without events.")
+
+    @staticmethod
+    def add(stats, seconds):
+        stats['count'] += 1
+        stats['total'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+
+    @staticmethod
+    def average_hours(stats):
+        return stats['total'] / stats['count'] / 3600 if stats['count'] else 0.0
+
+    @staticmethod
+    def apply(status, rental_ids):
+        """Nustato atkurtą statusą nuomoms, kurios dar yra DressRental lentelėje."""
+        with transaction.atomic():
+            DressRental.objects.filter(id__in=rental_ids).update(status=status)
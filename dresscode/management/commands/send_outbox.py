@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dresscode.mail import send_queued
+
+
+class Command(BaseCommand):
+    """ Išsiunčia OutboundEmail eilėje laukiančius laiškus.
+
+        Laiškai siunčiami dalimis per vieną pašto serverio jungtį. Be --once komanda veikia nuolat
+        ir, kai eilė tuščia, laukia --interval sekundžių.
+
+        Vietiniam testavimui galima paleisti derinimo SMTP serverį
+        (pip install aiosmtpd; python -m aiosmtpd -n -l localhost:1025) ir nustatyti
+        EMAIL_HOST=localhost, EMAIL_PORT=1025 arba naudoti
+        --backend django.core.mail.backends.console.EmailBackend."""
+
+    help = 'Sends queued outbound emails over one SMTP connection per batch, with retries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Send everything that is due and exit.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to wait when the queue is empty (default: 5).')
+        parser.add_argument('--batch-size', type=int,
+                            help='Emails per SMTP connection (default: OUTBOX_BATCH_SIZE).')
+        parser.add_argument('--backend', help='Email backend used for delivery (default: OUTBOX_EMAIL_BACKEND).')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options['batch_size'], options['backend'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+            if not sent:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,273 @@
+import fnmatch
+import logging
+import math
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+
+from . import prerender, profiling, ratelimit
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateProfilingMiddleware:
+    """ Matuoja kiekvieno šablono atvaizdavimo trukmę užklausos metu.
+
+        Įjungiama nustatymu TEMPLATE_PROFILING: tik tada Template._render apgaubiamas matavimo
+        funkcija (profiling.install). Rezultatai pridedami prie atsakymo
+        Server-Timing antraštės (matomi naršyklės kūrėjo įrankiuose) ir įrašomi į žurnalą."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILING:
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with profiling.profile_templates() as stats:
+            response = self.get_response(request)
+        return self.add_timings(request, response, stats)
+
+    async def __acall__(self, request):
+        with profiling.profile_templates() as stats:
+            response = await self.get_response(request)
+        return self.add_timings(request, response, stats)
+
+    @staticmethod
+    def add_timings(request, response, stats):
+        timings = []
+        for index, (name, count, total, self_ms) in enumerate(stats.rows()):
+            timings.append(f'tpl{index};desc="{name} x{count}";dur={self_ms:.1f}')
+            logger.debug('%s %s: %d renders, %.1f ms total, %.1f ms self',
+                         request.path, name, count, total, self_ms)
+        if timings:
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+class RateLimitMiddleware:
+    """ Riboja užklausų skaičių pagal URL pavadinimą (žetonų kibiras bendrame podėlyje).
+
+        Taisyklės aprašytos dresscode/urls.py žodyne ratelimits: {URL pavadinimas: Rate(...)}.
+        URL be taisyklės kainuoja tik vieną paiešką žodyne. Viršijus ribą grąžinamas
+        atsakymas 429 su Retry-After antrašte. Veikia ir WSGI, ir ASGI grandinėje.
+        Išjungiama nustatymu RATELIMIT_ENABLED."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.RATELIMIT_ENABLED:
+            raise MiddlewareNotUsed
+        from .urls import ratelimits
+        self.get_response = get_response
+        self.rules = ratelimits
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def rule(self, request):
+        rule = self.rules.get(request.resolver_match.url_name)
+        if rule is None or not rule.applies_to(request):
+            return None
+        return rule
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        rule = self.rule(request)
+        return None if rule is None else self.limit(request, rule)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        """ASGI versija: URL be taisyklės patikrinamas įvykių cikle, podėlis - sinchroninėje gijoje."""
+        rule = self.rule(request)
+        return None if rule is None else await sync_to_async(self.limit)(request, rule)
+
+    def limit(self, request, rule):
+        url_name = request.resolver_match.url_name
+        identity = rule.identity(request)
+        allowed, retry_after = ratelimit.consume(url_name, rule, identity)
+        if allowed:
+            return None
+        logger.info('Rate limit %s exceeded for %s on %s', rule.rate, identity, url_name)
+        response = HttpResponse('Too many requests, please try again later.', status=429,
+                                content_type='text/plain; charset=utf-8')
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+
+class AdmissionControlMiddleware:
+    """ Riboja, kiek užklausų vienu metu vykdoma kiekvienoje endpoint'ų grupėje (dresscode.admission.Pool).
+
+        Grupės ir peržiūrų priskyrimas joms aprašyti dresscode/urls.py (admission_pools,
+        admission_routes); nepriskirtos peržiūros patenka į 'default'. Kai grupės vietos užimtos,
+        užklausa laukia ribotoje eilėje; jei eilė pilna arba laukimo laikas baigėsi, iškart
+        grąžinamas atsakymas 503 su Retry-After, kad brangūs puslapiai neužimtų visų gijų ir
+        pigūs puslapiai nelauktų už jų. Prisijungusių vartotojų užklausos į admission_priority
+        peržiūras eilėje aplenkia kitas.
+
+        Vieta užimama process_view metu, kai URL jau išspręstas (request.resolver_match), ir
+        atlaisvinama grįžus atsakymui. Veikia ir WSGI (laukia gija), ir ASGI (laukia korutina;
+        visi šio projekto middleware palaiko asinchroninę grandinę). Išjungiama nustatymu ADMISSION_ENABLED."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.ADMISSION_ENABLED:
+            raise MiddlewareNotUsed
+        from .urls import admission_pools, admission_priority, admission_routes
+        self.get_response = get_response
+        self.pools = admission_pools
+        self.routes = admission_routes
+        self.priority_views = admission_priority
+        self.view_pools = {}
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def pool_name(self, view_name):
+        name = self.view_pools.get(view_name)
+        if name is None:
+            name = next((pool for pattern, pool in self.routes.items() if fnmatch.fnmatchcase(view_name, pattern)),
+                        'default')
+            self.view_pools[view_name] = name
+        return name
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.release(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self.release(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        name = self.pool_name(view_name)
+        priority = 0 if view_name in self.priority_views and request.user.is_authenticated else 1
+        return self.admit(request, name, self.pools[name].acquire(priority))
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        """ASGI versija: eilėje laukia korutina, gija neužimama."""
+        view_name = request.resolver_match.view_name
+        name = self.pool_name(view_name)
+        priority = 1
+        if view_name in self.priority_views and await sync_to_async(lambda: request.user.is_authenticated)():
+            priority = 0
+        return self.admit(request, name, await self.pools[name].acquire_async(priority))
+
+    def admit(self, request, name, admitted):
+        """Gavus vietą, įsimena ją užklausoje (atlaisvinama __call__ pabaigoje), kitaip grąžina 503."""
+        pool = self.pools[name]
+        if not admitted:
+            return self.reject(request, name, pool)
+        request._admission = (pool, time.perf_counter())
+        return None
+
+    @staticmethod
+    def release(request):
+        admission = request.__dict__.pop('_admission', None)
+        if admission is not None:
+            pool, start = admission
+            pool.release(time.perf_counter() - start)
+
+    @staticmethod
+    def reject(request, name, pool):
+        logger.info('Admission pool %s is full (%d active, %d queued), rejected %s',
+                    name, pool.active, pool.queued, request.path)
+        response = HttpResponse('The server is busy, please try again shortly.', status=503,
+                                content_type='text/plain; charset=utf-8')
+        response.headers['Retry-After'] = str(pool.retry_after())
+        return response
+
+
+class PrerenderedPageMiddleware:
+    """ Atiduoda iš anksto atvaizduotus katalogo puslapius (dresscode.prerender) iš PRERENDER_ROOT,
+        nevykdydamas rodinio ir neliesdamas duomenų bazės.
+
+        Puslapiai yra vieši (dresscode.views.public_page): asmenines dalis naršyklė įkelia
+        atskirai, todėl tas pats failas tinka visiems vartotojams. Failas atiduodamas
+        GET/HEAD užklausai be kitų parametrų nei page. Jei failo nėra, užklausą aptarnauja rodinys.
+        Veikia ir WSGI, ir ASGI grandinėje. Išjungiama nustatymu PRERENDER_ENABLED.
+
+        Tuos pačius failus gali atiduoti ir priekinis serveris, pvz. nginx:
+
+            location /dresscode/ {
+                set $page none;
+                if ($args ~ "^(page=1&?)?$") { set $page index.html; }
+                if ($args ~ "^page=([2-9]|[1-9][0-9]+)&?$") { set $page page-$1.html; }
+                if ($request_method !~ "^(GET|HEAD)$") { set $page none; }
+                try_files /prerendered$uri/$page @django;
+            }"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PRERENDER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    @staticmethod
+    def page(request):
+        """Puslapio numeris, jei užklausai tinka iš anksto atvaizduotas failas, kitaip None."""
+        if request.method not in ('GET', 'HEAD') or request.resolver_match.url_name not in prerender.PRERENDERED_URLS:
+            return None
+        if request.GET.keys() - {'page'}:
+            return None
+        page = request.GET.get('page') or '1'
+        if not page.isdigit() or int(page) < 1:
+            return None
+        return int(page)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        page = self.page(request)
+        return None if page is None else self.serve(request, page)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        """ASGI versija: failas skaitomas sinchroninėje gijoje, kitos užklausos įvykių ciklo neapleidžia."""
+        page = self.page(request)
+        return None if page is None else await sync_to_async(self.serve)(request, page)
+
+    @staticmethod
+    def serve(request, page):
+        try:
+            with open(prerender.page_file(request.path, page), 'rb') as file:
+                content = file.read()
+                modified = os.fstat(file.fileno()).st_mtime
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        response = HttpResponse(content, content_type='text/html; charset=utf-8')
+        response.headers['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PUBLIC_PAGE_MAX_AGE)
+        return response
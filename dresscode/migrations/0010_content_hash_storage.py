@@ -0,0 +1,29 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:29
+
+from django.db import migrations, models
+import dresscode.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0009_remove_dressrental_dress_size_delete_dresssize'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='designer',
+            name='designers_pics',
+            field=models.ImageField(blank=True, null=True, storage=dresscode.storage.ContentHashStorage(), upload_to='designers_pics', verbose_name='Photo'),
+        ),
+        migrations.AlterField(
+            model_name='dress',
+            name='dresses_pics',
+            field=models.ImageField(blank=True, null=True, storage=dresscode.storage.ContentHashStorage(), upload_to='dresses_pics', verbose_name='Photo'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='picture',
+            field=models.ImageField(default='default-user.png', storage=dresscode.storage.ContentHashStorage(), upload_to='profile_pics'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+from dresscode.sanitizer import sanitize_html
+
+BATCH_SIZE = 500
+
+
+def backfill_descriptions(apps, schema_editor):
+    """Užpildo išvalytą aprašymų HTML ir tekstą esamiems įrašams, apdorojant po BATCH_SIZE įrašų."""
+    for model_name in ('Designer', 'Dress'):
+        model = apps.get_model('dresscode', model_name)
+        last_pk = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk')
+                         .only('pk', 'description')[:BATCH_SIZE])
+            if not batch:
+                break
+            for obj in batch:
+                obj.description_html, obj.description_text = sanitize_html(obj.description)
+            model.objects.bulk_update(batch, ['description_html', 'description_text'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0010_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='designer',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='designer',
+            name='description_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='dress',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='dress',
+            name='description_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_descriptions, migrations.RunPython.noop),
+    ]
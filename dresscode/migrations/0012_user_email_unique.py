@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Unikalus el. pašto indeksas auth_user lentelei.
+    Tušti el. pašto adresai (pvz. administratorių) į indeksą neįtraukiami."""
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('dresscode', '0011_description_html'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX IF NOT EXISTS dresscode_user_email_uniq ON auth_user (email) WHERE email <> ''",
+            reverse_sql="DROP INDEX IF EXISTS dresscode_user_email_uniq",
+        ),
+    ]
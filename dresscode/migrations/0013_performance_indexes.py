@@ -0,0 +1,42 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('dresscode', '0012_user_email_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='designer',
+            index=models.Index(fields=['name', 'surname'], name='designer_name_surname_idx'),
+        ),
+        # Aktyvių statusų paieškoms tinka ir sudėtinis indeksas su status pirmu stulpeliu. Dalinio indekso
+        # (WHERE status IN (...)) SQLite nenaudotų, nes Django statusų sąrašą perduoda parametrais.
+        migrations.AddIndex(
+            model_name='dressrental',
+            index=models.Index(fields=['status', 'return_date'], name='rental_status_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dressrental',
+            index=models.Index(fields=['return_date'], name='rental_return_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dressrental',
+            index=models.Index(fields=['user', 'status'], name='rental_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dressreview',
+            index=models.Index(fields=['dress', '-date_created'], name='review_dress_created_idx'),
+        ),
+        # Dalinio unikalaus indekso (0012) SQLite negali naudoti užklausoje su parametru,
+        # todėl el. pašto paieškai registruojantis reikalingas ir paprastas indeksas.
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS dresscode_user_email_idx ON auth_user (email)",
+            reverse_sql="DROP INDEX IF EXISTS dresscode_user_email_idx",
+        ),
+    ]
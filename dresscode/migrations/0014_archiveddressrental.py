@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dresscode', '0013_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDressRental',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rental_id', models.IntegerField(unique=True)),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='Start day')),
+                ('return_date', models.DateField(blank=True, null=True, verbose_name='Return day')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('approved', 'approved'), ('rented', 'rented'), ('returned', 'returned')], default='returned', max_length=20, verbose_name='Status')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='dressrental',
+            name='rental_user_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dressrental',
+            index=models.Index(fields=['user', 'status', 'return_date'], name='rental_user_status_return_idx'),
+        ),
+        migrations.AddField(
+            model_name='archiveddressrental',
+            name='dress',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dresscode.dress'),
+        ),
+        migrations.AddField(
+            model_name='archiveddressrental',
+            name='size',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dresscode.size'),
+        ),
+        migrations.AddField(
+            model_name='archiveddressrental',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archiveddressrental',
+            index=models.Index(fields=['user', '-return_date'], name='archive_user_return_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0015_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_rental_id', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DressRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('common_renters', models.PositiveIntegerField()),
+                ('dress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='dresscode.dress')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dresscode.dress')),
+            ],
+            options={
+                'ordering': ['dress', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dressrecommendation',
+            constraint=models.UniqueConstraint(fields=('dress', 'rank'), name='recommendation_dress_rank_uniq'),
+        ),
+    ]
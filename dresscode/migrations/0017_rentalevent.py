@@ -0,0 +1,47 @@
+# Generated by Django 4.2.19 on 2026-10-19 06:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+BATCH_SIZE = 1000
+
+
+def snapshot_rentals(apps, schema_editor):
+    """Esamoms nuomoms įrašo pradinį 'snapshot' įvykį su dabartiniu statusu, kad įvykių žurnalas būtų pilnas."""
+    DressRental = apps.get_model('dresscode', 'DressRental')
+    RentalEvent = apps.get_model('dresscode', 'RentalEvent')
+    now = django.utils.timezone.now()
+    last_pk = 0
+    while True:
+        batch = list(DressRental.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .values_list('pk', 'status')[:BATCH_SIZE])
+        if not batch:
+            break
+        RentalEvent.objects.bulk_create([RentalEvent(rental_id=pk, kind='snapshot', status=status, created_at=now)
+                                         for pk, status in batch])
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0016_dressrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rental_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('created', 'created'), ('status', 'status changed'), ('snapshot', 'snapshot')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('approved', 'approved'), ('rented', 'rented'), ('returned', 'returned')], max_length=20)),
+                ('previous_status', models.CharField(blank=True, choices=[('pending', 'pending'), ('approved', 'approved'), ('rented', 'rented'), ('returned', 'returned')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rental_id', 'id'], name='rentalevent_rental_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_rentals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-19 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0017_rentalevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dress',
+            name='photo_dhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dress',
+            name='photo_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
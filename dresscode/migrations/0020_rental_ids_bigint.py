@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dresscode', '0019_outbound_email_attachments_claim'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archiveddressrental',
+            name='rental_id',
+            field=models.BigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='recommendationstate',
+            name='last_rental_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='rentalevent',
+            name='rental_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
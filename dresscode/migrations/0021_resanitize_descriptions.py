@@ -0,0 +1,18 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Tas pats užpildymas kaip 0011: iki valytuvo pataisymo <embed> ar <iframe/> nukirpdavo likusį aprašymą.
+backfill_descriptions = import_module('dresscode.migrations.0011_description_html').backfill_descriptions
+
+
+class Migration(migrations.Migration):
+    """Iš naujo išvalo esamų dizainerių ir suknelių aprašymus."""
+
+    dependencies = [
+        ('dresscode', '0020_rental_ids_bigint'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_descriptions, migrations.RunPython.noop),
+    ]
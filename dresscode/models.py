@@ -1,9 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.utils import timezone
 from datetime import date
-from PIL import Image
+from io import BytesIO
 from tinymce.models import HTMLField
 
+from . import lookups
+from .sanitizer import sanitize_html
+from .storage import content_hash_storage
+
 
 class Designer(models.Model):
     """ Dizainerio modelis
@@ -12,20 +18,36 @@ class Designer(models.Model):
             name (CharField): Dizainerio vardas.
             surname (CharField): Dizainerio pavardė.
             description (HTMLField): Dizainerio aprašymas (naudojant TinyMCE).
+            description_html (TextField): Išvalytas aprašymo HTML, rodomas puslapyje.
+            description_text (TextField): Aprašymo tekstas be HTML žymių.
             designers_pics (ImageField): Dizainerio nuotrauka.
+        Metodai:
+            save(): Išvalo aprašymo HTML prieš išsaugant.
         Meta:
-            ordering: Nurodo, kad dizaineriai bus rikiuojami pagal vardą ir pavardę."""
+            ordering: Nurodo, kad dizaineriai bus rikiuojami pagal vardą ir pavardę.
+            indexes: Indeksas pagal vardą ir pavardę, kad rikiuojant nereikėtų laikinos lentelės."""
 
     name = models.CharField('Name', max_length=50)
     surname = models.CharField('Surname', max_length=50)
     description = HTMLField('Description', blank=True, null=True)
-    designers_pics = models.ImageField('Photo', upload_to='designers_pics', null=True, blank=True)
+    description_html = models.TextField(blank=True, default='', editable=False)
+    description_text = models.TextField(blank=True, default='', editable=False)
+    designers_pics = models.ImageField('Photo', upload_to='designers_pics', null=True, blank=True,
+                                       storage=content_hash_storage)
 
     def __str__(self):
         return f"{self.name} {self.surname}"
 
+    def save(self, *args, **kwargs):
+        """Išvalo aprašymo HTML vieną kartą išsaugant, kad jo nereikėtų valyti kiekvieno rodymo metu."""
+        self.description_html, self.description_text = sanitize_html(self.description)
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ('name', 'surname')
+        indexes = [
+            models.Index(fields=['name', 'surname'], name='designer_name_surname_idx'),
+        ]
 
 
 class Size(models.Model):
@@ -59,14 +81,19 @@ class Dress(models.Model):
               color (CharField): Suknelės spalva.
               item_code (CharField): Suknelės prekės kodas (unikalus).
               description (HTMLField): Suknelės aprašymas (naudojant TinyMCE).
+              description_html (TextField): Išvalytas aprašymo HTML, rodomas puslapyje.
+              description_text (TextField): Aprašymo tekstas be HTML žymių.
               designer (ForeignKey): Dizainerio ryšys.
               sizes (ManyToManyField): Dydžių ryšys.
               styles (ManyToManyField): Stilių ryšys.
               dresses_pics (ImageField): Suknelės nuotrauka.
+              photo_dhash (BigIntegerField): Nuotraukos dHash (panašių nuotraukų paieškai).
+              photo_phash (BigIntegerField): Nuotraukos pHash (panašių nuotraukų paieškai).
 
         Metodai:
               display_sizes(): Grąžina suknelės dydžių sąrašą kaip eilutę.
               display_styles(): Grąžina suknelės stilių sąrašą kaip eilutę.
+              save(): Išvalo aprašymo HTML prieš išsaugant.
 
         Meta:
               verbose_name: Vienaskaitos pavadinimas.
@@ -75,21 +102,63 @@ class Dress(models.Model):
     color = models.CharField('Color', max_length=50)
     item_code = models.CharField('Item code', max_length=10, unique=True)
     description = HTMLField('Description', blank=True, null=True)
+    description_html = models.TextField(blank=True, default='', editable=False)
+    description_text = models.TextField(blank=True, default='', editable=False)
     designer = models.ForeignKey(Designer, on_delete=models.CASCADE)
     sizes = models.ManyToManyField(Size)
     styles = models.ManyToManyField(Style)
-    dresses_pics = models.ImageField('Photo', upload_to='dresses_pics', null=True, blank=True)
+    dresses_pics = models.ImageField('Photo', upload_to='dresses_pics', null=True, blank=True,
+                                     storage=content_hash_storage)
+    photo_dhash = models.BigIntegerField(null=True, blank=True, editable=False)
+    photo_phash = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    RELATED_ID_FIELDS = ('sizes', 'styles')
+
+    @classmethod
+    def load_related_ids(cls, dresses):
+        """ Viena užklausa (tarpinių lentelių UNION ALL, be jungimo su Size ar Style) nuskaito
+            suknelių dydžių ir stilių ID ir įsimena juos suknelėse. Sąrašams, kurių ryšiai
+            neįkelti per prefetch_related, tai viena užklausa visam sąrašui, o ne po dvi kiekvienai suknelei."""
+        by_id = {dress.pk: dress for dress in dresses}
+        for dress in by_id.values():
+            dress._related_ids = {name: [] for name in cls.RELATED_ID_FIELDS}
+        if not by_id:
+            return
+        queries = []
+        for name in cls.RELATED_ID_FIELDS:
+            field = cls._meta.get_field(name)
+            queries.append(field.remote_field.through.objects
+                           .filter(**{f'{field.m2m_field_name()}__in': list(by_id)})
+                           .annotate(relation=models.Value(name))
+                           .values_list(field.m2m_field_name(), field.m2m_reverse_field_name(), 'relation'))
+        for dress_id, related_id, name in queries[0].union(*queries[1:], all=True):
+            by_id[dress_id]._related_ids[name].append(related_id)
+
+    def related_ids(self, name):
+        """Grąžina susijusių dydžių ar stilių ID. Jei ryšys iš anksto įkeltas, naudojamas jis,
+        kitu atveju abu ryšiai nuskaitomi viena užklausa (load_related_ids) ir įsimenami,
+        kol suknelės dydžiai ar stiliai nepakeičiami."""
+        if name in getattr(self, '_prefetched_objects_cache', {}):
+            return [elem.pk for elem in getattr(self, name).all()]
+        if '_related_ids' not in self.__dict__:
+            Dress.load_related_ids([self])
+        return self._related_ids[name]
 
     def display_sizes(self):
-        """Grąžina suknelės dydžių sąrašą"""
-        res = ', '.join(elem.name for elem in self.sizes.all())
+        """Grąžina suknelės dydžių sąrašą. Pavadinimai imami iš procese laikomos Size lentelės kopijos."""
+        res = lookups.sizes.names(self.related_ids('sizes'))
         return res
 
     def display_styles(self):
-        """Grąžina suknelės stilių sąrašą"""
-        res = ', '.join(elem.name for elem in self.styles.all())
+        """Grąžina suknelės stilių sąrašą. Pavadinimai imami iš procese laikomos Style lentelės kopijos."""
+        res = lookups.styles.names(self.related_ids('styles'))
         return res
 
+    def save(self, *args, **kwargs):
+        """Išvalo aprašymo HTML vieną kartą išsaugant, kad jo nereikėtų valyti kiekvieno rodymo metu."""
+        self.description_html, self.description_text = sanitize_html(self.description)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.item_code}"
 
@@ -110,7 +179,13 @@ class DressRental(models.Model):
            status (CharField): Nuomos statusas.
 
        Metodai:
-           is_overdue (property): Tikrina ar suknelės grąžinimo data yra praėjusi."""
+           is_overdue (property): Tikrina ar suknelės grąžinimo data yra praėjusi.
+
+       Meta:
+           indexes: Indeksai dažniausioms paieškoms: pagal statusą ir grąžinimo datą,
+               pagal grąžinimo datą bei pagal vartotoją, statusą ir grąžinimo datą.
+               Dalinių indeksų (condition=Q(status__in=ACTIVE_STATUSES)) nėra: Django statusus
+               perduoda parametrais, o SQLite dalinio indekso su parametrais užklausoje nenaudoja."""
 
     start_date = models.DateField('Start day', null=True, blank=True)
     return_date = models.DateField('Return day', null=True, blank=True)
@@ -124,6 +199,7 @@ class DressRental(models.Model):
         ('rented', 'rented'),
         ('returned', 'returned')
     )
+    ACTIVE_STATUSES = ('pending', 'approved', 'rented')
 
     status = models.CharField('Status',
                               max_length=20,
@@ -143,6 +219,50 @@ class DressRental(models.Model):
     def __str__(self):
         return f"{self.dress} {self.size} {self.user} {self.status} {self.return_date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'return_date'], name='rental_status_return_idx'),
+            models.Index(fields=['return_date'], name='rental_return_date_idx'),
+            models.Index(fields=['user', 'status', 'return_date'], name='rental_user_status_return_idx'),
+        ]
+
+
+class ArchivedDressRental(models.Model):
+    """ Archyvuotos (senai grąžintos) suknelės nuomos modelis
+
+        Seni grąžinti nuomos įrašai perkeliami čia komanda archive_rentals,
+        kad DressRental lentelė liktų maža visoms kitoms užklausoms.
+
+        Laukeliai:
+            rental_id (BigIntegerField): Buvusio DressRental įrašo ID.
+            start_date (DateField): Nuomos pradžios data.
+            return_date (DateField): Grąžinimo data.
+            dress (ForeignKey): Suknelės ryšys.
+            user (ForeignKey): Vartotojo ryšys.
+            size (ForeignKey): Dydžio ryšys.
+            status (CharField): Nuomos statusas.
+            archived_at (DateTimeField): Archyvavimo laikas.
+
+        Meta:
+            indexes: Vartotojo archyvas nuskaitomas pagal indeksą naujausi pirmiau."""
+
+    rental_id = models.BigIntegerField(unique=True)
+    start_date = models.DateField('Start day', null=True, blank=True)
+    return_date = models.DateField('Return day', null=True, blank=True)
+    dress = models.ForeignKey(Dress, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    size = models.ForeignKey(Size, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField('Status', max_length=20, choices=DressRental.RENTAL_STATUS, default='returned')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.dress} {self.size} {self.user} {self.status} {self.return_date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-return_date'], name='archive_user_return_idx'),
+        ]
+
 
 class DressReview(models.Model):
     """ Suknelės atsiliepimo modelis
@@ -151,7 +271,10 @@ class DressReview(models.Model):
             date_created (DateTimeField): Atsiliepimo sukūrimo data.
             content (TextField): Atsiliepimo turinys.
             dress (ForeignKey): Suknelės ryšys.
-            reviewer (ForeignKey): Atsiliepimo autoriaus ryšys."""
+            reviewer (ForeignKey): Atsiliepimo autoriaus ryšys.
+
+        Meta:
+            indexes: Suknelės atsiliepimai nuskaitomi pagal indeksą naujausi pirmiau."""
 
     date_created = models.DateTimeField(auto_now_add=True)
     content = models.TextField('Comment', max_length=2000)
@@ -161,6 +284,11 @@ class DressReview(models.Model):
     def __str__(self):
         return f"{self.date_created}, {self.reviewer}, {self.dress}, {self.content}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['dress', '-date_created'], name='review_dress_created_idx'),
+        ]
+
 
 class Profile(models.Model):
     """ Vartotojo profilio modelis
@@ -173,7 +301,8 @@ class Profile(models.Model):
         Metodai:
             save(): Automatiškai sumažina įkeliamas profilio nuotraukas."""
 
-    picture = models.ImageField(upload_to='profile_pics', default='default-user.png')
+    picture = models.ImageField(upload_to='profile_pics', default='default-user.png',
+                                storage=content_hash_storage)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     iban = models.CharField('IBAN', max_length=50)
 
@@ -182,10 +311,169 @@ class Profile(models.Model):
 
     def save(self, *args, **kwargs):
         """Automatiškai sumažina įkeliamas profilio nuotraukas,
-        kad taupytų vietą serveryje"""
-        super().save(*args, **kwargs)
-        if self.picture.path:
-            img = Image.open(self.picture.path)
+        kad taupytų vietą serveryje. Nuotrauka sumažinama prieš įrašant į saugyklą,
+        todėl failo pavadinimas (turinio maišas) atitinka galutinį turinį,
+        o jau išsaugotos ir bendrai naudojamos nuotraukos neperrašomos."""
+        if self.picture and not self.picture._committed:
+            from PIL import Image  # Pillow importuojamas tik apdorojant nuotrauką, o ne paleidžiant procesą
+
+            img = Image.open(self.picture)
+            img_format = img.format
             thumb_size = (150, 150)
             img.thumbnail(thumb_size)
-            img.save(self.picture.path)
+            buffer = BytesIO()
+            img.save(buffer, format=img_format)
+            self.picture.save(self.picture.name, ContentFile(buffer.getvalue()), save=False)
+        super().save(*args, **kwargs)
+
+
+class OutboundEmail(models.Model):
+    """ Išsiunčiamo el. laiško modelis (siuntimo eilė)
+
+        Laiškai įrašomi į šią lentelę toje pačioje transakcijoje kaip juos sukėlęs pakeitimas,
+        o išsiunčiami atskiru procesu (komanda send_outbox), todėl lėtas pašto serveris
+        nestabdo užklausų.
+
+        Laukeliai:
+            subject (CharField): Laiško tema.
+            body (TextField): Laiško tekstas.
+            html_body (TextField): Laiško HTML versija (jei yra).
+            content_subtype (CharField): Pagrindinio teksto MIME potipis (plain arba html).
+            alternatives (JSONField): Kitos alternatyvios versijos [{content, mimetype}].
+            attachments (JSONField): Priedai [{filename, content (base64), mimetype}].
+            from_email (CharField): Siuntėjas.
+            to (JSONField): Gavėjų sąrašas.
+            cc (JSONField): Kopijos gavėjų sąrašas.
+            bcc (JSONField): Slaptos kopijos gavėjų sąrašas.
+            reply_to (JSONField): Atsakymo adresų sąrašas.
+            headers (JSONField): Papildomos laiško antraštės.
+            status (CharField): Laiško būsena (queued, sending, sent, failed).
+            claim (CharField): Laišką siunčiančio send_outbox proceso žymė.
+            attempts (PositiveIntegerField): Nepavykusių siuntimo bandymų skaičius.
+            next_attempt_at (DateTimeField): Kada laišką bandyti siųsti.
+            last_error (TextField): Paskutinio nepavykusio bandymo klaida.
+            created_at (DateTimeField): Įrašymo į eilę laikas.
+            sent_at (DateTimeField): Išsiuntimo laikas.
+
+        Meta:
+            indexes: Siunčiami laiškai nuskaitomi pagal būseną ir siuntimo laiką."""
+
+    STATUS = (
+        ('queued', 'queued'),
+        ('sending', 'sending'),
+        ('sent', 'sent'),
+        ('failed', 'failed'),
+    )
+
+    subject = models.CharField('Subject', max_length=255)
+    body = models.TextField('Body', blank=True)
+    html_body = models.TextField('HTML body', blank=True)
+    content_subtype = models.CharField(max_length=20, default='plain')
+    alternatives = models.JSONField(default=list, blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+    from_email = models.CharField('From', max_length=254)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    status = models.CharField('Status', max_length=10, choices=STATUS, default='queued')
+    claim = models.CharField(max_length=32, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} {', '.join(self.to)} {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+
+class DressRecommendation(models.Model):
+    """ Suknelės rekomendacija ("Kartu su šia suknele dar nuomojosi")
+
+        Lentelė užpildoma komanda refresh_recommendations iš nuomos istorijos,
+        todėl suknelės puslapis rekomendacijas nuskaito viena užklausa pagal indeksą.
+
+        Laukeliai:
+            dress (ForeignKey): Suknelė, kuriai rekomenduojama.
+            recommended (ForeignKey): Rekomenduojama suknelė.
+            rank (PositiveSmallIntegerField): Vieta sąraše (0 - panašiausia).
+            score (FloatField): Kosinusinis panašumas pagal bendrus nuomininkus.
+            common_renters (PositiveIntegerField): Kiek vartotojų nuomojosi abi sukneles.
+
+        Meta:
+            constraints: Viena rekomendacija kiekvienai vietai; tas pats indeksas naudojamas skaitant."""
+
+    dress = models.ForeignKey(Dress, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Dress, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    common_renters = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.dress} -> {self.recommended} ({self.score:.3f})"
+
+    class Meta:
+        ordering = ['dress', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['dress', 'rank'], name='recommendation_dress_rank_uniq'),
+        ]
+
+
+class RecommendationState(models.Model):
+    """ Rekomendacijų atnaujinimo būsena (viena eilutė)
+
+        Laukeliai:
+            last_rental_id (BigIntegerField): Didžiausias jau įvertintas DressRental ID.
+            updated_at (DateTimeField): Paskutinio atnaujinimo laikas."""
+
+    last_rental_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations up to rental {self.last_rental_id}"
+
+
+class RentalEvent(models.Model):
+    """ Suknelės nuomos įvykis (tik pridedamas, niekada nekeičiamas)
+
+        Įvykiai įrašomi signalais kiekvieną kartą, kai nuoma sukuriama ar pakeičiamas jos statusas
+        (dresscode.events). Iš jų komanda replay_rental_events atkuria nuomų būseną
+        ir apskaičiuoja, kiek laiko nuomos praleidžia kiekviename statuse.
+
+        Laukeliai:
+            rental_id (BigIntegerField): Nuomos ID. Ne ForeignKey, kad įvykiai liktų ir
+                archyvavus ar ištrynus nuomą.
+            kind (CharField): Įvykio rūšis (created, status, snapshot).
+            status (CharField): Statusas po įvykio.
+            previous_status (CharField): Statusas prieš įvykį.
+            created_at (DateTimeField): Įvykio laikas.
+
+        Meta:
+            indexes: Nuomos įvykiai nuskaitomi pagal nuomą jų eilės tvarka."""
+
+    KINDS = (
+        ('created', 'created'),
+        ('status', 'status changed'),
+        ('snapshot', 'snapshot'),
+    )
+
+    rental_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=KINDS)
+    status = models.CharField(max_length=20, choices=DressRental.RENTAL_STATUS)
+    previous_status = models.CharField(max_length=20, choices=DressRental.RENTAL_STATUS, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.rental_id} {self.previous_status} -> {self.status} {self.created_at}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rental_id', 'id'], name='rentalevent_rental_idx'),
+        ]
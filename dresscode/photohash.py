@@ -0,0 +1,151 @@
+import threading
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from django.conf import settings
+
+from .models import Dress
+from .versions import bump_version, get_version
+
+HASH_SIZE = 8
+PHASH_SAMPLE = 32
+
+
+def dct_matrix(size):
+    """Ortonormuota DCT-II matrica: matrix @ x yra vektoriaus x diskrečioji kosinusų transformacija."""
+    k = np.arange(size)[:, None]
+    i = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+DCT = dct_matrix(PHASH_SAMPLE)
+
+
+def pack(bits):
+    """64 bitai -> int64, nes BigIntegerField saugo skaičius su ženklu."""
+    return int(np.packbits(bits).view('>i8')[0])
+
+
+def unsigned(values):
+    """int64 hash'ai -> uint64, kad XOR ir bitų skaičiavimas nepriklausytų nuo ženklo."""
+    return np.asarray(values, dtype=np.int64).view(np.uint64)
+
+
+def image_hashes(file):
+    """ Grąžina nuotraukos (dHash, pHash) kaip 64 bitų sveikuosius skaičius su ženklu.
+
+        dHash - ar kiekvienas 9x8 pilko vaizdo pikselis šviesesnis už kaimyną dešinėje,
+        pHash - ar kiekvienas žemiausių dažnių 8x8 DCT koeficientas (iš 32x32 vaizdo) didesnis
+        už jų medianą. Pakeitus nuotraukos dydį, suspaudimą ar ryškumą, pasikeičia vos keli
+        bitai, o skirtingų nuotraukų hash'ai skiriasi maždaug puse bitų."""
+    with Image.open(file) as image:
+        image.draft('L', (PHASH_SAMPLE * 2, PHASH_SAMPLE * 2))  # JPEG iškart dekoduojamas sumažintas
+        gray = image.convert('L')
+    pixels = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS), dtype=np.int16)
+    dhash = pack((pixels[:, 1:] > pixels[:, :-1]).ravel())
+    pixels = np.asarray(gray.resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (DCT @ pixels @ DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    phash = pack(low > np.median(low[1:]))
+    return dhash, phash
+
+
+def photo_hashes(photo):
+    """ Grąžina nuotraukos lauko (FieldFile) hash'us arba (None, None), jei nuotraukos nėra
+        ar jos nepavyksta perskaityti. Dar neišsaugotas įkeltas failas skaitomas iš atminties
+        ir paliekamas atidarytas, kad jį būtų galima išsaugoti."""
+    if not photo:
+        return None, None
+    try:
+        if photo._committed:
+            with photo.storage.open(photo.name) as file:
+                return image_hashes(file)
+        photo.file.seek(0)
+        try:
+            return image_hashes(photo.file)
+        finally:
+            photo.file.seek(0)
+    except (OSError, UnidentifiedImageError, ValueError):
+        return None, None
+
+
+def stored_photo_hashes(task):
+    """Darbinio proceso funkcija: (suknelės ID, failo pavadinimas) -> (ID, dHash, pHash)."""
+    pk, name = task
+    field = Dress._meta.get_field('dresses_pics')
+    return (pk, *photo_hashes(field.attr_class(None, field, name)))
+
+
+class PhotoHashIndex:
+    """ Procese laikomi visų suknelių nuotraukų hash'ai supakuotuose numpy uint64 masyvuose.
+
+        Panašios nuotraukos randamos vienu vektorizuotu XOR ir bitų skaičiavimu (Hamingo atstumu)
+        su visomis suknelėmis iš karto, be užklausų duomenų bazei. Nuotrauka laikoma panašia,
+        jei ir pHash, ir dHash atstumai ne didesni nei PHOTO_HASH_MAX_DISTANCE.
+        Pasikeitus hash'ams (versija 'photohash' bendrame podėlyje), indeksas perkuriamas
+        viena užklausa.
+
+        Metodai:
+            build(): Sukuria indeksą iš duomenų bazės.
+            similar(): Grąžina sukneles, kurių nuotraukos panašios į nurodytus hash'us.
+            pairs(): Grąžina visas panašių nuotraukų poras.
+            invalidate(): Pažymi visų procesų indeksus pasenusiais."""
+
+    version_name = 'photohash'
+
+    def __init__(self):
+        self.snapshot = None  # (suknelių ID, dHash, pHash, versija)
+        self.lock = threading.Lock()
+
+    def build(self):
+        version = get_version(self.version_name)
+        rows = np.array(Dress.objects.filter(photo_dhash__isnull=False, photo_phash__isnull=False)
+                        .values_list('id', 'photo_dhash', 'photo_phash').order_by('id'), dtype=np.int64).reshape(-1, 3)
+        self.snapshot = (rows[:, 0].copy(), unsigned(rows[:, 1].copy()), unsigned(rows[:, 2].copy()), version)
+
+    def current(self):
+        snapshot = self.snapshot
+        if snapshot is None or snapshot[3] != get_version(self.version_name):
+            with self.lock:
+                self.build()
+                snapshot = self.snapshot
+        return snapshot
+
+    def similar(self, dhash, phash, max_distance=None, limit=10, exclude=None):
+        """Grąžina iki limit [(suknelės ID, pHash atstumas, dHash atstumas)], artimiausias pirmas."""
+        if max_distance is None:
+            max_distance = settings.PHOTO_HASH_MAX_DISTANCE
+        ids, dhashes, phashes, _ = self.current()
+        phash_distance = np.bitwise_count(phashes ^ unsigned(phash))
+        dhash_distance = np.bitwise_count(dhashes ^ unsigned(dhash))
+        match = (phash_distance <= max_distance) & (dhash_distance <= max_distance)
+        if exclude is not None:
+            match &= ids != exclude
+        found = np.flatnonzero(match)
+        order = np.lexsort((ids[found], dhash_distance[found], phash_distance[found]))[:limit]
+        return [(int(ids[index]), int(phash_distance[index]), int(dhash_distance[index])) for index in found[order]]
+
+    def pairs(self, max_distance=None, block_size=512):
+        """Grąžina [(ID, ID, pHash atstumas, dHash atstumas)] visoms panašių nuotraukų poroms.
+        Atstumai skaičiuojami blokais (block_size eilučių su visomis), todėl atmintis neauga kvadratu."""
+        if max_distance is None:
+            max_distance = settings.PHOTO_HASH_MAX_DISTANCE
+        ids, dhashes, phashes, _ = self.current()
+        pairs = []
+        for start in range(0, len(ids), block_size):
+            rows = slice(start, start + block_size)
+            phash_distance = np.bitwise_count(phashes[rows, None] ^ phashes[None, :])
+            dhash_distance = np.bitwise_count(dhashes[rows, None] ^ dhashes[None, :])
+            left, right = np.nonzero((phash_distance <= max_distance) & (dhash_distance <= max_distance))
+            later = right > left + start
+            for row, column in zip(left[later], right[later]):
+                pairs.append((int(ids[start + row]), int(ids[column]),
+                              int(phash_distance[row, column]), int(dhash_distance[row, column])))
+        return sorted(pairs, key=lambda pair: (pair[2] + pair[3], pair[0], pair[1]))
+
+    def invalidate(self):
+        bump_version(self.version_name)
+
+
+photo_index = PhotoHashIndex()
@@ -0,0 +1,195 @@
+import logging
+import math
+import os
+import shutil
+import io
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.db.models import Count
+from django.http import Http404
+from django.urls import resolve, reverse
+
+from .models import Designer, Dress, DressRecommendation
+from .views import DESIGNERS_PER_PAGE, DESIGNER_DRESSES_PER_PAGE, DressListView
+
+logger = logging.getLogger(__name__)
+
+# URL pavadinimai, kurių puslapiai atvaizduojami iš anksto.
+PRERENDERED_URLS = ('designers-all', 'designer-one', 'dresses-all', 'dress-one')
+
+
+def page_file(path, page=1):
+    """Grąžina puslapio failą: <PRERENDER_ROOT>/<kelias>/index.html, o kitiems puslapiams page-<nr>.html."""
+    name = 'index.html' if page == 1 else f'page-{page}.html'
+    return Path(settings.PRERENDER_ROOT, path.strip('/'), name)
+
+
+def page_range(count, per_page):
+    """Puslapių numeriai, kuriuos parodytų Paginator (tuščias sąrašas turi vieną puslapį)."""
+    return range(1, max(1, math.ceil(count / per_page)) + 1)
+
+
+def pages_of(path):
+    """Grąžina kelio puslapių numerius pagal dabartinį įrašų skaičių."""
+    match = resolve(path)
+    if match.url_name == 'designers-all':
+        return page_range(Designer.objects.count(), DESIGNERS_PER_PAGE)
+    if match.url_name == 'designer-one':
+        count = Dress.objects.filter(designer_id=match.kwargs['designer_id']).count()
+        return page_range(count, DESIGNER_DRESSES_PER_PAGE)
+    if match.url_name == 'dresses-all':
+        return page_range(Dress.objects.count(), DressListView.paginate_by)
+    return range(1, 2)
+
+
+def all_pages():
+    """Grąžina visų iš anksto atvaizduojamų puslapių (kelias, puslapio nr.) sąrašą."""
+    pages = [(reverse('designers-all'), page) for page in pages_of(reverse('designers-all'))]
+    pages += [(reverse('dresses-all'), page) for page in pages_of(reverse('dresses-all'))]
+    designers = Designer.objects.annotate(dresses=Count('dress')).values_list('id', 'dresses').order_by('id')
+    for designer_id, dresses in designers:
+        path = reverse('designer-one', args=(designer_id,))
+        pages += [(path, page) for page in page_range(dresses, DESIGNER_DRESSES_PER_PAGE)]
+    pages += [(reverse('dress-one', args=(dress_id,)), 1)
+              for dress_id in Dress.objects.values_list('id', flat=True).order_by('id')]
+    return pages
+
+
+def write_file(target, content):
+    """Įrašo failą laikinu pavadinimu ir pervadina, todėl serveris niekada neatiduoda pusiau įrašyto puslapio."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_name = tempfile.mkstemp(dir=target.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(content)
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, target)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def render_page(path, page=1):
+    """ Atvaizduoja puslapį taip, kaip jį matytų neprisijungęs vartotojas, ir įrašo jį į failą.
+
+        Grąžina įrašytų baitų skaičių. Jei puslapio nebėra (pvz. suknelė ištrinta),
+        senas failas pašalinamas ir grąžinama None."""
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': f'page={page}' if page > 1 else '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    })  # django.test.RequestFactory čia neįkeliamas, kad jo nereikėtų kiekvienam darbiniam procesui
+    request.user = AnonymousUser()
+    request.resolver_match = match = resolve(path)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Http404:
+        response = None
+    target = page_file(path, page)
+    if response is None or response.status_code != 200:
+        target.unlink(missing_ok=True)
+        return None
+    write_file(target, response.content)
+    return len(response.content)
+
+
+def remove_pages(path):
+    """Pašalina visų kelio puslapių failus. Kol puslapis neatvaizduotas iš naujo, jį aptarnauja Django."""
+    directory = page_file(path).parent
+    for file in (directory / 'index.html', *directory.glob('page-*.html')):
+        file.unlink(missing_ok=True)
+
+
+def dress_paths(dress_ids):
+    return [reverse('dress-one', args=(dress_id,)) for dress_id in dress_ids]
+
+
+def designer_paths(designer_ids):
+    return [reverse('designer-one', args=(designer_id,)) for designer_id in designer_ids]
+
+
+def dress_change_paths(dress_ids, designer_ids):
+    """Puslapiai, kuriuos paveikia suknelių pakeitimas: pačių suknelių, jas rekomenduojančių suknelių,
+    jų dizainerių ir suknelių sąrašo puslapiai."""
+    recommending = DressRecommendation.objects.filter(recommended_id__in=dress_ids).values_list('dress_id', flat=True)
+    return [*dress_paths({*dress_ids, *recommending}), *designer_paths(designer_ids), reverse('dresses-all')]
+
+
+class Prerenderer:
+    """ Palaiko iš anksto atvaizduotus puslapius atnaujintus pasikeitus katalogui.
+
+        invalidate() iškart pašalina paveiktų puslapių failus (kol jų nėra, užklausas aptarnauja
+        Django), o jei PRERENDER_IN_BACKGROUND, tame pačiame procese foninėje gijoje juos
+        atvaizduoja iš naujo. Kiti puslapiai neliečiami. Jei foninis atvaizdavimas neįvyko
+        (pvz. pakeitimą atliko valdymo komanda), trūkstamus puslapius sukuria
+        manage.py prerender --missing.
+
+        Metodai:
+            active(): Ar puslapiai atvaizduojami (nustatymas ir PRERENDER_ROOT katalogas).
+            invalidate(): Pašalina nurodytų kelių puslapius ir suplanuoja jų atvaizdavimą.
+            invalidate_all(): Pašalina visus puslapius, pvz. pakeitus dydžius ar stilius."""
+
+    def __init__(self):
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @staticmethod
+    def active():
+        return settings.PRERENDER_ENABLED and os.path.isdir(settings.PRERENDER_ROOT)
+
+    def invalidate(self, paths):
+        if not self.active():
+            return
+        for path in paths:
+            remove_pages(path)
+        if not settings.PRERENDER_IN_BACKGROUND:
+            return
+        with self.lock:
+            self.pending.update(paths)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='prerender', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self.lock:
+                    if not self.pending:
+                        self.thread = None
+                        return
+                    path = self.pending.pop()
+                try:
+                    for page in pages_of(path):
+                        render_page(path, page)
+                except Exception:
+                    logger.exception('Prerendering %s failed', path)
+        finally:
+            connections.close_all()  # uždaroma tik šios gijos jungtis
+
+    def invalidate_all(self):
+        """Katalogas pervadinamas ir ištrinamas, todėl visi puslapiai vienu metu grįžta Django.
+        Jie sukuriami iš naujo paleidus manage.py prerender."""
+        if not self.active():
+            return
+        with self.lock:
+            self.pending.clear()
+        root = Path(settings.PRERENDER_ROOT)
+        stale = root.with_name(f'.{root.name}.{uuid.uuid4().hex}.stale')
+        try:
+            root.rename(stale)
+        except FileNotFoundError:
+            return
+        shutil.rmtree(stale, ignore_errors=True)
+        logger.warning('All prerendered pages were invalidated, run manage.py prerender to rebuild them')
+
+
+prerenderer = Prerenderer()
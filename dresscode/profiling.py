@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.base import Template
+
+_stats = ContextVar('template_stats', default=None)  # ContextVar, kad matavimą matytų ir sync_to_async gija
+_install_lock = threading.Lock()
+
+
+class TemplateStats:
+    """ Vienos užklausos šablonų atvaizdavimo statistika.
+
+        Kiekvienam šablonui (taip pat ir įterptam per include ar extends) skaičiuojama:
+        kiek kartų atvaizduotas, bendra trukmė ir trukmė be vidinių šablonų (self)."""
+
+    def __init__(self):
+        self.templates = defaultdict(lambda: {'count': 0, 'total': 0.0, 'self': 0.0})
+        self.stack = []
+
+    def merge(self, other):
+        """Prideda kitos (vidinės) matavimo sesijos rezultatus."""
+        for name, data in other.templates.items():
+            for key, value in data.items():
+                self.templates[name][key] += value
+
+    def rows(self):
+        """Grąžina šablonų statistiką, surikiuotą pagal trukmę be vidinių šablonų (ms)."""
+        rows = [(name, data['count'], data['total'] * 1000, data['self'] * 1000)
+                for name, data in self.templates.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+
+def _profiled_render(original):
+    def _render(self, context):
+        stats = _stats.get()
+        if stats is None:
+            return original(self, context)
+        stats.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stats.stack.pop()
+            if stats.stack:
+                stats.stack[-1] += elapsed
+            data = stats.templates[self.name or '<string>']
+            data['count'] += 1
+            data['total'] += elapsed
+            data['self'] += elapsed - children
+    _render.profiled = True
+    _render.original = original
+    return _render
+
+
+def install():
+    """ Vieną kartą apgaubia Template._render matavimo funkcija visame procese.
+        Kol matavimas neįjungtas (profile_templates), ji tik iškviečia originalią funkciją.
+
+        Kviečiama tik ten, kur matavimo paprašyta: TemplateProfilingMiddleware (kai įjungtas
+        TEMPLATE_PROFILING) ir bench_templates komandos, todėl kitaip Template nekeičiamas."""
+    with _install_lock:
+        if not getattr(Template._render, 'profiled', False):
+            Template._render = _profiled_render(Template._render)
+
+
+def uninstall():
+    """Grąžina originalią Template._render funkciją."""
+    with _install_lock:
+        if getattr(Template._render, 'profiled', False):
+            Template._render = Template._render.original
+
+
+@contextmanager
+def profile_templates():
+    """Matuoja šiame kontekste (gijoje ar korutinoje) atvaizduojamus šablonus. Grąžina TemplateStats.
+    Šablonai matuojami tik po install(), kitaip statistika lieka tuščia.
+    Jei matavimas jau vyksta (pvz. komanda ir middleware), vidiniai rezultatai pridedami prie išorinių."""
+    previous = _stats.get()
+    stats = TemplateStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+        if previous is not None:
+            previous.merge(stats)
@@ -0,0 +1,138 @@
+import re
+from datetime import date
+
+from django.db import connection
+from django.db.models import Q
+
+from . import mail
+from .models import (ArchivedDressRental, Designer, Dress, DressRecommendation, DressRental, DressReview, RentalEvent,
+                     User)
+
+# Eilutės, rodančios, kad lentelė skaitoma visa, o ne pagal indeksą.
+SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?P<table>\w+)\b(?! USING (?:COVERING )?INDEX)'),
+    'postgresql': re.compile(r'\bSeq Scan on (?P<table>\w+)'),
+}
+
+HOT_QUERIES = {}
+
+
+def hot_query(name, allow_scans=()):
+    """ Registruoja funkciją, grąžinančią dažnai vykdomą užklausą (QuerySet).
+
+        allow_scans: Lentelės, kurias šiai užklausai leidžiama skaityti visas,
+        pvz. puslapiuojamas sąrašas pagal pirminį raktą su LIMIT ar paieška LIKE '%...%'."""
+    def register(func):
+        HOT_QUERIES[name] = (func, frozenset(allow_scans))
+        return func
+    return register
+
+
+@hot_query('index: rentals by status')
+def rentals_by_status():
+    return DressRental.objects.filter(status__exact='rented')
+
+
+@hot_query('designers: ordered list')
+def designers_ordered():
+    return Designer.objects.all()[:2]
+
+
+@hot_query('designer: dresses page')
+def designer_dresses():
+    return Dress.objects.filter(designer_id=1).order_by('item_code')[:8]
+
+
+@hot_query('dresses: page', allow_scans=('dresscode_dress',))
+def dresses_page():
+    return Dress.objects.select_related('designer').order_by('id')[:4]
+
+
+@hot_query('dress: recommendations')
+def dress_recommendations():
+    return DressRecommendation.objects.filter(dress_id=1).select_related('recommended').order_by('rank')
+
+
+@hot_query('dress: reviews')
+def dress_reviews():
+    return DressReview.objects.filter(dress_id=1)
+
+
+@hot_query('search', allow_scans=('dresscode_dress',))
+def search_dresses():
+    return Dress.objects.filter(Q(color__icontains='red') | Q(styles__in=[1]) | Q(item_code__icontains='red'))
+
+
+@hot_query('mydresses: active rentals')
+def user_active_rentals():
+    return DressRental.objects.filter(user_id=1, status__in=DressRental.ACTIVE_STATUSES).order_by('return_date', 'id')
+
+
+@hot_query('mydresses: returned history')
+def user_returned_rentals():
+    return DressRental.objects.filter(user_id=1, status='returned').order_by('-return_date', '-id')[:10]
+
+
+@hot_query('mydresses: archive')
+def user_archived_rentals():
+    return ArchivedDressRental.objects.filter(user_id=1).order_by('-return_date', '-id')[:10]
+
+
+@hot_query('archive_rentals: batch')
+def rentals_to_archive():
+    return DressRental.objects.filter(status='returned', return_date__lt=date.today()).order_by('id')[:1000]
+
+
+@hot_query('send_outbox: due emails')
+def due_emails():
+    return mail.due_emails()[:100]
+
+
+@hot_query('replay_rental_events: event stream')
+def rental_event_stream():
+    return RentalEvent.objects.order_by('rental_id', 'id').values_list('rental_id', 'kind', 'status', 'created_at')
+
+
+@hot_query('register: username or email taken')
+def username_or_email():
+    return User.objects.filter(Q(username='user') | Q(email='user@example.com'))
+
+
+@hot_query('admin: rentals by return date')
+def rentals_by_return_date():
+    return DressRental.objects.filter(return_date__gte=date.today(), return_date__lt=date.today())
+
+
+@hot_query('admin: overdue active rentals')
+def overdue_active_rentals():
+    return DressRental.objects.filter(status__in=DressRental.ACTIVE_STATUSES, return_date__lt=date.today())
+
+
+@hot_query('rental: overlapping active rentals')
+def overlapping_active_rentals():
+    return DressRental.objects.filter(dress_id=1, size_id=1, status__in=DressRental.ACTIVE_STATUSES,
+                                      start_date__lte=date.today(), return_date__gte=date.today())
+
+
+@hot_query('admin: dress rentals inline')
+def dress_rentals_inline():
+    return DressRental.objects.filter(dress_id=1).order_by('-start_date', '-id')[:20]
+
+
+def full_scans(plan, allow_scans=()):
+    """Grąžina lentelių, kurias užklausos planas skaito visas, sąrašą (išskyrus leidžiamas)."""
+    pattern = SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        return []
+    tables = set(connection.introspection.table_names())
+    return [match.group('table') for match in pattern.finditer(plan)
+            if match.group('table') in tables and match.group('table') not in allow_scans]
+
+
+def check_plans():
+    """Kiekvienai registruotai užklausai grąžina (pavadinimas, planas, visos skaitomos lentelės)."""
+    results = []
+    for name, (func, allow_scans) in HOT_QUERIES.items():
+        plan = func().explain()
+        results.append((name, plan, full_scans(plan, allow_scans)))
+    return results
@@ -0,0 +1,76 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class Rate:
+    """ Užklausų ribojimo taisyklė vienam URL pavadinimui.
+
+        Atributai:
+            rate (str): Leidžiamas užklausų skaičius per laikotarpį, pvz. '30/m' (s, m, h, d).
+            burst (int): Kiek užklausų galima pateikti iš karto (kibiro talpa), numatytai lygu rate skaičiui.
+            key (str): 'ip' - riboti pagal IP adresą; 'user' - pagal prisijungusį vartotoją,
+                o neprisijungusius pagal IP.
+            methods (tuple): Ribojami HTTP metodai; None - visi."""
+
+    def __init__(self, rate, burst=None, key='ip', methods=None):
+        count, period = rate.split('/')
+        self.rate = rate
+        self.interval = PERIODS[period] / int(count)
+        self.burst = burst or int(count)
+        self.key = key
+        self.methods = tuple(methods) if methods else None
+
+    def __repr__(self):
+        return f"Rate({self.rate!r}, burst={self.burst}, key={self.key!r})"
+
+    def applies_to(self, request):
+        return self.methods is None or request.method in self.methods
+
+    def identity(self, request):
+        if self.key == 'user' and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{client_ip(request)}"
+
+
+def client_ip(request):
+    """ Grąžina kliento IP. Už atvirkštinio tarpinio serverio nurodykite RATELIMIT_IP_HEADER,
+        pvz. 'HTTP_X_FORWARDED_FOR', ir RATELIMIT_TRUSTED_PROXIES - kiek patikimų tarpinių
+        serverių prideda adresą prie antraštės.
+
+        Kairiąją X-Forwarded-For dalį klientas gali užpildyti bet kuo, todėl imamas adresas,
+        kurį pridėjo tolimiausias patikimas tarpinis serveris: RATELIMIT_TRUSTED_PROXIES-asis
+        iš dešinės. Jei adresų mažiau (užklausa atėjo ne per tarpinius serverius), naudojamas REMOTE_ADDR."""
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if settings.RATELIMIT_IP_HEADER == 'REMOTE_ADDR':
+        return remote_addr
+    values = [value.strip() for value in request.META.get(settings.RATELIMIT_IP_HEADER, '').split(',')]
+    values = [value for value in values if value]
+    hops = max(settings.RATELIMIT_TRUSTED_PROXIES, 1)
+    if len(values) < hops:
+        return remote_addr
+    return values[-hops]
+
+
+def consume(scope, rate, identity, now=None):
+    """ Paima vieną žetoną iš kibiro. Grąžina (leidžiama, po kiek sekundžių bandyti vėl).
+
+        Žetonų kibiras įgyvendintas GCRA būdu: podėlyje saugomas tik vienas skaičius -
+        laikas, kada kibiras vėl bus pilnas (theoretical arrival time). Kiekviena užklausa
+        jį pastumia per rate.interval; jei jis nutolsta daugiau nei per burst intervalų,
+        užklausa atmetama. Tai vienas get ir vienas set bendrame podėlyje, be atskiro
+        laikmačio žetonams papildyti. Lygiagrečios užklausos gali retkarčiais praleisti
+        vieną kitą papildomą užklausą, bet ne daugiau."""
+    cache = caches[settings.RATELIMIT_CACHE]
+    key = f"ratelimit:{scope}:{identity}"
+    now = time.time() if now is None else now
+    arrival = max(cache.get(key) or now, now) + rate.interval
+    allowed_at = arrival - rate.burst * rate.interval
+    if now < allowed_at:
+        return False, allowed_at - now
+    cache.set(key, arrival, timeout=math.ceil(arrival - now) + 1)
+    return True, 0.0
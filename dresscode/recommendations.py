@@ -0,0 +1,117 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+from .models import ArchivedDressRental, DressRecommendation, DressRental, RecommendationState
+from .prerender import dress_paths, prerenderer
+from .versions import bump_version
+
+
+def _gather(ptr, values, rows):
+    """Sujungia kelių CSR eilučių reikšmes į vieną masyvą be Python ciklo."""
+    starts = ptr[rows]
+    lengths = ptr[rows + 1] - starts
+    if not lengths.sum():
+        return values[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return values[offsets]
+
+
+def _csr(rows, columns, n_rows):
+    """Grąžina (ptr, columns) CSR pavidalu: eilutės i reikšmės yra columns[ptr[i]:ptr[i + 1]]."""
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=ptr[1:])
+    return ptr, columns[np.argsort(rows, kind='stable')]
+
+
+class CoRentalMatrix:
+    """ Reta vartotojų ir suknelių matrica (1 - vartotojas nuomojosi suknelę).
+
+        Laikoma dviem CSR pavidalais: vartotojas -> suknelės ir suknelė -> vartotojai.
+        Suknelės eilutė bendrų nuomų matricoje (M^T M) skaičiuojama tik tada, kai jos reikia,
+        todėl pilnos suknelių x suknelių matricos atmintyje nelaikome."""
+
+    def __init__(self, pairs):
+        self.user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+        self.dress_ids, dresses = np.unique(pairs[:, 1], return_inverse=True)
+        self.user_ptr, self.user_dresses = _csr(users, dresses, len(self.user_ids))
+        self.dress_ptr, self.dress_users = _csr(dresses, users, len(self.dress_ids))
+        self.renters = np.diff(self.dress_ptr)
+
+    @classmethod
+    def from_rentals(cls):
+        """Sukuria matricą iš visų (taip pat archyvuotų) nuomų, po vieną porą vartotojui ir suknelei."""
+        chunks = [np.array(list(model.objects.filter(user__isnull=False)
+                                .values_list('user_id', 'dress_id').distinct()), dtype=np.int64).reshape(-1, 2)
+                  for model in (DressRental, ArchivedDressRental)]
+        return cls(np.unique(np.concatenate(chunks), axis=0))
+
+    def indexes(self, dress_ids):
+        """Grąžina matricoje esančių suknelių indeksus."""
+        dress_ids = np.asarray(dress_ids, dtype=np.int64)
+        return np.searchsorted(self.dress_ids, dress_ids[np.isin(dress_ids, self.dress_ids)])
+
+    def neighbourhood(self, dresses):
+        """Grąžina suknelių, kurių rekomendacijos priklauso nuo nurodytų suknelių, indeksus:
+        visas sukneles, kurias nuomojosi bent vienas šių suknelių nuomininkas."""
+        users = np.unique(_gather(self.dress_ptr, self.dress_users, dresses))
+        return np.unique(_gather(self.user_ptr, self.user_dresses, users))
+
+    def similar(self, dress, top_k, min_common=1):
+        """Grąžina iki top_k panašiausių suknelių [(suknelės ID, panašumas, bendrų nuomininkų sk.)].
+        Panašumas - kosinusinis: bendri nuomininkai / sqrt(nuomininkų sk. A * nuomininkų sk. B)."""
+        users = self.dress_users[self.dress_ptr[dress]:self.dress_ptr[dress + 1]]
+        common = np.bincount(_gather(self.user_ptr, self.user_dresses, users), minlength=len(self.dress_ids))
+        common[dress] = 0
+        candidates = np.flatnonzero(common >= max(min_common, 1))
+        scores = common[candidates] / np.sqrt(self.renters[dress] * self.renters[candidates])
+        if len(candidates) > top_k:
+            # Paliekamos ir vienodo panašumo suknelės ties riba, kad rezultatas nepriklausytų nuo jų tvarkos.
+            threshold = -np.partition(-scores, top_k - 1)[top_k - 1]
+            best = scores >= threshold
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((self.dress_ids[candidates], -scores))[:top_k]
+        return [(int(self.dress_ids[index]), float(score), int(common[index]))
+                for index, score in zip(candidates[order], scores[order])]
+
+
+def refresh_recommendations(top_k=6, min_common=1, full=False, batch_size=200):
+    """ Atnaujina DressRecommendation lentelę. Grąžina atnaujintų suknelių skaičių.
+
+        Be full perskaičiuojamos tik suknelės, kurias paveikė nuomos, atsiradusios po
+        paskutinio atnaujinimo (RecommendationState.last_rental_id). Ištrintos nuomos
+        taip neaptinkamos, todėl retkarčiais verta paleisti su full=True."""
+    state, _ = RecommendationState.objects.get_or_create(pk=1)
+    last_rental_id = DressRental.objects.aggregate(last=Max('id'))['last'] or 0
+    if not full and last_rental_id <= state.last_rental_id:
+        return 0
+
+    matrix = CoRentalMatrix.from_rentals()
+    if full:
+        targets = np.arange(len(matrix.dress_ids))
+        stale = set(DressRecommendation.objects.values_list('dress_id', flat=True).distinct())
+        stale -= set(matrix.dress_ids.tolist())
+        DressRecommendation.objects.filter(dress_id__in=stale).delete()
+    else:
+        changed = (DressRental.objects.filter(id__gt=state.last_rental_id, id__lte=last_rental_id)
+                   .values_list('dress_id', flat=True).distinct())
+        targets = matrix.neighbourhood(matrix.indexes(list(changed)))
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        rows = []
+        for dress in batch:
+            rows.extend(DressRecommendation(dress_id=int(matrix.dress_ids[dress]), recommended_id=recommended,
+                                            rank=rank, score=score, common_renters=common)
+                        for rank, (recommended, score, common) in enumerate(matrix.similar(dress, top_k, min_common)))
+        with transaction.atomic():
+            DressRecommendation.objects.filter(dress_id__in=matrix.dress_ids[batch].tolist()).delete()
+            DressRecommendation.objects.bulk_create(rows)
+
+    state.last_rental_id = last_rental_id
+    state.save()
+    transaction.on_commit(lambda: bump_version('recommendations'))
+    if prerenderer.active():
+        paths = dress_paths(matrix.dress_ids[targets].tolist())
+        transaction.on_commit(lambda: prerenderer.invalidate(paths))
+    return len(targets)
@@ -0,0 +1,48 @@
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .hashers import run_hashing
+from .models import Profile, User
+
+
+class RegistrationError(Exception):
+    """Klaida, kai vartotojo užregistruoti negalima (pvz. vardas ar el. paštas užimtas)."""
+
+
+def check_available(username, email):
+    """Viena užklausa patikrina, ar vartotojo vardas ir el. paštas dar neužimti.
+    Jei užimti, iškelia RegistrationError su pranešimu vartotojui."""
+    taken = User.objects.filter(Q(username=username) | Q(email=email)).values_list('username', 'email')
+    for taken_username, taken_email in taken:
+        if taken_username == username:
+            raise RegistrationError(f'Username {username} already exists')
+        if taken_email == email:
+            raise RegistrationError(f'Email {email} already exists')
+
+
+def register(username, email, password, iban, first_name='', last_name=''):
+    """ Užregistruoja naują vartotoją ir sukuria jo profilį vienoje transakcijoje.
+
+        Profilis su IBAN paruošiamas prieš išsaugant vartotoją, todėl create_profile signalas
+        jį įrašo vienu INSERT, be papildomų UPDATE ir be nuotraukos apdorojimo.
+        Unikalus el. pašto indeksas apsaugo nuo lenktynių, kai du vartotojai registruojasi vienu metu.
+
+        Vardas normalizuojamas kaip create_user (NFKC), todėl pvz. „ｆｕｌｌ“ ir „full“ laikomi tuo pačiu vardu.
+
+        Grąžina sukurtą vartotoją arba iškelia RegistrationError."""
+    username = User.normalize_username(username or '').strip()
+    if not username:
+        raise RegistrationError('Username is required')
+    email = User.objects.normalize_email(email)
+    check_available(username, email)
+
+    user = User(username=username, email=email, first_name=first_name, last_name=last_name)
+    user.password = run_hashing(make_password, password)
+    user.profile = Profile(iban=iban)
+    try:
+        with transaction.atomic():
+            user.save()
+    except IntegrityError:
+        raise RegistrationError(f'Username {username} or email {email} already exists')
+    return user
@@ -0,0 +1,142 @@
+import re
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img',
+    'li', 'ol', 'p', 'pre', 's', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot',
+    'th', 'thead', 'tr', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+BLOCK_TAGS = {
+    'blockquote', 'br', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'textarea', 'select'}
+VOID_DROP_TAGS = {'embed'}  # neturi pabaigos žymės, todėl neatidaro šalinamos srities
+IMPLICIT_CLOSE = {'li': {'li'}, 'p': {'p'}, 'tr': {'tr', 'td', 'th'}, 'td': {'td', 'th'}, 'th': {'td', 'th'}}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+ALLOWED_STYLES = {
+    'color', 'background-color', 'text-align', 'text-decoration', 'font-weight', 'font-style', 'font-size',
+    'padding-left', 'margin-left', 'width', 'height',
+}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+
+SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+UNSAFE_STYLE_RE = re.compile(r'url\s*\(|expression|javascript|/\*|[\\<>]', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def safe_url(url):
+    """Grąžina URL, jei jo schema leidžiama (arba URL yra santykinis), kitu atveju None."""
+    cleaned = ''.join(char for char in url if char > ' ').lower()
+    match = SCHEME_RE.match(cleaned)
+    if match and match.group(1) not in ALLOWED_SCHEMES:
+        return None
+    return url.strip()
+
+
+def safe_style(style):
+    """Palieka tik leidžiamas CSS savybes be url(), expression(), komentarų ir panašių konstrukcijų."""
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if name in ALLOWED_STYLES and value and not UNSAFE_STYLE_RE.search(value):
+            declarations.append(f"{name}: {value}")
+    return '; '.join(declarations)
+
+
+class DescriptionSanitizer(HTMLParser):
+    """ HTML valytuvas TinyMCE aprašymams.
+
+        Palieka tik leidžiamas žymes ir atributus, pašalina scenarijus ir jų turinį,
+        uždaro neuždarytas žymes ir kartu surenka aprašymo tekstą be žymių."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            if tag not in VOID_DROP_TAGS:
+                self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        cleaned = []
+        for name, value in attrs:
+            value = value or ''
+            if name == 'style':
+                value = safe_style(value)
+            elif name not in ALLOWED_ATTRIBUTES.get(tag, ()):
+                continue
+            elif name in ('href', 'src'):
+                value = safe_url(value)
+            if value:
+                cleaned.append(f' {name}="{escape(value)}"')
+        if tag == 'a' and any(attr.startswith(' target=') for attr in cleaned):
+            cleaned.append(' rel="noopener noreferrer"')
+
+        while self.open_tags and self.open_tags[-1] in IMPLICIT_CLOSE.get(tag, ()):
+            self.html.append(f"</{self.open_tags.pop()}>")
+        self.html.append(f"<{tag}{''.join(cleaned)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return  # <iframe/> - uždaryta iškart, turinio nėra
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            if tag not in VOID_DROP_TAGS:
+                self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        """Grąžina išvalytą HTML ir tekstą be žymių."""
+        self.close()
+        closing = ''.join(f"</{tag}>" for tag in reversed(self.open_tags))
+        html = ''.join(self.html) + closing
+        text = WHITESPACE_RE.sub(' ', ''.join(self.text)).strip()
+        return html, text
+
+
+def sanitize_html(value):
+    """Išvalo aprašymo HTML. Grąžina porą (saugus HTML, tekstas be žymių)."""
+    if not value:
+        return '', ''
+    sanitizer = DescriptionSanitizer()
+    sanitizer.feed(value)
+    return sanitizer.result()
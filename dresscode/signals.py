@@ -1,17 +1,263 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_init, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
+from django.urls import reverse
 
-from .models import Profile, User
+from . import lookups
+from .autocomplete import prefix_index
+from .events import record_rental_save, remember_status
+from .facets import facet_index
+from .models import Designer, Dress, DressRental, DressReview, Profile, Size, Style, User
+from .prerender import designer_paths, dress_change_paths, dress_paths, prerenderer
+from .versions import bump_version
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Jei nustatytas SQLITE_WAL, SQLite jungtis perjungiama į WAL režimą: skaitytojai neblokuoja
+    rašytojo, todėl tą patį failą gali naudoti keli darbiniai procesai."""
+    if connection.vendor == 'sqlite' and settings.SQLITE_WAL:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
 
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
-    """Sukuria naują profilį, kai sukuriamas naujas vartotojas."""
+    """Sukuria naują profilį, kai sukuriamas naujas vartotojas.
+    Jei profilis paruoštas iš anksto (pvz. registracijos metu su IBAN), įrašomas jis."""
     if created:
-        Profile.objects.create(user=instance)
+        if User.profile.is_cached(instance):
+            profile = instance.profile
+            profile.user = instance
+            profile.save()
+        else:
+            Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def save_profile(sender, instance, created, **kwargs):
+    """Išsaugo vartotojo profilį, kai vartotojo informacija atnaujinama.
+    Profilis saugomas tik jei jis buvo įkeltas, todėl pvz. prisijungimas nevykdo papildomų užklausų."""
+    if not created and User.profile.is_cached(instance):
+        instance.profile.save()
+
+
+@receiver(post_save, sender=Dress)
+def update_dress_facets(sender, instance, **kwargs):
+    """Atnaujina suknelės filtrų reikšmes indekse, kai suknelė išsaugoma."""
+    transaction.on_commit(lambda: facet_index.update_dress(instance.pk))
+
+
+@receiver(post_delete, sender=Dress)
+def remove_dress_facets(sender, instance, **kwargs):
+    """Pašalina ištrintą suknelę iš filtrų indekso."""
+    dress_id = instance.pk
+    transaction.on_commit(lambda: facet_index.remove_dress(dress_id))
+
+
+@receiver(m2m_changed, sender=Dress.sizes.through)
+@receiver(m2m_changed, sender=Dress.styles.through)
+def update_dress_m2m_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    """Atnaujina filtrų indeksą, kai pakeičiami suknelės dydžiai ar stiliai,
+    ir pamiršta suknelėje įsimintus jų ID (Dress.related_ids)."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.__dict__.pop('_related_ids', None)
+        transaction.on_commit(lambda: facet_index.update_dress(instance.pk))
+    elif pk_set:
+        dress_ids = list(pk_set)
+        transaction.on_commit(lambda: [facet_index.update_dress(dress_id) for dress_id in dress_ids])
+    else:
+        transaction.on_commit(facet_index.invalidate)
+
+
+@receiver(post_delete, sender=Size)
+@receiver(post_delete, sender=Style)
+def invalidate_facets(sender, instance, **kwargs):
+    """Ištrynus dydį ar stilių, filtrų indeksas perkuriamas."""
+    transaction.on_commit(facet_index.invalidate)
+
+
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def invalidate_sizes(sender, **kwargs):
+    """Pakeitus dydžius, visų procesų Size lentelės kopijos perkraunamos."""
+    transaction.on_commit(lookups.sizes.invalidate)
+
+
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def invalidate_styles(sender, **kwargs):
+    """Pakeitus stilius, visų procesų Style lentelės kopijos perkraunamos."""
+    transaction.on_commit(lookups.styles.invalidate)
+
+
+@receiver(post_save, sender=Dress)
+@receiver(post_delete, sender=Dress)
+@receiver(post_save, sender=Designer)
+@receiver(post_delete, sender=Designer)
+def invalidate_catalog_fragments(sender, **kwargs):
+    """Pakeitus suknelę ar dizainerį, podėlyje laikomos suknelių kortelės tampa pasenusios."""
+    transaction.on_commit(lambda: bump_version('catalog'))
+
+
+@receiver(post_save, sender=DressReview)
+@receiver(post_delete, sender=DressReview)
+def invalidate_review_fragments(sender, instance, **kwargs):
+    """Pakeitus atsiliepimą, podėlyje laikomas suknelės atsiliepimų sąrašas tampa pasenusiu."""
+    dress_id = instance.dress_id
+    transaction.on_commit(lambda: bump_version(f'reviews:{dress_id}'))
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    """Įsimena įkeltą vartotojo vardą, kad išsaugant būtų galima nustatyti, ar jis pakeistas."""
+    instance._loaded_username = instance.__dict__.get('username')
 
 
 @receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    """Išsaugo vartotojo profilį, kai vartotojo informacija atnaujinama."""
-    instance.profile.save()
+def invalidate_renamed_reviewer(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Atsiliepimų fragmentuose ir iš anksto atvaizduotuose puslapiuose rodomas autoriaus vardas,
+    todėl pakeitus vardą pasensta visų jo komentuotų suknelių atsiliepimai. Išsaugant tik kitus
+    laukus (pvz. last_login prisijungiant) papildomų užklausų nėra."""
+    if created or raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    loaded = getattr(instance, '_loaded_username', None)
+    instance._loaded_username = instance.username
+    if loaded == instance.username:
+        return
+    dress_ids = list(DressReview.objects.filter(reviewer=instance).values_list('dress_id', flat=True).distinct())
+    if not dress_ids:
+        return
+    paths = dress_paths(dress_ids) if prerenderer.active() else []
+
+    def invalidate():
+        for dress_id in dress_ids:
+            bump_version(f'reviews:{dress_id}')
+        if paths:
+            prerenderer.invalidate(paths)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Dress)
+@receiver(post_delete, sender=Dress)
+@receiver(post_save, sender=Designer)
+@receiver(post_delete, sender=Designer)
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def invalidate_autocomplete(sender, **kwargs):
+    """Pakeitus katalogą, automatinio užbaigimo indeksai perkuriami fone."""
+    transaction.on_commit(prefix_index.invalidate)
+
+
+@receiver(post_init, sender=DressRental)
+def remember_rental_status(sender, instance, **kwargs):
+    """Įsimena įkeltą nuomos statusą, kad išsaugant būtų galima nustatyti, ar jis pasikeitė."""
+    remember_status(instance)
+
+
+@receiver(post_save, sender=DressRental)
+def log_rental_event(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    """Įrašo nuomos sukūrimo ar statuso pakeitimo įvykį į RentalEvent žurnalą."""
+    if not raw:
+        record_rental_save(instance, created, using, update_fields)
+
+
+@receiver(post_init, sender=Dress)
+def remember_dress_state(sender, instance, **kwargs):
+    """Įsimena įkeltą suknelės dizainerį (jį pakeitus atnaujinami abiejų dizainerių puslapiai)
+    ir nuotraukos pavadinimą (hash'ai perskaičiuojami tik pakeitus nuotrauką)."""
+    instance._loaded_designer_id = instance.__dict__.get('designer_id')
+    photo = instance.__dict__.get('dresses_pics')
+    instance._loaded_photo = getattr(photo, 'name', photo)
+
+
+@receiver(post_save, sender=Dress)
+@receiver(pre_delete, sender=Dress)
+def prerender_dress(sender, instance, **kwargs):
+    """Atnaujina iš anksto atvaizduotus puslapius, kuriuose rodoma suknelė. Trinant puslapiai
+    surenkami prieš ištrinant rekomendacijas, kurios rodo į suknelę."""
+    if not prerenderer.active():
+        return
+    designer_ids = {instance.designer_id, getattr(instance, '_loaded_designer_id', None)} - {None}
+    paths = dress_change_paths([instance.pk], designer_ids)
+    transaction.on_commit(lambda: prerenderer.invalidate(paths))
+
+
+@receiver(m2m_changed, sender=Dress.sizes.through)
+@receiver(m2m_changed, sender=Dress.styles.through)
+def prerender_dress_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """Pakeitus suknelės dydžius ar stilius, atnaujinami ją rodantys puslapiai."""
+    if action not in ('post_add', 'post_remove', 'post_clear') or not prerenderer.active():
+        return
+    if not reverse:
+        paths = dress_change_paths([instance.pk], [instance.designer_id])
+    elif pk_set:
+        designer_ids = Dress.objects.filter(pk__in=pk_set).values_list('designer_id', flat=True).distinct()
+        paths = dress_change_paths(list(pk_set), designer_ids)
+    else:
+        transaction.on_commit(prerenderer.invalidate_all)
+        return
+    transaction.on_commit(lambda: prerenderer.invalidate(paths))
+
+
+@receiver(post_save, sender=Designer)
+@receiver(post_delete, sender=Designer)
+def prerender_designer(sender, instance, **kwargs):
+    """Pakeitus dizainerį, atnaujinamas dizainerių sąrašas, jo puslapis ir jo suknelių puslapiai."""
+    if not prerenderer.active():
+        return
+    dress_ids = Dress.objects.filter(designer_id=instance.pk).values_list('id', flat=True)
+    paths = [reverse('designers-all'), reverse('dresses-all'), *designer_paths([instance.pk]), *dress_paths(dress_ids)]
+    transaction.on_commit(lambda: prerenderer.invalidate(paths))
+
+
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def prerender_everything(sender, **kwargs):
+    """Dydžiai ir stiliai rodomi beveik visuose puslapiuose, todėl pašalinami visi."""
+    transaction.on_commit(prerenderer.invalidate_all)
+
+
+@receiver(post_save, sender=DressReview)
+@receiver(post_delete, sender=DressReview)
+def prerender_reviews(sender, instance, **kwargs):
+    """Pakeitus atsiliepimą, atnaujinamas tik suknelės puslapis."""
+    if instance.dress_id is None or not prerenderer.active():
+        return
+    paths = dress_paths([instance.dress_id])
+    transaction.on_commit(lambda: prerenderer.invalidate(paths))
+
+
+@receiver(pre_save, sender=Dress)
+def hash_dress_photo(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Įkėlus ar pakeitus nuotrauką, apskaičiuoja jos dHash ir pHash panašių nuotraukų paieškai.
+    Tas pats jau išsaugotas failas iš naujo neskaitomas."""
+    if raw or 'dresses_pics' not in instance.__dict__:
+        return
+    if update_fields is not None and not {'dresses_pics', 'photo_dhash', 'photo_phash'} <= set(update_fields):
+        return
+    photo = instance.dresses_pics
+    if (photo and photo._committed and photo.name == getattr(instance, '_loaded_photo', None)
+            and instance.photo_phash is not None):
+        return
+    if not photo and instance.photo_phash is None:
+        return
+    from .photohash import photo_hashes  # numpy ir PIL neįkeliami paleidžiant programą
+    instance.photo_dhash, instance.photo_phash = photo_hashes(photo)
+    instance._photo_hashed = True
+
+
+@receiver(post_save, sender=Dress)
+@receiver(post_delete, sender=Dress)
+def invalidate_photo_hashes(sender, instance, signal, **kwargs):
+    """Pasikeitus nuotraukos hash'ams ar ištrynus suknelę su nuotrauka, panašių nuotraukų indeksas perkuriamas."""
+    if getattr(instance, '_photo_hashed', False) or (signal is post_delete and instance.photo_phash is not None):
+        instance._photo_hashed = False
+        transaction.on_commit(lambda: bump_version('photohash'))
@@ -0,0 +1,63 @@
+// Fills the search box suggestions from the autocomplete endpoint while the user types.
+function bindAutocomplete() {
+    const input = document.querySelector('input[data-autocomplete-url]');
+    if (!input || input.dataset.autocompleteBound) {
+        return;
+    }
+    input.dataset.autocompleteBound = 'true';
+    const list = document.getElementById(input.getAttribute('list'));
+    const cache = new Map();
+    let suggestions = [];
+    let controller = null;
+    let timer = null;
+
+    function show(items) {
+        suggestions = items;
+        list.replaceChildren(...items.map(function (item) {
+            const option = document.createElement('option');
+            option.value = item.label;
+            option.label = item.kind;
+            return option;
+        }));
+    }
+
+    function load() {
+        const query = input.value.trim();
+        if (!query) {
+            show([]);
+            return;
+        }
+        if (cache.has(query)) {
+            show(cache.get(query));
+            return;
+        }
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        fetch(input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query), {signal: controller.signal})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                cache.set(data.query, data.suggestions);
+                if (data.query === input.value.trim()) {
+                    show(data.suggestions);
+                }
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener('input', function (event) {
+        // A suggestion picked from the list opens its page directly.
+        const picked = !event.inputType && suggestions.find(function (item) { return item.label === input.value; });
+        if (picked) {
+            window.location.href = picked.url;
+            return;
+        }
+        clearTimeout(timer);
+        timer = setTimeout(load, 100);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', bindAutocomplete);
+// On publicly cached pages the search box arrives with the navigation fragment.
+document.addEventListener('fragments:loaded', bindAutocomplete);
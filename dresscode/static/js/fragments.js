@@ -0,0 +1,16 @@
+// Fills the personal parts of publicly cached pages (navigation, messages, rent and comment forms,
+// review delete links) from the user fragments endpoint.
+(function () {
+    const url = document.currentScript.dataset.url;
+    fetch(url, {credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (fragments) {
+            Object.entries(fragments).forEach(function ([name, html]) {
+                document.querySelectorAll('[data-fragment="' + name + '"]').forEach(function (element) {
+                    element.innerHTML = html;
+                });
+            });
+            document.dispatchEvent(new Event('fragments:loaded'));
+        })
+        .catch(function () {});
+})();
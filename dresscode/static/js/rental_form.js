@@ -0,0 +1,46 @@
+// Checks the rental dates and size with the availability endpoint before the form is submitted.
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.querySelector('form[data-availability-url]');
+    if (!form) {
+        return;
+    }
+    const fields = ['start_date', 'return_date', 'size'];
+    const messages = form.querySelector('.availability-errors');
+    const submit = form.querySelector('input[type="submit"]');
+    let timer = null;
+
+    function check() {
+        const params = new URLSearchParams();
+        fields.forEach(function (name) {
+            const input = form.querySelector('[name="' + name + '"]');
+            if (input && input.value) {
+                params.set(name, input.value);
+            }
+        });
+        if (form.dataset.rentalId) {
+            params.set('rental', form.dataset.rentalId);
+        }
+        fetch(form.dataset.availabilityUrl + '?' + params.toString(), {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                messages.textContent = Object.values(data.errors).join(' ');
+                messages.hidden = data.available;
+                submit.disabled = !data.available;
+            })
+            .catch(function () {
+                // The server validates the form again on submit.
+                messages.hidden = true;
+                submit.disabled = false;
+            });
+    }
+
+    fields.forEach(function (name) {
+        const input = form.querySelector('[name="' + name + '"]');
+        if (input) {
+            input.addEventListener('change', function () {
+                clearTimeout(timer);
+                timer = setTimeout(check, 200);
+            });
+        }
+    });
+});
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import uuid
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import FileField
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """ Failų saugykla, kuri įkeltus failus pavadina pagal jų turinio SHA-256 maišą.
+
+        Vienodo turinio failai saugomi tik vieną kartą: pakartotinai įkėlus tą pačią
+        nuotrauką, grąžinamas jau esančio failo pavadinimas ir nieko nerašoma į diską.
+        Failas laikomas naudojamu tol, kol į jį rodo bent vienas modelio įrašas.
+
+        Metodai:
+            get_available_name(): Grąžina pavadinimą be atsitiktinių priesagų.
+            hashed_name(): Sudaro failo pavadinimą pagal turinio maišą.
+            references(): Suskaičiuoja, kiek įrašų naudoja failą.
+            delete(): Ištrina failą tik tada, kai į jį nebenurodo joks įrašas."""
+
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        """Pavadinimas nustatomas _save() metu pagal turinį,
+        todėl Django atsitiktinės priesagos nereikalingos."""
+        return name
+
+    def hashed_name(self, name, content):
+        """Sudaro failo pavadinimą: <katalogas>/<sha256><plėtinys>."""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        dir_name, file_name = os.path.split(name)
+        ext = os.path.splitext(file_name)[1].lower()
+        return os.path.join(dir_name, f"{digest.hexdigest()}{ext}").replace('\\', '/')
+
+    def _save(self, name, content):
+        """Išsaugo failą tik tada, kai tokio turinio failo dar nėra.
+        Failas įrašomas laikinu pavadinimu ir tik tada pervadinamas, todėl kai katalogą
+        naudoja keli procesai ar serveriai, niekas nemato pusiau įrašyto failo, o vienu metu
+        įkėlus tą patį turinį, abu įrašymai baigiasi tuo pačiu failu."""
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        temp_name = super()._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+    def references(self, name, exclude=None):
+        """Grąžina, kiek modelių įrašų rodo į failą su nurodytu pavadinimu.
+        exclude - modelio įrašas, kurio nuoroda neskaičiuojama (pvz. keičiamas ar trinamas pats kviečiantysis)."""
+        total = 0
+        for field in hashed_file_fields():
+            records = field.model._default_manager.filter(**{field.name: name})
+            if exclude is not None and isinstance(exclude, field.model):
+                records = records.exclude(pk=exclude.pk)
+            total += records.count()
+        return total
+
+    def delete(self, name, exclude=None):
+        """ Ištrina failą tik tada, kai į jį nerodo joks duomenų bazės įrašas, išskyrus exclude.
+
+            Kviečiantysis turi pirma ištrinti savo įrašą ar pakeisti jo failą, arba perduoti savo
+            įrašą kaip exclude. Django FieldFile.delete() exclude neperduoda, todėl taip „ištrintas“
+            failas lieka, kol jo įrašas išsaugomas be jo; tokius failus vėliau pašalina gc_media."""
+        if name and self.references(name, exclude=exclude):
+            return
+        super().delete(name)
+
+
+def hashed_file_fields():
+    """Grąžina visus projekto failų laukus, kurie naudoja ContentHashStorage."""
+    return [field
+            for model in apps.get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, FileField) and isinstance(field.storage, ContentHashStorage)]
+
+
+def reference_counts():
+    """Suskaičiuoja, kiek kartų kiekvienas failas naudojamas duomenų bazėje.
+    Įtraukiamos ir laukų numatytosios reikšmės, kad jos niekada nebūtų ištrintos."""
+    counts = Counter()
+    for field in hashed_file_fields():
+        if isinstance(field.default, str):
+            counts[field.default] += 0
+        names = (field.model._default_manager
+                 .exclude(**{field.name: ''})
+                 .exclude(**{f"{field.name}__isnull": True})
+                 .values_list(field.name, flat=True))
+        for name in names.iterator(chunk_size=2000):
+            counts[name] += 1
+    return counts
+
+
+content_hash_storage = ContentHashStorage()
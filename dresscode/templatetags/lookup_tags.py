@@ -0,0 +1,17 @@
+from django import template
+
+from dresscode import lookups
+
+register = template.Library()
+
+
+@register.filter
+def size_name(size_id):
+    """Grąžina dydžio pavadinimą pagal ID be užklausos į duomenų bazę."""
+    return lookups.sizes.name(size_id)
+
+
+@register.filter
+def style_name(style_id):
+    """Grąžina stiliaus pavadinimą pagal ID be užklausos į duomenų bazę."""
+    return lookups.styles.name(style_id)
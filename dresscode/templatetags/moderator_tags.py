@@ -0,0 +1,9 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def is_moderator(user):
+    """Tikrina, ar vartotojas priklauso 'moderators' grupei."""
+    return user.groups.filter(name='moderators').exists()
@@ -1,3 +1,2068 @@
-from django.test import TestCase
+import asyncio
+import email
+import io
+import os
+import shutil
+import socket
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from email.mime.text import MIMEText
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.template.base import Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import hashers, lookups, mail, maintenance, profiling, registration, urls
+from .admission import Pool
+from .autocomplete import PrefixIndex
+from .middleware import RateLimitMiddleware
+from .benchmarks import measure, seed_catalog, seed_rentals, seed_users
+from .deletion import bulk_delete
+from .facets import facet_index
+from .models import (ArchivedDressRental, Designer, Dress, DressRecommendation, DressRental, DressReview,
+                     OutboundEmail, Profile, RecommendationState, RentalEvent, Size, Style, User)
+from .photohash import PhotoHashIndex, image_hashes
+from .prerender import designer_paths, dress_change_paths, dress_paths, page_file, prerenderer
+from .query_plans import check_plans
+from .recommendations import CoRentalMatrix, refresh_recommendations
+from .ratelimit import Rate
+from .sanitizer import sanitize_html
+from .utils import validate_rental
+from .views import DESIGNER_DRESSES_PER_PAGE, DESIGNERS_PER_PAGE
+from .storage import content_hash_storage
+from .versions import bump_version, get_version
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dresscode-tests'}}
+
+
+class QueryPlanTests(TestCase):
+    """Dažnos užklausos turi naudoti indeksus, o ne skaityti visą lentelę."""
+
+    def test_hot_queries_use_indexes(self):
+        for name, plan, scans in check_plans():
+            with self.subTest(name):
+                self.assertEqual(scans, [], plan)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, RATELIMIT_ENABLED=True, RATELIMIT_CACHE='default',
+                   RATELIMIT_IP_HEADER='REMOTE_ADDR', RATELIMIT_TRUSTED_PROXIES=1)
+class RateLimitTests(TestCase):
+    """RateLimitMiddleware: kibiro talpa, 429 su Retry-After, raktai pagal vartotoją ir IP, metodų filtras."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse())
+
+    def call(self, rule, path=None, method='get', user=None, **extra):
+        path = path or reverse('search')
+        request = getattr(self.factory, method)(path, **extra)
+        request.user = user or AnonymousUser()
+        request.resolver_match = resolve(path)
+        with mock.patch.dict(urls.ratelimits, {request.resolver_match.url_name: rule}):
+            return self.middleware.process_view(request, None, (), {})
+
+    def test_burst_then_429_with_retry_after(self):
+        rule = Rate('60/m', burst=3)
+        self.assertEqual([self.call(rule) for _ in range(3)], [None, None, None])
+        response = self.call(rule)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_rejected_through_the_client(self):
+        with mock.patch.dict(urls.ratelimits, {'search': Rate('1/h', burst=1)}):
+            self.assertEqual(self.client.get(reverse('search')).status_code, 200)
+            response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 3000)
+
+    def test_ip_key_separates_addresses(self):
+        rule = Rate('1/h', burst=1)
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.1'))
+        self.assertEqual(self.call(rule, REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.2'))
+
+    def test_user_key_follows_the_user_not_the_address(self):
+        rule = Rate('1/h', burst=1, key='user')
+        first, second = User.objects.create(username='first'), User.objects.create(username='second')
+        self.assertIsNone(self.call(rule, user=first, REMOTE_ADDR='10.0.0.1'))
+        self.assertEqual(self.call(rule, user=first, REMOTE_ADDR='10.0.0.2').status_code, 429)
+        self.assertIsNone(self.call(rule, user=second, REMOTE_ADDR='10.0.0.1'))
+        # Neprisijungę ribojami pagal IP.
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.1'))
+        self.assertEqual(self.call(rule, REMOTE_ADDR='10.0.0.1').status_code, 429)
+
+    def test_method_filter(self):
+        rule = Rate('1/h', burst=1, methods=('POST',))
+        for _ in range(3):
+            self.assertIsNone(self.call(rule))
+        self.assertIsNone(self.call(rule, method='post'))
+        self.assertEqual(self.call(rule, method='post').status_code, 429)
+
+    def test_url_without_rule_is_not_limited(self):
+        request = self.factory.get(reverse('dresses-all'))
+        request.resolver_match = resolve(request.path)
+        for _ in range(50):
+            self.assertIsNone(self.middleware.process_view(request, None, (), {}))
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_spoofed_forwarded_for_is_ignored(self):
+        rule = Rate('1/h', burst=1)
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.5'))
+        # Klientas kiekvieną kartą pateikia kitą "savo" adresą, bet tarpinis serveris prideda tikrąjį.
+        response = self.call(rule, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='2.2.2.2, 203.0.113.5')
+        self.assertEqual(response.status_code, 429)
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='203.0.113.6'))
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATELIMIT_TRUSTED_PROXIES=2)
+    def test_trusted_proxy_hops(self):
+        rule = Rate('1/h', burst=1)
+        forwarded = '6.6.6.6, 203.0.113.5, 10.0.0.8'
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR=forwarded))
+        response = self.call(rule, REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR=forwarded.replace('6.6.6.6', '7.7.7.7'))
+        self.assertEqual(response.status_code, 429)
+        # Be antraštės (ne per tarpinius serverius) naudojamas REMOTE_ADDR.
+        self.assertIsNone(self.call(rule, REMOTE_ADDR='10.0.0.7'))
+
+
+class PoolTests(TestCase):
+    """admission.Pool: riba, eilės ilgis, laukimo laikas ir prioritetai gijoms bei korutinoms."""
+
+    def wait_until(self, condition):
+        for _ in range(400):
+            if condition():
+                return
+            threading.Event().wait(0.005)
+        self.fail('condition not reached')
+
+    def test_full_queue_rejects_and_timeout_gives_up(self):
+        pool = Pool(limit=1, queue=0, timeout=5)
+        self.assertTrue(pool.acquire())
+        self.assertFalse(pool.acquire())
+        pool.timeout = 0.05
+        pool.queue = 1
+        self.assertFalse(pool.acquire())
+        self.assertEqual((pool.active, pool.queued), (1, 0))
+        pool.release()
+        self.assertEqual(pool.active, 0)
+
+    def test_released_slot_goes_to_the_most_important_waiter(self):
+        pool = Pool(limit=1, queue=2, timeout=5)
+        self.assertTrue(pool.acquire())
+        results = []
+        threads = [threading.Thread(target=lambda: results.append((1, pool.acquire(1))))]
+        threads[0].start()
+        self.wait_until(lambda: pool.queued == 1)
+        threads.append(threading.Thread(target=lambda: results.append((0, pool.acquire(0)))))
+        threads[1].start()
+        self.wait_until(lambda: pool.queued == 2)
+
+        pool.release()
+        self.wait_until(lambda: results)
+        self.assertEqual(results, [(0, True)])
+        pool.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(0, True), (1, True)])
+        pool.release()
+        self.assertEqual((pool.active, pool.queued), (0, 0))
+
+    def test_important_request_sheds_a_queued_one(self):
+        pool = Pool(limit=1, queue=1, timeout=5)
+        self.assertTrue(pool.acquire())
+        results = []
+        low = threading.Thread(target=lambda: results.append((1, pool.acquire(1))))
+        low.start()
+        self.wait_until(lambda: pool.queued == 1)
+        self.assertFalse(pool.acquire(1))  # tokio pat prioriteto naujokas eilės neperima
+
+        high = threading.Thread(target=lambda: results.append((0, pool.acquire(0))))
+        high.start()
+        low.join()
+        self.assertEqual(results, [(1, False)])
+        pool.release()
+        high.join()
+        self.assertEqual(results, [(1, False), (0, True)])
+        pool.release()
+        self.assertEqual((pool.active, pool.queued), (0, 0))
+
+    def test_coroutine_is_woken_by_a_thread(self):
+        pool = Pool(limit=1, queue=1, timeout=5)
+        self.assertTrue(pool.acquire())
+
+        async def waiter():
+            task = asyncio.ensure_future(pool.acquire_async())
+            while not pool.queued:
+                await asyncio.sleep(0.005)
+            threading.Thread(target=pool.release).start()
+            return await task
+
+        self.assertTrue(asyncio.run(waiter()))
+        self.assertEqual((pool.active, pool.queued), (1, 0))
+        pool.release()
+
+    def test_cancelled_coroutine_returns_its_slot(self):
+        pool = Pool(limit=1, queue=1, timeout=5)
+        self.assertTrue(pool.acquire())
+
+        async def cancelled():
+            task = asyncio.ensure_future(pool.acquire_async())
+            while not pool.queued:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancelled())
+        self.assertEqual((pool.active, pool.queued), (1, 0))
+        pool.release()
+        self.assertEqual(pool.active, 0)
+
+
+@override_settings(ADMISSION_ENABLED=True, RATELIMIT_ENABLED=True, CACHES=LOCMEM_CACHE, RATELIMIT_CACHE='default',
+                   RATELIMIT_IP_HEADER='REMOTE_ADDR', PRERENDER_ENABLED=True, TEMPLATE_PROFILING=True)
+class AdmissionControlTests(TestCase):
+    """AdmissionControlMiddleware ir kiti projekto middleware WSGI ir ASGI grandinėje."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.pool = Pool(limit=1, queue=0, timeout=0.05)
+        patcher = mock.patch.dict(urls.admission_pools, {'default': self.pool})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_request_takes_and_returns_a_slot(self):
+        with mock.patch.object(Pool, 'acquire_async', side_effect=AssertionError('async path in WSGI')):
+            response = self.client.get(reverse('designers-all'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response.headers)
+        self.assertEqual(self.pool.active, 0)
+
+    def test_sync_request_is_rejected_when_the_pool_is_full(self):
+        self.assertTrue(self.pool.acquire())
+        response = self.client.get(reverse('designers-all'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.pool.release()
+
+    def test_unknown_url_is_not_admitted(self):
+        self.assertTrue(self.pool.acquire())
+        self.assertEqual(self.client.get('/dresscode/no-such-page/').status_code, 404)
+        self.pool.release()
+
+    async def test_async_chain_uses_the_async_path(self):
+        with mock.patch.object(Pool, 'acquire', side_effect=AssertionError('thread blocked in ASGI')):
+            response = await self.async_client.get(reverse('designers-all'))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Server-Timing', response.headers)
+            self.assertEqual(self.pool.active, 0)
+
+            self.pool.active = 1  # vieta užimta kitos užklausos
+            response = await self.async_client.get(reverse('designers-all'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    async def test_async_chain_applies_rate_limits(self):
+        with mock.patch.dict(urls.ratelimits, {'designers-all': Rate('1/h', burst=1)}):
+            self.assertEqual((await self.async_client.get(reverse('designers-all'))).status_code, 200)
+            response = await self.async_client.get(reverse('designers-all'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.pool.active, 0)
+
+
+class SanitizerTests(SimpleTestCase):
+    """sanitize_html: pavojingos schemos (ir užmaskuotos), scenarijų turinys, komentarai ir neuždarytos žymės."""
+
+    def assertClean(self, html, expected_html, expected_text=None):
+        cleaned, text = sanitize_html(html)
+        self.assertEqual(cleaned, expected_html)
+        if expected_text is not None:
+            self.assertEqual(text, expected_text)
+
+    def test_script_and_data_urls_are_dropped(self):
+        self.assertClean('<a href="javascript:alert(1)">x</a>', '<a>x</a>', 'x')
+        self.assertClean('<a href="vbscript:msgbox(1)">x</a>', '<a>x</a>')
+        self.assertClean('<img src="data:image/svg+xml;base64,PHN2Zz4=" alt="a">', '<img alt="a">')
+        self.assertClean('<a href="DATA:text/html,&lt;script&gt;">x</a>', '<a>x</a>')
+
+    def test_disguised_schemes_are_dropped(self):
+        for href in ('JaVaScRiPt:alert(1)', '&#106;avascript:alert(1)', '&#x6A;avascript:alert(1)',
+                     'java&#x09;script:alert(1)', 'jav&NewLine;ascript&colon;alert(1)', ' \x01javascript:alert(1)',
+                     'java\0script:alert(1)', '  javascript:alert(1)'):
+            with self.subTest(href=href):
+                self.assertClean(f'<a href="{href}">x</a>', '<a>x</a>')
+
+    def test_safe_urls_are_kept_and_escaped(self):
+        self.assertClean('<a href="https://example.com/?a=1&b=2" target="_blank">ok</a>',
+                         '<a href="https://example.com/?a=1&amp;b=2" target="_blank" rel="noopener noreferrer">ok</a>')
+        self.assertClean('<a href="/dresscode/dresses/1">d</a>', '<a href="/dresscode/dresses/1">d</a>')
+        self.assertClean('<a href="mailto:info@example.com">m</a>', '<a href="mailto:info@example.com">m</a>')
+
+    def test_script_and_style_content_is_removed(self):
+        self.assertClean('<SCRIPT>alert(1)</SCRIPT>after', 'after', 'after')
+        self.assertClean('<style>body { display: none }</style>after', 'after', 'after')
+        self.assertClean('<script>document.write("</p><b>")</script>after', 'after')
+        self.assertClean('<p>a<script>never closed', '<p>a</p>', 'a')
+        self.assertClean('<svg><script>alert(1)</script></svg>ok', 'ok')
+        self.assertClean('<textarea><img src=x onerror=alert(1)></textarea>ok', 'ok')
+        self.assertClean('<noscript><p title="</noscript><img src=x onerror=alert(1)>"></noscript>ok', 'ok')
+
+    def test_event_handlers_and_unknown_attributes_are_dropped(self):
+        self.assertClean('<img src=x onerror=alert(1)>', '<img src="x">')
+        self.assertClean('<p onclick="alert(1)" class="big">c</p>', '<p>c</p>')
+        self.assertClean('<a title="&quot;><script>">t</a>', '<a title="&quot;&gt;&lt;script&gt;">t</a>')
+
+    def test_void_and_self_closed_embeds_do_not_drop_the_rest(self):
+        self.assertClean('<p>Intro</p><embed src="v.swf"><p>Hello world</p>', '<p>Intro</p><p>Hello world</p>',
+                         'Intro Hello world')
+        self.assertClean('<p>Intro</p><iframe src="x"/><p>Hello world</p>', '<p>Intro</p><p>Hello world</p>',
+                         'Intro Hello world')
+        self.assertClean('<embed src="v.swf"></embed>after', 'after', 'after')
+        self.assertClean('<iframe><embed src="v.swf"><p>hidden</p></iframe>after', 'after', 'after')
+
+    def test_unsafe_styles_are_dropped(self):
+        self.assertClean('<p style="COLOR: red; position: fixed; background-color: url(x)">c</p>',
+                         '<p style="color: red">c</p>')
+        self.assertClean('<p style="color: exp/**/ression(alert(1))">c</p>', '<p>c</p>')
+        self.assertClean('<p style="color: e\\xpression(alert(1))">c</p>', '<p>c</p>')
+        self.assertClean('<p style="color: url&#40;x)">c</p>', '<p>c</p>')
+
+    def test_unclosed_tags_are_closed(self):
+        self.assertClean('<p>one<b>two', '<p>one<b>two</b></p>', 'onetwo')
+        self.assertClean('<ul><li>a<li>b</ul>', '<ul><li>a</li><li>b</li></ul>', 'a b')
+        self.assertClean('<b>bold</i> text</b>', '<b>bold text</b>')
+        self.assertClean('"><img src=x>', '"&gt;<img src="x">')
+
+    def test_comments_and_cdata_are_removed(self):
+        self.assertClean('<!-- <script>alert(1)</script> -->after', 'after', 'after')
+        self.assertClean('<!--><img src=x onerror=alert(1)>-->ok', 'ok')
+        self.assertClean('<![CDATA[<script>alert(1)</script>]]>after', 'after')
+        self.assertClean('<!--[if IE]><script>alert(1)</script><![endif]-->ok', 'ok')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FacetIndexTests(TestCase):
+    """facets.FacetIndex: skaičiai, atranka ir atnaujinimas po suknelių, m2m pakeitimų ir masinio trynimo."""
+
+    def setUp(self):
+        caches['default'].clear()
+        facet_index.invalidate()
+        self.addCleanup(facet_index.invalidate)
+        self.small, self.large = Size.objects.create(name='S'), Size.objects.create(name='L')
+        self.evening = Style.objects.create(name='Evening')
+        self.anna = Designer.objects.create(name='Anna', surname='A')
+        self.bruno = Designer.objects.create(name='Bruno', surname='B')
+        self.red = self.dress('F1', ' Red', self.anna, [self.small], [self.evening])
+        self.blue = self.dress('F2', 'blue', self.anna, [self.small, self.large], [])
+        self.green = self.dress('F3', 'green', self.bruno, [self.large], [self.evening])
+
+    def dress(self, item_code, color, designer, sizes, styles, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            dress = Dress.objects.create(item_code=item_code, color=color, designer=designer, **kwargs)
+            dress.sizes.set(sizes)
+            dress.styles.set(styles)
+        return dress
+
+    def selected(self, **filters):
+        return [dress.pk for dress in facet_index.select(filters)[:]]
+
+    def test_counts_apply_the_other_filters(self):
+        counts = facet_index.counts({'size': {self.small.pk}})
+        self.assertEqual(counts['size'], {self.small.pk: 2, self.large.pk: 2})
+        self.assertEqual(counts['designer'], {self.anna.pk: 2, self.bruno.pk: 0})
+        self.assertEqual(counts['color'], {'red': 1, 'blue': 1, 'green': 0})
+        self.assertEqual(counts['style'], {self.evening.pk: 1})
+
+    def test_select_and_paginate_in_id_order(self):
+        self.assertEqual(self.selected(size={self.small.pk, self.large.pk}),
+                         [self.red.pk, self.blue.pk, self.green.pk])
+        self.assertEqual(self.selected(size={self.large.pk}, style={self.evening.pk}), [self.green.pk])
+        self.assertEqual(self.selected(color={'red'}), [self.red.pk])
+        result = facet_index.select({'designer': {self.anna.pk, self.bruno.pk}})
+        self.assertEqual(len(result), 3)
+        self.assertEqual([dress.pk for dress in result[1:3]], [self.blue.pk, self.green.pk])
+        self.assertEqual(result[0].pk, self.red.pk)
+
+    def test_bits_do_not_grow_with_the_id(self):
+        far = self.dress('F4', 'red', self.bruno, [self.small], [], pk=10 ** 12)
+        self.assertEqual(self.selected(color={'red'}), [self.red.pk, far.pk])
+        self.assertLessEqual(facet_index.all_ids.bit_length(), 4)
+
+    def test_smaller_new_id_keeps_the_order(self):
+        far = self.dress('F4', 'red', self.bruno, [self.small], [], pk=10 ** 6)
+        near = self.dress('F5', 'red', self.bruno, [self.small], [], pk=self.green.pk + 1)
+        self.assertEqual(self.selected(color={'red'}), [self.red.pk, near.pk, far.pk])
+
+    def test_m2m_changes_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.green.sizes.add(self.small)
+        self.assertEqual(self.selected(size={self.small.pk}), [self.red.pk, self.blue.pk, self.green.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small.dress_set.remove(self.red, self.blue)
+        self.assertEqual(self.selected(size={self.small.pk}), [self.green.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.evening.dress_set.clear()
+        self.assertEqual(facet_index.counts({})['style'], {})
+
+    def test_saved_and_deleted_dresses_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blue.color = 'Red'
+            self.blue.save()
+        self.assertEqual(self.selected(color={'red'}), [self.red.pk, self.blue.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.red.delete()
+        self.assertEqual(self.selected(color={'red'}), [self.blue.pk])
+        self.assertEqual(facet_index.counts({})['designer'], {self.anna.pk: 1, self.bruno.pk: 1})
+
+    def test_bulk_delete_invalidates_the_index(self):
+        self.assertEqual(self.selected(designer={self.anna.pk}), [self.red.pk, self.blue.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(Designer.objects.filter(pk=self.anna.pk))
+        self.assertEqual(self.selected(size={self.small.pk, self.large.pk}), [self.green.pk])
+        self.assertEqual(facet_index.counts({})['color'], {'green': 1})
+
+    def test_another_process_change_rebuilds_the_index(self):
+        self.assertEqual(self.selected(color={'green'}), [self.green.pk])
+        Dress.objects.filter(pk=self.green.pk).update(color='red')
+        bump_version('facets')
+        self.assertEqual(self.selected(color={'red'}), [self.red.pk, self.green.pk])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@override_settings(CACHES=LOCMEM_CACHE, RATELIMIT_ENABLED=False)
+class PrefixIndexTests(TestCase):
+    """autocomplete.PrefixIndex: pasiūlymai pagal žodžių pradžią ir perkūrimas pasikeitus katalogui."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.designer = Designer.objects.create(name='Anna', surname='Sui')
+        Style.objects.create(name='Evening Gown')
+        self.first = Dress.objects.create(item_code='AS100', color='Midnight Blue', designer=self.designer)
+        self.second = Dress.objects.create(item_code='AS200', color='red', designer=self.designer)
+        self.index = PrefixIndex()
+
+    def test_suggestions_match_the_start_of_any_word(self):
+        self.index.build()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.suggest('as'), [('dress', 'AS100', self.first.pk),
+                                                        ('dress', 'AS200', self.second.pk)])
+            self.assertEqual(self.index.suggest('  SU '), [('designer', 'Anna Sui', self.designer.pk)])
+            self.assertEqual(self.index.suggest('anna s'), [('designer', 'Anna Sui', self.designer.pk)])
+            self.assertEqual(self.index.suggest('blue'), [('color', 'Midnight Blue', None)])
+            self.assertEqual(self.index.suggest('gown'), [('style', 'Evening Gown', None)])
+            self.assertEqual(self.index.suggest('as', limit=1), [('dress', 'AS100', self.first.pk)])
+            self.assertEqual(self.index.suggest('xyz'), [])
+            self.assertEqual(self.index.suggest(' '), [])
+
+    def test_index_is_truncated_at_max_entries(self):
+        with override_settings(AUTOCOMPLETE_MAX_ENTRIES=2), self.assertLogs('dresscode.autocomplete', 'WARNING'):
+            self.index.build()
+        self.assertEqual(len(self.index.snapshot[0]), 2)
+
+    def test_catalog_changes_trigger_a_background_rebuild(self):
+        self.index.current()
+        with mock.patch.object(self.index, '_rebuild_in_background') as rebuild:
+            self.index.checked_at = 0
+            self.index.current()
+            rebuild.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Dress.objects.create(item_code='ZZ1', color='red', designer=self.designer)
+            self.index.current()  # versija tikrinama ne dažniau nei kas check_interval
+            rebuild.assert_not_called()
+            self.index.checked_at = 0
+            self.assertEqual(self.index.suggest('zz'), [])  # kol perkuriama, naudojamas senas indeksas
+            rebuild.assert_called_once()
+
+        self.index.build()
+        self.assertEqual([label for _, label, _ in self.index.suggest('zz')], ['ZZ1'])
+
+    def test_bulk_delete_invalidates(self):
+        version = get_version(PrefixIndex.version_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(Dress.objects.filter(pk=self.second.pk))
+        self.assertGreater(get_version(PrefixIndex.version_name), version)
+
+    def test_only_one_background_rebuild_at_a_time(self):
+        started, release, finished = threading.Event(), threading.Event(), threading.Event()
+
+        def build():
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(self.index, 'build', side_effect=build) as patched_build, \
+                mock.patch('dresscode.autocomplete.connections.close_all', side_effect=finished.set):
+            self.index._rebuild_in_background()
+            self.assertTrue(started.wait(5))
+            self.index._rebuild_in_background()
+            release.set()
+            self.assertTrue(finished.wait(5))
+        patched_build.assert_called_once()
+        self.assertFalse(self.index.rebuilding)
+
+    def test_view(self):
+        with mock.patch('dresscode.views.prefix_index', self.index):
+            response = self.client.get(reverse('search-autocomplete'), {'q': 'Sui'})
+            self.assertEqual(response.json(), {'query': 'Sui', 'suggestions': [
+                {'kind': 'designer', 'label': 'Anna Sui', 'url': reverse('designer-one', args=(self.designer.pk,))}]})
+            suggestions = self.client.get(reverse('search-autocomplete'), {'q': 'even'}).json()['suggestions']
+        self.assertEqual(suggestions[0]['url'], reverse('search') + '?search_text=Evening+Gown')
+
+
+def co_rentals(pairs):
+    import numpy as np
+    return CoRentalMatrix(np.array(pairs, dtype=np.int64).reshape(-1, 2))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRERENDER_ENABLED=False)
+class RecommendationTests(TestCase):
+    """CoRentalMatrix panašumai ir refresh_recommendations: dalinis ir pilnas atnaujinimas."""
+
+    # vartotojas -> suknelės: 1: A B, 2: A B C, 3: A C, 4: D
+    PAIRS = [(1, 10), (1, 20), (2, 10), (2, 20), (2, 30), (3, 10), (3, 30), (4, 40)]
+
+    def setUp(self):
+        caches['default'].clear()  # rekomendacijų versija skaitoma iš podėlio
+        designer = Designer.objects.create(name='Co', surname='Rental')
+        self.users = {number: User.objects.create_user(f'co_renter_{number}') for number in range(1, 6)}
+        self.dresses = {code: Dress.objects.create(item_code=f'CO{code}', color='red', designer=designer)
+                        for code in 'ABCD'}
+
+    def test_similar_ranks_by_shared_renters(self):
+        matrix = co_rentals(self.PAIRS)
+        a, b, c, d = matrix.indexes([10, 20, 30, 40])
+        score = 2 / 6 ** 0.5
+        self.assertEqual([(pk, round(value, 3), common) for pk, value, common in matrix.similar(a, top_k=5)],
+                         [(20, round(score, 3), 2), (30, round(score, 3), 2)])  # lygūs - pagal ID
+        self.assertEqual([(pk, round(value, 3), common) for pk, value, common in matrix.similar(b, top_k=5)],
+                         [(10, round(score, 3), 2), (30, 0.5, 1)])
+        self.assertEqual([pk for pk, _, _ in matrix.similar(a, top_k=1)], [20])
+        self.assertEqual(matrix.similar(d, top_k=5), [])
+        self.assertEqual(sorted(matrix.dress_ids[matrix.neighbourhood(matrix.indexes([40]))]), [40])
+        self.assertEqual(sorted(matrix.dress_ids[matrix.neighbourhood(matrix.indexes([20]))]), [10, 20, 30])
+
+    def test_min_common_cut_off(self):
+        matrix = co_rentals(self.PAIRS)
+        b = matrix.indexes([20])[0]
+        self.assertEqual([pk for pk, _, _ in matrix.similar(b, top_k=5, min_common=2)], [10])
+        self.assertEqual(matrix.similar(b, top_k=5, min_common=3), [])
+
+    def test_empty_matrix(self):
+        matrix = co_rentals([])
+        self.assertEqual(len(matrix.indexes([10, 20])), 0)
+        self.assertEqual(len(matrix.neighbourhood(matrix.indexes([10]))), 0)
+        self.assertEqual(refresh_recommendations(), 0)
+        self.assertEqual(refresh_recommendations(full=True), 0)
+        self.assertFalse(DressRecommendation.objects.exists())
+
+    def rent(self, user, code):
+        return DressRental.objects.create(dress=self.dresses[code], user=self.users[user], start_date=date(2026, 1, 1),
+                                          return_date=date(2026, 1, 3), status='returned')
+
+    def recommended(self, code):
+        return [(recommendation.recommended.item_code, recommendation.common_renters)
+                for recommendation in self.dresses[code].recommendations.select_related('recommended').order_by('rank')]
+
+    def test_incremental_and_full_refresh(self):
+        for user, dress_id in self.PAIRS:
+            self.rent(user, 'ABCD'[dress_id // 10 - 1])
+        ArchivedDressRental.objects.create(rental_id=10 ** 6, dress=self.dresses['D'], user=self.users[5],
+                                           start_date=date(2020, 1, 1), return_date=date(2020, 1, 3))
+        version = get_version('recommendations')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(refresh_recommendations(batch_size=2), 4)
+        self.assertGreater(get_version('recommendations'), version)
+        self.assertEqual(self.recommended('A'), [('COB', 2), ('COC', 2)])
+        self.assertEqual(self.recommended('B'), [('COA', 2), ('COC', 1)])
+        self.assertEqual(self.recommended('D'), [])
+        self.assertEqual(refresh_recommendations(), 0)  # naujų nuomų nėra
+
+        # Vartotojas 5 (D yra jo archyvuotoje nuomoje) išsinuomoja A: perskaičiuojamos visos
+        # A nuomininkų suknelės, taip pat ir D.
+        last = self.rent(5, 'A')
+        self.assertEqual(refresh_recommendations(), 4)
+        self.assertEqual(self.recommended('D'), [('COA', 1)])
+        self.assertEqual(RecommendationState.objects.get().last_rental_id, last.pk)
+
+        # Ištrinta nuoma dalinio atnaujinimo nepaveikia, pilnas atnaujinimas ją pastebi.
+        DressRental.objects.filter(user=self.users[4]).delete()
+        ArchivedDressRental.objects.all().delete()
+        self.assertEqual(refresh_recommendations(), 0)
+        self.assertEqual(self.recommended('D'), [('COA', 1)])
+        self.assertEqual(refresh_recommendations(full=True), 3)
+        self.assertEqual(self.recommended('D'), [])
+        self.assertEqual(self.recommended('A'), [('COB', 2), ('COC', 2)])
+
+
+class RelatedIdsTests(TestCase):
+    """Dress.related_ids: be prefetch_related abu ryšiai nuskaitomi viena užklausa, sąrašui - irgi viena."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.small, self.large = Size.objects.create(name='S'), Size.objects.create(name='L')
+        self.evening = Style.objects.create(name='Evening')
+        designer = Designer.objects.create(name='Rel', surname='Ids')
+        self.dresses = [Dress.objects.create(item_code=f'RI{i}', color='red', designer=designer) for i in range(3)]
+        self.dresses[0].sizes.set([self.small, self.large])
+        self.dresses[0].styles.set([self.evening])
+        self.dresses[1].sizes.set([self.large])
+        for lookup in (lookups.sizes, lookups.styles):
+            lookup.invalidate()
+            lookup.all()  # pavadinimų kopija procese įkeliama iš anksto
+
+    def test_single_dress_uses_one_query_for_both_relations(self):
+        dress = Dress.objects.get(pk=self.dresses[0].pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(sorted(dress.display_sizes().split(', ')), ['L', 'S'])
+            self.assertEqual(dress.display_styles(), 'Evening')
+            self.assertEqual(sorted(dress.related_ids('sizes')), sorted([self.small.pk, self.large.pk]))
+
+    def test_prefetched_relations_need_no_queries(self):
+        dress = Dress.objects.prefetch_related('sizes', 'styles').get(pk=self.dresses[0].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(dress.display_styles(), 'Evening')
+            self.assertEqual(len(dress.related_ids('sizes')), 2)
+
+    def test_list_is_loaded_with_one_query(self):
+        dresses = list(Dress.objects.filter(pk__in=[dress.pk for dress in self.dresses]).order_by('pk'))
+        with self.assertNumQueries(1):
+            Dress.load_related_ids(dresses)
+            self.assertEqual([dress.display_sizes() for dress in dresses][1:], ['L', ''])
+            self.assertEqual([dress.display_styles() for dress in dresses], ['Evening', '', ''])
+
+    def test_changed_relations_are_read_again(self):
+        dress = Dress.objects.get(pk=self.dresses[1].pk)
+        self.assertEqual(dress.display_sizes(), 'L')
+        dress.sizes.add(self.small)
+        self.assertEqual(sorted(dress.related_ids('sizes')), sorted([self.small.pk, self.large.pk]))
+        dress.styles.clear()
+        dress.styles.add(self.evening)
+        self.assertEqual(dress.display_styles(), 'Evening')
+
+
+class DebuggingSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimalus SMTP serveris testams: priima laiškus į server.messages, gavėjus su 'reject' atmeta,
+    o gavus gavėją su 'disconnect' nutraukia jungtį."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost debugging SMTP')
+        data = None
+        while line := self.rfile.readline():
+            if data is not None:
+                if line == b'.\r\n':
+                    self.server.messages.append(email.message_from_bytes(b''.join(data)))
+                    data = None
+                    self.reply('250 queued')
+                else:
+                    data.append(line[1:] if line.startswith(b'..') else line)
+                continue
+            command = line[:4].upper()
+            if command == b'DATA':
+                data = []
+                self.reply('354 end with .')
+            elif command == b'RCPT' and b'disconnect' in line:
+                return
+            elif command == b'RCPT' and b'reject' in line:
+                self.reply('550 no such user')
+            elif command == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+@override_settings(OUTBOX_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+                   EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    """Laiškai įrašomi į OutboundEmail ir išsiunčiami per derinimo SMTP serverį."""
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), DebuggingSMTPHandler)
+        self.server.daemon_threads = True
+        self.server.messages = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.settings_override = override_settings(EMAIL_PORT=self.server.server_address[1])
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def queue(self, to=('customer@example.com',), **kwargs):
+        message = EmailMultiAlternatives('Rental confirmed', 'Plain text', 'shop@example.com', list(to),
+                                         connection=get_connection('dresscode.mail.OutboxEmailBackend'), **kwargs)
+        message.attach_alternative('<p>HTML</p>', 'text/html')
+        message.attach_alternative('BEGIN:VCALENDAR', 'text/calendar')
+        message.attach('invoice.pdf', b'%PDF-1.4 binary \x00\xff', 'application/pdf')
+        message.attach('notes.txt', 'Ačiū', 'text/plain')
+        self.assertEqual(message.send(), 1)
+        return OutboundEmail.objects.latest('id')
+
+    def test_message_with_attachments_and_alternatives_is_delivered(self):
+        outbound = self.queue(headers={'X-Rental': '5'})
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(mail.send_queued(), (1, 0))
+
+        outbound.refresh_from_db()
+        self.assertEqual((outbound.status, outbound.claim, outbound.attempts), ('sent', '', 0))
+        [received] = self.server.messages
+        self.assertEqual(received['Subject'], 'Rental confirmed')
+        self.assertEqual(received['X-Rental'], '5')
+        parts = {part.get_content_type(): part for part in received.walk()}
+        self.assertIn('text/html', parts)
+        self.assertIn('text/calendar', parts)
+        self.assertEqual(parts['application/pdf'].get_filename(), 'invoice.pdf')
+        self.assertEqual(parts['application/pdf'].get_payload(decode=True), b'%PDF-1.4 binary \x00\xff')
+        attachments = {part.get_filename(): part.get_payload(decode=True) for part in received.walk()
+                       if part.get_filename()}
+        self.assertEqual(attachments['notes.txt'].decode('utf-8'), 'Ačiū')
+
+    def test_html_only_message_keeps_its_subtype(self):
+        message = EmailMultiAlternatives('Hi', '<b>bold</b>', 'shop@example.com', ['customer@example.com'],
+                                         connection=get_connection('dresscode.mail.OutboxEmailBackend'))
+        message.content_subtype = 'html'
+        message.send()
+        mail.send_queued()
+        self.assertEqual(self.server.messages[0].get_content_type(), 'text/html')
+
+    def test_messages_that_cannot_be_queued_raise(self):
+        message = EmailMultiAlternatives('Hi', 'Body', 'shop@example.com', ['customer@example.com'],
+                                         connection=get_connection('dresscode.mail.OutboxEmailBackend'))
+        message.attach(MIMEText('raw part'))
+        with self.assertRaises(ValueError):
+            message.send()
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_rejected_recipient_spends_an_attempt_and_finally_fails(self):
+        outbound = self.queue(to=('reject@example.com',))
+        for attempt in range(1, 4):
+            OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(mail.send_queued(), (0, 1))
+            outbound.refresh_from_db()
+            self.assertEqual(outbound.attempts, attempt)
+        self.assertEqual(outbound.status, 'failed')
+        self.assertIn('SMTPRecipientsRefused', outbound.last_error)
+
+    def test_connection_failure_defers_without_spending_attempts(self):
+        outbound = self.queue()
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            port = closed.getsockname()[1]
+        with override_settings(EMAIL_PORT=port), self.assertLogs('dresscode.mail', 'WARNING'):
+            for _ in range(5):
+                OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(mail.send_queued(), (0, 0))
+        outbound.refresh_from_db()
+        self.assertEqual((outbound.status, outbound.attempts, outbound.claim), ('queued', 0, ''))
+        self.assertGreater(outbound.next_attempt_at, timezone.now())
+        self.assertNotEqual(outbound.last_error, '')
+
+        OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(mail.send_queued(), (1, 0))
+
+    def test_dropped_connection_stops_the_batch_without_spending_attempts(self):
+        delivered = self.queue()
+        dropped = self.queue(to=('disconnect@example.com',))
+        waiting = self.queue()
+        with self.assertLogs('dresscode.mail', 'WARNING') as logs:
+            self.assertEqual(mail.send_queued(), (1, 0))
+        self.assertIn('2 emails deferred', logs.output[0])
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=delivered.pk).status, 'sent')
+        for outbound in (dropped, waiting):
+            outbound.refresh_from_db()
+            self.assertEqual((outbound.status, outbound.attempts, outbound.claim), ('queued', 0, ''))
+            self.assertGreater(outbound.next_attempt_at, timezone.now())
+            self.assertIn('SMTPServerDisconnected', outbound.last_error)
+
+        OutboundEmail.objects.filter(pk=waiting.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(mail.send_queued(), (1, 0))
+
+    def test_expired_claim_does_not_overwrite_the_new_senders_result(self):
+        self.queue()
+        old_token, [outbound] = mail.claim(10)
+        OutboundEmail.objects.filter(pk=outbound.pk).update(next_attempt_at=timezone.now())
+        new_token, [_] = mail.claim(10)
+
+        self.assertFalse(mail.mark_failed(outbound, ValueError('late failure'), old_token))
+        row = OutboundEmail.objects.get(pk=outbound.pk)
+        self.assertEqual((row.status, row.claim, row.attempts, row.last_error), ('sending', new_token, 0, ''))
+
+        self.assertTrue(mail.mark_failed(row, ValueError('failure'), new_token))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.claim, row.attempts), ('queued', '', 1))
+
+    def test_overlapping_senders_do_not_share_emails(self):
+        for _ in range(3):
+            self.queue()
+        first_token, first = mail.claim(2)
+        second_token, second = mail.claim(10)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({email.pk for email in first} & {email.pk for email in second})
+        self.assertEqual(mail.claim(10)[1], [])
+        self.assertEqual(mail.send_queued(), (0, 0))
+        self.assertEqual(self.server.messages, [])
+
+        # Nutrūkusio siuntėjo laiškus pasibaigus OUTBOX_CLAIM_TIMEOUT paima kitas.
+        OutboundEmail.objects.filter(claim=first_token).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(mail.send_queued(), (2, 0))
+        self.assertEqual(len(self.server.messages), 2)
+
+
+def table_state():
+    """Visų lentelių (ir ManyToMany tarpinių) eilutės, kad būtų galima palyginti dviejų trynimų rezultatą."""
+    return {model._meta.label: list(model._base_manager.order_by('pk').values_list())
+            for model in apps.get_models(include_auto_created=True)}
+
+
+def png_file(name, color=(200, 30, 30)):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (16, 16), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def seed_deletable():
+    """Katalogas su nuomomis, atsiliepimais, rekomendacijomis ir archyvu - visi on_delete atvejai."""
+    dresses = seed_catalog(designers=3, dresses=24, prefix='del')
+    users = seed_users(6, prefix='del')
+    seed_rentals(60, dresses, users)
+    DressReview.objects.bulk_create([DressReview(dress=dresses[i], reviewer=users[i % 6], content=f'Review {i}')
+                                     for i in range(0, 24, 2)])
+    DressRecommendation.objects.bulk_create([
+        DressRecommendation(dress=dresses[i], recommended=dresses[(i + 1) % 24], rank=1, score=0.5, common_renters=2)
+        for i in range(24)])
+    ArchivedDressRental.objects.bulk_create([
+        ArchivedDressRental(rental_id=10_000 + i, dress=dresses[i], user=users[i % 6], start_date=date(2020, 1, 1),
+                            return_date=date(2020, 1, 3)) for i in range(12)])
+    return dresses, users
+
+
+class Interrupted(Exception):
+    pass
+
+
+class BulkDeleteTests(TestCase):
+    """bulk_delete palieka tas pačias eilutes kaip QuerySet.delete(), taip pat ir paleistas iš naujo."""
+
+    def setUp(self):
+        self.dresses, self.users = seed_deletable()
+
+    def assert_same_as_queryset_delete(self, queryset, **kwargs):
+        with transaction.atomic():
+            queryset.all().delete()
+            expected = table_state()
+            transaction.set_rollback(True)
+        bulk_delete(queryset.all(), **kwargs)
+        self.assertEqual(table_state(), expected)
+
+    def test_designer_cascade_matches_queryset_delete(self):
+        self.assert_same_as_queryset_delete(Designer.objects.filter(pk=self.dresses[0].designer_id), chunk_size=4)
+
+    def test_users_match_queryset_delete(self):
+        self.assert_same_as_queryset_delete(User.objects.filter(pk__in=[user.pk for user in self.users[:3]]),
+                                            chunk_size=5)
+
+    def test_sizes_match_queryset_delete(self):
+        self.assert_same_as_queryset_delete(Size.objects.filter(name__in=['S', 'M']), chunk_size=7)
+
+    def test_set_null_keeps_rows(self):
+        user = self.users[0]
+        rentals = set(DressRental.objects.filter(user=user).values_list('pk', flat=True))
+        reviews = set(DressReview.objects.filter(reviewer=user).values_list('pk', flat=True))
+        self.assertTrue(rentals and reviews)
+
+        stats = bulk_delete(User.objects.filter(pk=user.pk))
+
+        self.assertEqual(set(DressRental.objects.filter(pk__in=rentals, user=None).values_list('pk', flat=True)),
+                         rentals)
+        self.assertEqual(set(DressReview.objects.filter(pk__in=reviews, reviewer=None).values_list('pk', flat=True)),
+                         reviews)
+        self.assertEqual(stats['dresscode.DressRental (set null)'], len(rentals))
+        self.assertEqual(stats['auth.User'], 1)
+        self.assertEqual(stats['dresscode.Profile'], 1)
+
+    def test_rerun_after_interruption(self):
+        queryset = Designer.objects.filter(pk=self.dresses[0].designer_id)
+        with transaction.atomic():
+            queryset.all().delete()
+            expected = table_state()
+            transaction.set_rollback(True)
+
+        chunks = []
+
+        def interrupt(stats):
+            chunks.append(sum(stats.values()))
+            if len(chunks) == 3:
+                raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            bulk_delete(queryset.all(), chunk_size=3, progress=interrupt)
+        self.assertTrue(queryset.exists())
+        connection.check_constraints()  # jau patvirtintos dalys nepalieka rodyklių į ištrintus įrašus
+
+        bulk_delete(queryset.all(), chunk_size=3)
+        self.assertEqual(table_state(), expected)
+
+
+class BulkDeleteFileTests(TestCase):
+    """Bendro turinio (ContentHashStorage) failas ištrinamas tik ištrynus paskutinį jį naudojantį įrašą."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_shared_photo_is_removed_with_its_last_dress(self):
+        designer = Designer.objects.create(name='Shared', surname='Photo')
+        first = Dress.objects.create(item_code='SH1', color='red', designer=designer,
+                                     dresses_pics=png_file('first.png'))
+        second = Dress.objects.create(item_code='SH2', color='red', designer=designer,
+                                      dresses_pics=png_file('second.png'))
+        other = Dress.objects.create(item_code='SH3', color='red', designer=designer,
+                                     dresses_pics=png_file('other.png', color=(0, 0, 200)))
+        storage = first.dresses_pics.storage
+        self.assertEqual(first.dresses_pics.name, second.dresses_pics.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(Dress.objects.filter(pk=first.pk))
+        self.assertTrue(storage.exists(second.dresses_pics.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(Dress.objects.filter(pk=second.pk))
+        self.assertFalse(storage.exists(second.dresses_pics.name))
+        self.assertTrue(storage.exists(other.dresses_pics.name))
+
+    def test_files_are_kept_when_the_transaction_rolls_back(self):
+        designer = Designer.objects.create(name='Rolled', surname='Back')
+        dress = Dress.objects.create(item_code='RB1', color='red', designer=designer, dresses_pics=png_file('a.png'))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bulk_delete(Dress.objects.filter(pk=dress.pk))
+        self.assertTrue(callbacks)
+        self.assertTrue(dress.dresses_pics.storage.exists(dress.dresses_pics.name))
+
+
+def photo(seed, size=256):
+    """Sintetinė nuotrauka: glotnios spalvų dėmės, kiekvienam seed vis kitokios."""
+    import numpy as np
+    from PIL import Image
+    colors = np.random.default_rng(seed).integers(0, 256, (6, 6, 3), dtype=np.uint8)
+    return Image.fromarray(colors).resize((size, size), Image.Resampling.BICUBIC)
+
+
+def encoded(image, image_format='PNG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def hamming(first, second):
+    return bin((first ^ second) & (2 ** 64 - 1)).count('1')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PhotoHashTests(TestCase):
+    """photohash: hash'ai stabilūs, pakeisto dydžio ar suspaudimo kopijos randamos pagal Hamingo atstumą."""
+
+    def setUp(self):
+        caches['default'].clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.designer = Designer.objects.create(name='Photo', surname='Hash')
+        self.index = PhotoHashIndex()
+
+    def dress(self, item_code, content, name='photo.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Dress.objects.create(item_code=item_code, color='red', designer=self.designer,
+                                        dresses_pics=SimpleUploadedFile(name, content.getvalue()))
+
+    def test_hashes_are_stable(self):
+        hashes = image_hashes(encoded(photo(1)))
+        self.assertEqual(image_hashes(encoded(photo(1))), hashes)
+        self.assertEqual(image_hashes(encoded(photo(1), 'BMP')), hashes)  # tie patys pikseliai kitu formatu
+        self.assertTrue(all(-2 ** 63 <= value < 2 ** 63 for value in hashes))
+
+    def test_near_duplicates_are_within_max_distance(self):
+        from PIL import ImageEnhance
+        original = image_hashes(encoded(photo(1)))
+        copies = {
+            'resized': encoded(photo(1).resize((100, 100))),
+            'recompressed': encoded(photo(1), 'JPEG', quality=50),
+            'brighter': encoded(ImageEnhance.Brightness(photo(1)).enhance(1.15)),
+        }
+        for label, content in copies.items():
+            with self.subTest(label):
+                for first, second in zip(original, image_hashes(content)):
+                    self.assertLessEqual(hamming(first, second), 6)
+        for seed in range(2, 6):
+            with self.subTest(seed=seed):
+                dhash, phash = image_hashes(encoded(photo(seed)))
+                self.assertGreater(hamming(original[1], phash), 10)
+                self.assertGreater(hamming(original[0], dhash), 10)
+
+    def test_similar_and_pairs(self):
+        original = self.dress('PH1', encoded(photo(1)))
+        copy = self.dress('PH2', encoded(photo(1), 'JPEG', quality=50), name='photo.jpg')
+        self.dress('PH3', encoded(photo(2)))
+        Dress.objects.create(item_code='PH4', color='red', designer=self.designer)
+        self.assertIsNotNone(original.photo_phash)
+
+        similar = self.index.similar(original.photo_dhash, original.photo_phash, exclude=original.pk)
+        self.assertEqual([dress_id for dress_id, _, _ in similar], [copy.pk])
+        _, phash_distance, dhash_distance = similar[0]
+        self.assertEqual(phash_distance, hamming(original.photo_phash, copy.photo_phash))
+        self.assertEqual(dhash_distance, hamming(original.photo_dhash, copy.photo_dhash))
+        self.assertEqual([pk for pk, _, _ in self.index.similar(original.photo_dhash, original.photo_phash)],
+                         [original.pk, copy.pk])
+        self.assertEqual(self.index.similar(original.photo_dhash, original.photo_phash, max_distance=-1), [])
+        self.assertEqual(self.index.pairs(block_size=1), [(original.pk, copy.pk, phash_distance, dhash_distance)])
+
+    def test_index_follows_photo_changes(self):
+        original = self.dress('PH1', encoded(photo(1)))
+        self.assertEqual(self.index.similar(original.photo_dhash, original.photo_phash, exclude=original.pk), [])
+        copy = self.dress('PH2', encoded(photo(1).resize((120, 120))))
+        self.assertEqual([pk for pk, _, _ in self.index.similar(original.photo_dhash, original.photo_phash,
+                                                                 exclude=original.pk)], [copy.pk])
+
+        copy.dresses_pics = None
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertEqual((copy.photo_dhash, copy.photo_phash), (None, None))
+        self.assertEqual(self.index.similar(original.photo_dhash, original.photo_phash, exclude=original.pk), [])
+
+    def test_unreadable_photo_has_no_hashes(self):
+        dress = self.dress('PH1', io.BytesIO(b'not an image'))
+        self.assertEqual((dress.photo_dhash, dress.photo_phash), (None, None))
+
+
+class MaintenanceTests(SimpleTestCase):
+    """ maintain_db žingsniai su tikra SQLite baze faile: atsarginė kopija (ir VACUUM INTO, kai
+        kopijavimas vis prasideda iš naujo), senų kopijų šalinimas ir inkrementinis VACUUM."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'source.sqlite3')
+        self.source = self.connect(self.path)
+        self.addCleanup(self.source.close)
+        self.source.execute('PRAGMA journal_mode=WAL')
+        self.source.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, payload TEXT)')
+        self.source.executemany('INSERT INTO item (payload) VALUES (?)', [('x' * 200,)] * 2000)
+        self.metrics = maintenance.LockMetrics()
+
+    @staticmethod
+    def connect(path):
+        return sqlite3.connect(path, isolation_level=None, timeout=5, check_same_thread=False)
+
+    def count(self, path):
+        copy = self.connect(path)
+        try:
+            self.assertEqual(copy.execute('PRAGMA quick_check').fetchone()[0], 'ok')
+            return copy.execute('SELECT count(*) FROM item').fetchone()[0]
+        finally:
+            copy.close()
+
+    def start_writer(self):
+        """Kita jungtis rašo į bazę tol, kol testas baigiasi."""
+        stop = threading.Event()
+        writer = self.connect(self.path)
+
+        def write():
+            while not stop.is_set():
+                writer.execute("INSERT INTO item (payload) VALUES ('writer')")
+                time.sleep(0.001)
+            writer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+    def test_backup(self):
+        target = os.path.join(self.directory, 'copy.sqlite3')
+        size = maintenance.backup(self.source, target, self.metrics, pages=16, pause=0)
+        self.assertEqual(size, os.path.getsize(target))
+        self.assertEqual(self.count(target), 2000)
+        self.assertGreater(len(self.metrics.steps['backup step']), 1)
+        self.assertNotIn('backup vacuum into', self.metrics.steps)
+        self.assertNotIn('.copy.sqlite3.tmp', os.listdir(self.directory))
+
+    def test_backup_falls_back_to_vacuum_into_while_writes_continue(self):
+        self.start_writer()
+        target = os.path.join(self.directory, 'copy.sqlite3')
+        maintenance.backup(self.source, target, self.metrics, pages=1, pause=0.005, max_restarts=1)
+        self.assertEqual(len(self.metrics.steps['backup vacuum into']), 1)
+        self.assertGreaterEqual(self.count(target), 2000)
+        self.assertNotIn('.copy.sqlite3.tmp', os.listdir(self.directory))
+
+    def test_rotate_backups_keeps_the_newest(self):
+        backups = Path(self.directory) / 'backups'
+        backups.mkdir()
+        names = [maintenance.backup_name(datetime(2026, 1, day, 3, 0)) for day in (3, 1, 2)]
+        for name in names:
+            (backups / name).touch()
+        (backups / 'notes.txt').touch()
+
+        self.assertEqual(maintenance.rotate_backups(backups, 0), [])
+        removed = maintenance.rotate_backups(backups, 2)
+        self.assertEqual([path.name for path in removed], [names[1]])
+        self.assertEqual(sorted(path.name for path in backups.iterdir()), sorted([names[0], names[2], 'notes.txt']))
+        self.assertEqual(maintenance.rotate_backups(backups, 2), [])
+
+    def test_incremental_vacuum_frees_pages_in_timed_transactions(self):
+        self.source.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.source.execute('VACUUM')
+        self.assertEqual(maintenance.auto_vacuum_mode(self.source), 'incremental')
+        self.source.execute('DELETE FROM item')
+        free_pages = self.source.execute('PRAGMA freelist_count').fetchone()[0]
+        self.assertGreater(free_pages, 32)
+
+        freed = maintenance.incremental_vacuum(self.source, self.metrics, pages=16, pause=0)
+        self.assertEqual(freed, free_pages)
+        self.assertEqual(self.source.execute('PRAGMA freelist_count').fetchone()[0], 0)
+        steps = self.metrics.steps['incremental vacuum step']
+        self.assertEqual(len(steps), -(-free_pages // 16))
+        self.assertTrue(all(waited >= 0 and held > 0 for waited, held in steps))
+
+
+class MediaStorageTests(TestCase):
+    """ContentHashStorage nuorodų skaičiavimas, gc_media ir dedupe_media."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, CACHES=LOCMEM_CACHE)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.designer = Designer.objects.create(name='Media', surname='Files')
+        self.storage = content_hash_storage
+
+    def dress(self, item_code, photo):
+        return Dress.objects.create(item_code=item_code, color='red', designer=self.designer, dresses_pics=photo)
+
+    def legacy_file(self, name, content):
+        """Failas, įkeltas prieš ContentHashStorage: įrašomas tiesiai į diską įkėlimo pavadinimu."""
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return name
+
+    def test_references_can_exclude_the_caller(self):
+        first = self.dress('MS1', png_file('a.png'))
+        second = self.dress('MS2', png_file('b.png'))
+        name = first.dresses_pics.name
+        self.assertEqual(self.storage.references(name), 2)
+        self.assertEqual(self.storage.references(name, exclude=first), 1)
+        self.assertEqual(self.storage.references(name, exclude=self.designer), 2)  # kitas modelis
+        self.storage.delete(name, exclude=first)
+        self.assertTrue(self.storage.exists(name))
+        Dress.objects.filter(pk=second.pk).update(dresses_pics='')
+        self.storage.delete(name, exclude=first)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_replaced_shared_photo_is_kept_for_the_other_record(self):
+        first = self.dress('MS1', png_file('a.png'))
+        self.dress('MS2', png_file('b.png'))
+        old_name = first.dresses_pics.name
+        first.dresses_pics = png_file('c.png', color=(0, 200, 0))
+        first.save()
+        self.storage.delete(old_name)  # kaip daro kodas, keičiantis failą po išsaugojimo
+        self.assertTrue(self.storage.exists(old_name))
+
+    def test_field_file_delete_keeps_the_file_until_gc(self):
+        dress = self.dress('MS1', png_file('a.png'))
+        name = dress.dresses_pics.name
+        dress.dresses_pics.delete()
+        self.assertEqual(Dress.objects.get(pk=dress.pk).dresses_pics.name, '')
+        self.assertTrue(self.storage.exists(name))
+
+        os.utime(self.storage.path(name), (0, 0))
+        call_command('gc_media', stdout=io.StringIO())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_gc_media_removes_only_old_orphans(self):
+        used = self.dress('MS1', png_file('a.png')).dresses_pics.name
+        old_orphan = self.legacy_file('dresses_pics/old.png', b'old')
+        new_orphan = self.legacy_file('dresses_pics/new.png', b'new')
+        for name in (used, old_orphan):
+            os.utime(self.storage.path(name), (0, 0))
+
+        output = io.StringIO()
+        call_command('gc_media', '--dry-run', stdout=output)
+        self.assertIn(f'Orphan: {old_orphan}', output.getvalue())
+        self.assertTrue(self.storage.exists(old_orphan))
+
+        call_command('gc_media', stdout=io.StringIO())
+        self.assertFalse(self.storage.exists(old_orphan))
+        self.assertTrue(self.storage.exists(new_orphan))
+        self.assertTrue(self.storage.exists(used))
+
+    def test_dedupe_media_merges_legacy_duplicates(self):
+        content = png_file('x.png').read()
+        first = self.dress('MS1', None)
+        second = self.dress('MS2', None)
+        Dress.objects.filter(pk=first.pk).update(dresses_pics=self.legacy_file('dresses_pics/photo.png', content))
+        Dress.objects.filter(pk=second.pk).update(
+            dresses_pics=self.legacy_file('dresses_pics/photo_Ab12Cd.PNG', content))
+        self.designer.designers_pics = self.legacy_file('designers_pics/me.jpg', b'designer')
+        self.designer.save()
+        hashed = self.storage.hashed_name('dresses_pics/photo.png', ContentFile(content))
+
+        output = io.StringIO()
+        call_command('dedupe_media', '--dry-run', stdout=output)
+        self.assertIn('Would rename 2 files, merged 1 duplicates', output.getvalue())
+        self.assertFalse(self.storage.exists(hashed))
+
+        call_command('dedupe_media', stdout=io.StringIO())
+        self.assertEqual(set(Dress.objects.filter(pk__in=[first.pk, second.pk])
+                             .values_list('dresses_pics', flat=True)), {hashed})
+        with self.storage.open(hashed) as file:
+            self.assertEqual(file.read(), content)
+        self.assertFalse(self.storage.exists('dresses_pics/photo.png'))
+        self.assertFalse(self.storage.exists('dresses_pics/photo_Ab12Cd.PNG'))
+        designer_pics = Designer.objects.get(pk=self.designer.pk).designers_pics.name
+        self.assertRegex(designer_pics, r'^designers_pics/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(Profile.objects.filter(picture='default-user.png').count(), Profile.objects.count())
+
+        output = io.StringIO()
+        call_command('dedupe_media', stdout=output)
+        self.assertIn('Renamed 0 files, merged 0 duplicates', output.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['dresscode.hashers.TunedArgon2PasswordHasher',
+                                     'django.contrib.auth.hashers.MD5PasswordHasher'],
+                   PASSWORD_ARGON2_TIME_COST=1, PASSWORD_ARGON2_MEMORY_COST=64)
+class PasswordHashingTests(TestCase):
+    """PooledModelBackend: maiša skaičiuojama telkinyje, seni maišai perskaičiuojami Argon2 prisijungus."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('legacy', 'legacy@example.com')
+        self.user.password = make_password('old-secret', hasher='md5')
+        self.user.save(update_fields=['password'])
+        self.threads = []
+        self.delay = 0
+        verify_password = hashers.verify_password
+
+        def recording_verify(*args):
+            self.threads.append(threading.current_thread().name)
+            time.sleep(self.delay)
+            return verify_password(*args)
+
+        patcher = mock.patch('dresscode.hashers.verify_password', recording_verify)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stored_hash(self):
+        return User.objects.get(pk=self.user.pk).password
+
+    def test_login_upgrades_a_legacy_hash_in_the_pool(self):
+        self.assertTrue(self.client.login(username='legacy', password='old-secret'))
+        self.assertTrue(self.stored_hash().startswith('argon2$argon2id$v=19$m=64,t=1,p=1$'))
+        self.assertEqual(len(self.threads), 1)
+        self.assertTrue(self.threads[0].startswith('password-hashing'))
+
+        upgraded = self.stored_hash()
+        self.client.logout()
+        self.assertTrue(self.client.login(username='legacy', password='old-secret'))
+        self.assertEqual(self.stored_hash(), upgraded)  # parametrai nepasikeitė
+
+        with override_settings(PASSWORD_ARGON2_TIME_COST=2):
+            self.assertTrue(self.client.login(username='legacy', password='old-secret'))
+        self.assertIn('m=64,t=2,p=1$', self.stored_hash())
+
+    def test_wrong_password_and_unknown_user(self):
+        legacy = self.stored_hash()
+        self.assertFalse(self.client.login(username='legacy', password='wrong'))
+        self.assertEqual(self.stored_hash(), legacy)
+        with mock.patch.object(hashers.get_executor(), 'submit', wraps=hashers.get_executor().submit) as submit:
+            self.assertFalse(self.client.login(username='nobody', password='old-secret'))
+        submit.assert_called_once()  # maiša skaičiuojama ir nežinomam vartotojui
+
+    def test_async_authenticate_upgrades_without_blocking(self):
+        backend = hashers.PooledModelBackend()
+        self.delay = 0.2
+
+        async def authenticate_while_ticking():
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.ensure_future(tick())
+            try:
+                return await backend.aauthenticate(None, username='legacy', password='old-secret'), len(ticks)
+            finally:
+                ticker.cancel()
+
+        user, ticks = async_to_sync(authenticate_while_ticking)()
+        self.assertEqual(user, self.user)
+        self.assertGreater(ticks, 5)  # kol skaičiuota maiša, įvykių ciklas dirbo
+        self.delay = 0
+        self.assertTrue(self.stored_hash().startswith('argon2$'))
+        self.assertTrue(self.threads[0].startswith('password-hashing'))
+        self.assertIsNone(async_to_sync(backend.aauthenticate)(None, username='legacy', password='wrong'))
+        self.assertIsNone(async_to_sync(backend.aauthenticate)(None, username='nobody', password='old-secret'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], RATELIMIT_ENABLED=False)
+class RegistrationTests(TestCase):
+    """Registracija: vartotojas ir profilis sukuriami kartu, vardas ir el. paštas unikalūs net lenktynių atveju."""
+
+    def register(self, username='signup', email='signup@example.com'):
+        return registration.register(username=username, email=email, password='signup-password',
+                                     iban='LT000000000000000001', first_name='Sign', last_name='Up')
+
+    def test_user_and_profile_in_one_select_and_two_inserts(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = self.register(email='signup@EXAMPLE.com')
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual([sql for sql in statements if sql in ('SELECT', 'INSERT', 'UPDATE')],
+                         ['SELECT', 'INSERT', 'INSERT'])
+        user = User.objects.select_related('profile').get(pk=user.pk)
+        self.assertEqual(user.email, 'signup@example.com')
+        self.assertEqual(user.profile.iban, 'LT000000000000000001')
+        self.assertTrue(user.check_password('signup-password'))
+
+    def test_taken_username_or_email_is_rejected(self):
+        self.register()
+        with self.assertRaisesMessage(registration.RegistrationError, 'Username signup already exists'):
+            self.register(email='other@example.com')
+        with self.assertRaisesMessage(registration.RegistrationError, 'Email signup@example.com already exists'):
+            self.register(username='other', email='signup@EXAMPLE.COM')
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Profile.objects.count(), 1)
+
+    def test_usernames_are_normalized_like_create_user(self):
+        user = self.register(username='\uff46\uff55\uff4c\uff4c')  # „ｆｕｌｌ“ pilno pločio raidėmis
+        self.assertEqual(user.username, 'full')
+        with self.assertRaisesMessage(registration.RegistrationError, 'Username full already exists'):
+            self.register(username='full', email='other@example.com')
+
+    def test_blank_username_is_rejected(self):
+        for username in ('', '   ', None):
+            with self.subTest(username=username):
+                with self.assertRaisesMessage(registration.RegistrationError, 'Username is required'):
+                    self.register(username=username)
+        data = {'username': '', 'email': 'blank@example.com', 'iban': 'LT1', 'password': 'password123',
+                'password2': 'password123'}
+        response = self.client.post(reverse('register'), data, follow=True)
+        self.assertContains(response, 'Username is required')
+        self.assertFalse(User.objects.exists())
+
+    def test_race_on_the_unique_email_index_is_a_registration_error(self):
+        self.register()
+        with mock.patch('dresscode.registration.check_available'):
+            with self.assertRaisesMessage(registration.RegistrationError, 'already exists'):
+                self.register(username='racer')
+        self.assertFalse(User.objects.filter(username='racer').exists())
+        self.assertEqual(Profile.objects.count(), 1)
+
+    def test_blank_emails_are_not_unique(self):
+        User.objects.create_user('first_admin', '')
+        User.objects.create_user('second_admin', '')
+        User.objects.create_user('third', 'first@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('fourth', 'first@example.com')
+
+    def test_view_registers_and_reports_a_taken_username(self):
+        self.register()
+        data = {'username': 'signup', 'email': 'new@example.com', 'iban': 'LT1', 'password': 'password123',
+                'password2': 'password123'}
+        response = self.client.post(reverse('register'), data, follow=True)
+        self.assertRedirects(response, reverse('register'))
+        self.assertContains(response, 'Username signup already exists')
+        self.assertEqual(User.objects.count(), 1)
+
+        data['username'] = 'newcomer'
+        response = self.client.post(reverse('register'), data)
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(User.objects.get(username='newcomer').profile.iban, 'LT1')
+
+
+class AdminQueryCountTests(TestCase):
+    """Administravimo sąrašų ir suknelės puslapio užklausų skaičius nepriklauso nuo nuomų ir vartotojų kiekio."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        self.dresses = seed_catalog(designers=3, dresses=30, prefix='adm')
+        self.users = seed_users(5, prefix='adm')
+        seed_rentals(30, self.dresses, self.users)
+
+    def query_counts(self):
+        dress = self.dresses[0]
+        pages = {
+            'rental changelist': reverse('admin:dresscode_dressrental_changelist'),
+            'rental filter': reverse('admin:dresscode_dressrental_changelist') + '?status__exact=rented',
+            'rental search': reverse('admin:dresscode_dressrental_changelist') + f'?q={dress.item_code}',
+            'dress changelist': reverse('admin:dresscode_dress_changelist'),
+            'dress change form': reverse('admin:dresscode_dress_change', args=(dress.pk,)),
+        }
+        counts = {}
+        for label, url in pages.items():
+            self.assertEqual(self.client.get(url).status_code, 200, label)
+            counts[label] = measure(lambda: self.client.get(url), repeat=1)[1]
+        return counts
+
+    def test_query_counts_stay_flat(self):
+        before = self.query_counts()
+        users = self.users + seed_users(100, start=5, prefix='adm')
+        seed_rentals(600, self.dresses, users)  # daugiau nei sąrašo puslapis ir inline eilučių riba
+        self.assertEqual(self.query_counts(), before)
+
+
+class AdminBulkDeleteTests(TransactionTestCase):
+    """Administravimo trynimas nevykdomas vienoje ilgoje transakcijoje."""
+
+    def test_delete_view_commits_each_chunk(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        designer = Designer.objects.create(name='Bulk', surname='Delete')
+        Dress.objects.bulk_create([Dress(item_code=f'BD{i}', color='red', designer=designer) for i in range(5)])
+        self.client.force_login(admin_user)
+        atomic = []
+
+        def recording_bulk_delete(queryset, *args, **kwargs):
+            atomic.append(connection.in_atomic_block)
+            return bulk_delete(queryset, *args, **kwargs)
+
+        with mock.patch('dresscode.admin.bulk_delete', recording_bulk_delete):
+            response = self.client.post(reverse('admin:dresscode_designer_delete', args=(designer.pk,)),
+                                        {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(atomic, [False])
+        self.assertFalse(Designer.objects.filter(pk=designer.pk).exists())
+        self.assertFalse(Dress.objects.filter(designer_id=designer.pk).exists())
+
+
+class RentalEventTests(TransactionTestCase):
+    """Įvykiai įrašomi vienu paketu patvirtinus transakciją, o atšaukti savepoint ar transakcija
+    įvykių nepalieka."""
+
+    def setUp(self):
+        designer = Designer.objects.create(name='Event', surname='Log')
+        self.dress = Dress.objects.create(item_code='EV1', color='red', designer=designer)
+
+    def events(self):
+        return list(RentalEvent.objects.order_by('id').values_list('rental_id', 'kind', 'status', 'previous_status'))
+
+    def test_events_are_written_once_on_commit(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                rental = DressRental.objects.create(dress=self.dress)
+                rental.status = 'approved'
+                rental.save()
+                self.assertEqual(self.events(), [])
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "dresscode_rentalevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.events(), [(rental.pk, 'created', 'pending', ''),
+                                         (rental.pk, 'status', 'approved', 'pending')])
+
+    def test_rolled_back_savepoints_leave_no_events(self):
+        with transaction.atomic():
+            rental = DressRental.objects.create(dress=self.dress)
+            with transaction.atomic():
+                rental.status = 'approved'
+                rental.save()
+            try:
+                with transaction.atomic():
+                    rental.status = 'rented'
+                    rental.save()
+                    with transaction.atomic():
+                        rental.status = 'returned'
+                        rental.save()
+                    raise Interrupted
+            except Interrupted:
+                pass
+            with transaction.atomic():
+                rental.status = 'pending'
+                rental.save()
+        self.assertEqual(self.events(), [(rental.pk, 'created', 'pending', ''),
+                                         (rental.pk, 'status', 'approved', 'pending'),
+                                         (rental.pk, 'status', 'pending', 'returned')])
+
+    def test_rolled_back_transaction_does_not_leak_into_the_next(self):
+        try:
+            with transaction.atomic():
+                DressRental.objects.create(dress=self.dress)
+                raise Interrupted
+        except Interrupted:
+            pass
+        with transaction.atomic():
+            rental = DressRental.objects.create(dress=self.dress)
+        self.assertEqual(self.events(), [(rental.pk, 'created', 'pending', '')])
+
+    def test_autocommit_writes_immediately(self):
+        rental = DressRental.objects.create(dress=self.dress)
+        self.assertEqual(self.events(), [(rental.pk, 'created', 'pending', '')])
+
+    def test_replay_counts_mismatches_and_fixes_them_only_with_apply(self):
+        rental = DressRental.objects.create(dress=self.dress)
+        DressRental.objects.filter(pk=rental.pk).update(status='rented')  # be signalų: įvykis neįrašomas
+
+        output = io.StringIO()
+        call_command('replay_rental_events', stdout=output)
+        self.assertIn('1 status mismatches,', output.getvalue())
+        self.assertEqual(DressRental.objects.get(pk=rental.pk).status, 'rented')
+
+        output = io.StringIO()
+        call_command('replay_rental_events', '--apply', stdout=output)
+        self.assertIn('1 status mismatches fixed', output.getvalue())
+        self.assertEqual(DressRental.objects.get(pk=rental.pk).status, 'pending')
+        self.assertEqual(len(self.events()), 1)
+
+
+class PrerenderTests(TestCase):
+    """Iš anksto atvaizduoti puslapiai: pakeitimai pašalina tik juos rodančius failus."""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.root = Path(root, 'prerendered')
+        self.root.mkdir()
+        override = override_settings(CACHES=LOCMEM_CACHE, PRERENDER_ENABLED=True, PRERENDER_ROOT=self.root,
+                                     PRERENDER_IN_BACKGROUND=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        caches['default'].clear()
+        self.anna = Designer.objects.create(name='Anna', surname='A')
+        self.bruno = Designer.objects.create(name='Bruno', surname='B')
+        self.red = Dress.objects.create(item_code='PR1', color='red', designer=self.anna)
+        self.blue = Dress.objects.create(item_code='PR2', color='blue', designer=self.anna)
+        self.green = Dress.objects.create(item_code='PR3', color='green', designer=self.bruno)
+        DressRecommendation.objects.create(dress=self.blue, recommended=self.red, rank=1, score=0.5, common_renters=2)
+        call_command('prerender', workers=1, stdout=io.StringIO())
+        self.pages = {
+            'designers': reverse('designers-all'), 'dresses': reverse('dresses-all'),
+            'anna': reverse('designer-one', args=(self.anna.pk,)),
+            'bruno': reverse('designer-one', args=(self.bruno.pk,)),
+            'red': reverse('dress-one', args=(self.red.pk,)), 'blue': reverse('dress-one', args=(self.blue.pk,)),
+            'green': reverse('dress-one', args=(self.green.pk,)),
+        }
+        self.assertEqual(self.existing(), set(self.pages))
+
+    def existing(self):
+        return {name for name, path in self.pages.items() if page_file(path).exists()}
+
+    def assertRemoved(self, names):
+        self.assertEqual(self.existing(), set(self.pages) - set(names))
+
+    def test_change_paths(self):
+        self.assertEqual(sorted(dress_change_paths([self.red.pk], [self.anna.pk])),
+                         sorted(self.pages[name] for name in ('red', 'blue', 'anna', 'dresses')))
+        self.assertEqual(dress_paths([self.green.pk]), [self.pages['green']])
+        self.assertEqual(designer_paths([self.bruno.pk]), [self.pages['bruno']])
+
+    def test_saving_a_dress_removes_the_pages_showing_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.red.save()
+        self.assertRemoved(['red', 'blue', 'anna', 'dresses'])
+
+    def test_moving_a_dress_removes_both_designers(self):
+        dress = Dress.objects.get(pk=self.green.pk)
+        dress.designer = self.anna
+        with self.captureOnCommitCallbacks(execute=True):
+            dress.save()
+        self.assertRemoved(['green', 'anna', 'bruno', 'dresses'])
+
+    def test_nothing_is_removed_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.red.save()
+        self.assertRemoved([])
+
+    def test_sizes_and_styles(self):
+        size = Size.objects.create(name='M')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.green.sizes.add(size)
+        self.assertRemoved(['green', 'bruno', 'dresses'])
+        call_command('prerender', missing=True, workers=1, stdout=io.StringIO())
+        self.assertRemoved([])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            size.dress_set.add(self.blue)
+        self.assertRemoved(['blue', 'anna', 'dresses'])
+
+        with self.assertLogs('dresscode.prerender', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            size.dress_set.clear()
+        self.assertFalse(self.root.exists())
+
+    def test_new_style_removes_everything(self):
+        with self.assertLogs('dresscode.prerender', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            Style.objects.create(name='Evening')
+        self.assertFalse(self.root.exists())
+
+    def test_designer_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bruno.save()
+        self.assertRemoved(['designers', 'dresses', 'bruno', 'green'])
+
+    def test_review_removes_only_the_dress_page(self):
+        reviewer = User.objects.create_user('prerender_reviewer', 'reviewer@example.com', 'pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            review = DressReview.objects.create(dress=self.green, reviewer=reviewer, content='Nice')
+        self.assertRemoved(['green'])
+        call_command('prerender', missing=True, workers=1, stdout=io.StringIO())
+        version = get_version(f'reviews:{self.green.pk}')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(DressReview.objects.filter(pk=review.pk))
+        self.assertRemoved(['green'])
+        self.assertGreater(get_version(f'reviews:{self.green.pk}'), version)
+
+    def test_later_pages_are_rendered_with_their_page_number(self):
+        with mock.patch('dresscode.views.DESIGNERS_PER_PAGE', 1), \
+                mock.patch('dresscode.prerender.DESIGNERS_PER_PAGE', 1):
+            call_command('prerender', self.pages['designers'], workers=1, stdout=io.StringIO())
+        first = page_file(self.pages['designers']).read_text()
+        second = page_file(self.pages['designers'], 2).read_text()
+        self.assertIn('Anna', first)
+        self.assertNotIn('Bruno', first)
+        self.assertIn('Bruno', second)
+        self.assertNotIn('Anna', second)
+
+    def test_pages_are_rendered_again_in_the_background(self):
+        with override_settings(PRERENDER_IN_BACKGROUND=True), \
+                mock.patch('dresscode.prerender.threading.Thread') as thread, \
+                mock.patch('dresscode.prerender.connections.close_all'):
+            prerenderer.invalidate([self.pages['green'], self.pages['bruno']])
+            self.assertRemoved(['green', 'bruno'])
+            thread.return_value.start.assert_called_once()
+            thread.call_args.kwargs['target']()  # gijos darbas vykdomas čia pat
+        self.assertRemoved([])
+        self.assertIsNone(prerenderer.thread)
+        self.assertEqual(prerenderer.pending, set())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, RATELIMIT_ENABLED=False)
+class RentalValidationTests(TestCase):
+    """validate_rental, nuomos formos ir availability JSON: datos, dydis, persidengiančios nuomos, užklausų skaičius."""
+
+    def setUp(self):
+        caches['default'].clear()
+        lookups.sizes.invalidate()
+        lookups.styles.invalidate()
+        self.addCleanup(lookups.sizes.invalidate)
+        self.user = User.objects.create_user('renter', 'renter@example.com', 'pass')
+        self.other = User.objects.create_user('other_renter', 'other@example.com', 'pass')
+        self.small, self.medium, self.large = (Size.objects.create(name=name) for name in ('S', 'M', 'L'))
+        designer = Designer.objects.create(name='Rental', surname='Rules')
+        self.dress = Dress.objects.create(item_code='RR1', color='red', designer=designer)
+        self.dress.sizes.set([self.small, self.medium])
+        self.today = date.today()
+        self.taken = self.rent(self.other, self.small, 10, 12, status='approved')
+
+    def rent(self, user, size, start, end, status='pending'):
+        return DressRental.objects.create(dress=self.dress, user=user, size=size, status=status,
+                                          start_date=self.today + timedelta(days=start),
+                                          return_date=self.today + timedelta(days=end))
+
+    def validate(self, size, start, end, **kwargs):
+        dress = Dress.objects.get(pk=self.dress.pk)
+        return validate_rental(dress, size.pk if size else None, self.today + timedelta(days=start),
+                               self.today + timedelta(days=end), **kwargs)
+
+    def test_dates_and_size(self):
+        self.assertEqual(self.validate(self.small, 1, 3), {})
+        self.assertEqual(set(self.validate(self.small, -1, 3)), {'start_date'})
+        self.assertEqual(set(self.validate(self.small, 5, 3)), {'return_date'})
+        self.assertEqual(set(self.validate(self.large, 1, 3)), {'size'})
+        self.assertEqual(self.validate(None, 1, 3), {})
+
+    def test_overlapping_active_rentals_are_rejected(self):
+        for start, end in ((11, 11), (8, 10), (12, 15), (5, 20)):
+            with self.subTest(start=start, end=end):
+                self.assertEqual(set(self.validate(self.small, start, end)), {'__all__'})
+        self.assertEqual(self.validate(self.small, 13, 15), {})
+        self.assertEqual(self.validate(self.medium, 10, 12), {})  # kitas dydis
+        DressRental.objects.filter(pk=self.taken.pk).update(status='returned')
+        self.assertEqual(self.validate(self.small, 10, 12), {})
+
+    def test_update_skips_its_own_rental_and_past_start(self):
+        rental = self.rent(self.user, self.small, -2, 1)
+        self.assertEqual(self.validate(self.small, -2, 2, rental_id=rental.pk, current_size_id=self.small.pk), {})
+        self.assertEqual(set(self.validate(self.small, -2, 10, rental_id=rental.pk, current_size_id=self.small.pk)),
+                         {'__all__'})
+
+    def test_update_keeps_a_size_removed_from_the_dress(self):
+        rental = self.rent(self.user, self.small, 1, 3)
+        self.dress.sizes.remove(self.small)
+        self.assertEqual(self.validate(self.small, 1, 4, rental_id=rental.pk, current_size_id=self.small.pk), {})
+        self.assertEqual(set(self.validate(self.large, 1, 4, rental_id=rental.pk, current_size_id=self.small.pk)),
+                         {'size'})
+        self.assertEqual(set(self.validate(self.small, 1, 4)), {'size'})
+
+        self.client.force_login(self.user)
+        new_return = self.today + timedelta(days=5)
+        response = self.client.post(reverse('my-rented-update', args=(rental.pk,)),
+                                    {'return_date': new_return.isoformat()})
+        self.assertRedirects(response, '/dresscode/mydresses', fetch_redirect_response=False)
+        self.assertEqual(DressRental.objects.get(pk=rental.pk).return_date, new_return)
+
+    def test_create_view_rejects_overlap(self):
+        self.client.force_login(self.user)
+        url = reverse('my-rented-new') + f'?dress_id={self.dress.pk}'
+        data = {'size': self.small.pk, 'start_date': (self.today + timedelta(days=11)).isoformat(),
+                'return_date': (self.today + timedelta(days=13)).isoformat()}
+        response = self.client.post(url, data)
+        self.assertContains(response, 'This dress is already rented for the selected days.')
+        data['size'] = self.medium.pk
+        self.assertRedirects(self.client.post(url, data), '/dresscode/mydresses', fetch_redirect_response=False)
+        self.assertTrue(DressRental.objects.filter(user=self.user, size=self.medium, status='pending').exists())
+
+    def availability(self, **params):
+        return self.client.get(reverse('dress-availability', args=(self.dress.pk,)), params)
+
+    def test_availability_endpoint(self):
+        self.assertEqual(self.availability().status_code, 302)  # tik prisijungusiems
+        self.client.force_login(self.user)
+        days = {'start_date': (self.today + timedelta(days=11)).isoformat(),
+                'return_date': (self.today + timedelta(days=12)).isoformat()}
+        self.assertEqual(self.availability(size=self.medium.pk, **days).json(), {'available': True, 'errors': {}})
+        self.assertEqual(self.availability(size=self.small.pk, **days).json(), {
+            'available': False, 'errors': {'__all__': 'This dress is already rented for the selected days.'}})
+        self.assertEqual(set(self.availability(size=self.large.pk, **days).json()['errors']), {'size'})
+
+        # svetima nuoma neišimama iš persidengimo patikros
+        self.assertFalse(self.availability(size=self.small.pk, rental=self.taken.pk, **days).json()['available'])
+        own = self.rent(self.user, self.medium, 11, 12)
+        self.assertTrue(self.availability(size=self.medium.pk, rental=own.pk, **days).json()['available'])
+        self.assertFalse(self.availability(size=self.medium.pk, **days).json()['available'])
+
+        response = self.availability(start_date='2024-02-30')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('dress-availability', args=(10 ** 6,))).status_code, 404)
+
+    def test_query_counts(self):
+        rental = self.rent(self.user, self.small, 1, 3)
+        self.client.force_login(self.user)
+        # vartotojas, suknelė su dydžiais (nuoma su suknele), moderatoriaus grupės patikra meniu
+        pages = {
+            'create': (reverse('my-rented-new') + f'?dress_id={self.dress.pk}', 4),
+            'update': (reverse('my-rented-update', args=(rental.pk,)), 3),
+        }
+        for label, (url, _) in pages.items():
+            self.assertEqual(self.client.get(url).status_code, 200, label)  # užpildomos lookups kopijos
+        for label, (url, queries) in pages.items():
+            with self.subTest(label), self.assertNumQueries(queries):
+                self.client.get(url)
+        with self.assertNumQueries(5):
+            self.availability(size=self.small.pk, rental=rental.pk, start_date=self.today.isoformat(),
+                              return_date=(self.today + timedelta(days=2)).isoformat())
+
+
+
+@override_settings(CACHES=LOCMEM_CACHE, RATELIMIT_ENABLED=False, PRERENDER_ENABLED=False)
+class RentalArchiveTests(TestCase):
+    """archive_rentals komanda ir Mano suknelės puslapis: aktyvios nuomos, grąžintų istorija ir archyvas."""
+
+    def setUp(self):
+        caches['default'].clear()
+        lookups.sizes.invalidate()
+        self.addCleanup(lookups.sizes.invalidate)
+        self.user = User.objects.create_user('archive_renter', 'archive@example.com', 'pass')
+        self.other = User.objects.create_user('archive_other', 'other@example.com', 'pass')
+        self.size = Size.objects.create(name='M')
+        designer = Designer.objects.create(name='Archive', surname='Designer')
+        self.dress = Dress.objects.create(item_code='ARC1', color='blue', designer=designer)
+        self.today = date.today()
+
+    def rent(self, days_ago, status='returned', user=None):
+        return_date = self.today - timedelta(days=days_ago)
+        return DressRental.objects.create(dress=self.dress, user=user or self.user, size=self.size, status=status,
+                                          start_date=return_date - timedelta(days=3), return_date=return_date)
+
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command('archive_rentals', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_only_old_returned_rentals(self):
+        old = [self.rent(400 + i) for i in range(5)]
+        kept = [self.rent(100), self.rent(400, status='rented'), self.rent(-5, status='pending')]
+
+        self.assertIn('Rentals to archive', self.archive('--dry-run'))
+        self.assertEqual(ArchivedDressRental.objects.count(), 0)
+
+        output = self.archive('--batch-size', '2')
+        self.assertEqual([line for line in output.splitlines() if line.startswith('Archived')],
+                         ['Archived 2 rentals', 'Archived 4 rentals', 'Archived 5 rentals'])
+        self.assertEqual(set(DressRental.objects.values_list('id', flat=True)), {rental.pk for rental in kept})
+        self.assertEqual(
+            set(ArchivedDressRental.objects.values_list('rental_id', 'dress_id', 'user_id', 'size_id',
+                                                        'start_date', 'return_date', 'status')),
+            {(rental.pk, self.dress.pk, self.user.pk, self.size.pk, rental.start_date, rental.return_date,
+              'returned') for rental in old})
+
+        self.assertIn('archived 0 rentals', self.archive('--batch-size', '2'))
+        self.assertEqual(ArchivedDressRental.objects.count(), 5)
+
+    def test_rerun_after_partial_copy_does_not_duplicate(self):
+        # Kaip po nutrūkusio paleidimo: įrašas jau archyve, bet dar neištrintas iš DressRental.
+        rental = self.rent(400)
+        ArchivedDressRental.objects.create(rental_id=rental.pk, dress=self.dress, user=self.user, size=self.size,
+                                           start_date=rental.start_date, return_date=rental.return_date)
+        self.assertIn('archived 1 rentals', self.archive())
+        self.assertFalse(DressRental.objects.exists())
+        self.assertEqual(ArchivedDressRental.objects.filter(rental_id=rental.pk).count(), 1)
+
+    def test_my_dresses_splits_active_rentals_and_history(self):
+        url = reverse('my-dresses')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.user)
+
+        late = self.rent(-10, status='rented')
+        soon = self.rent(-2, status='pending')
+        approved = self.rent(-5, status='approved')
+        returned = [self.rent(days) for days in range(1, 13)]
+        old = self.rent(400)
+        self.rent(1, user=self.other)
+        self.rent(-1, status='rented', user=self.other)
+        self.archive()
+
+        self.client.get(url)  # užpildoma lookups.sizes kopija
+        # vartotojas, istorijos skaičius, moderatoriaus grupė, profilis, aktyvios nuomos, istorijos puslapis
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(list(response.context['active_rentals']), [soon, approved, late])
+        self.assertEqual(list(response.context['dressrental_list']), returned[:10])
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertFalse(response.context['archive'])
+        self.assertEqual(list(self.client.get(url, {'page': 2}).context['dressrental_list']), returned[10:])
+
+        response = self.client.get(url, {'archive': '1'})
+        self.assertTrue(response.context['archive'])
+        self.assertEqual([rental.rental_id for rental in response.context['dressrental_list']], [old.pk])
+        self.assertNotContains(response, 'My rented dresses:')
+        self.assertContains(response, 'Archived rentals')
+
+
+class PublicPageTests(TestCase):
+    """Viešų katalogo puslapių apvalkalas vienodas visiems: be vartotojo duomenų ir be Vary: Cookie."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('shell_staff_user', 'staff@example.com', 'pass')
+        self.user.groups.create(name='staff')
+        reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass')
+        designer = Designer.objects.create(name='Shell', surname='Designer')
+        self.dress = Dress.objects.create(item_code='SHELL1', color='red', designer=designer)
+        self.review = DressReview.objects.create(dress=self.dress, reviewer=reviewer, content='Lovely dress')
+
+    def pages(self):
+        return [reverse('designers-all'), reverse('designer-one', args=(self.dress.designer_id,)),
+                reverse('dresses-all'), reverse('dress-one', args=(self.dress.pk,))]
+
+    def test_shell_has_no_user_data(self):
+        self.client.force_login(self.user)
+        for url in self.pages():
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                content = response.content.decode()
+                self.assertNotIn('shell_staff_user', content)
+                self.assertNotIn('csrfmiddlewaretoken', content)
+                self.assertNotIn(reverse('logout'), content)
+                self.assertNotIn(reverse('reviews-delete', args=(self.review.pk,)), content)
+                self.assertNotIn('Cookie', response.headers.get('Vary', ''))
+                self.assertNotIn('Set-Cookie', response.headers)
+
+    def test_same_shell_for_everyone(self):
+        anonymous = self.client.get(self.pages()[-1]).content
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.pages()[-1]).content, anonymous)
+
+    def test_browsers_revalidate_and_shared_caches_keep_the_page(self):
+        response = self.client.get(self.pages()[-1])
+        directives = {directive.strip() for directive in response.headers['Cache-Control'].split(',')}
+        self.assertTrue({'public', 'max-age=0', 's-maxage=60'} <= directives, directives)
+        self.assertIn('ETag', response.headers)
+        revalidated = self.client.get(self.pages()[-1], HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_fragments_carry_the_personal_parts(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('user-fragments'), {'dress': self.dress.pk})
+        fragments = response.json()
+        self.assertIn('shell_staff_user', fragments['nav'])
+        self.assertIn('csrfmiddlewaretoken', fragments['dress-actions'])
+        self.assertIn(f'review-delete-{self.review.pk}', fragments)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRERENDER_ENABLED=False)
+class DesignerPageTests(TestCase):
+    """Dizainerių sąrašas ir dizainerio suknelės puslapiuojami: puslapio dydis, netinkamas page, užklausų skaičius."""
+
+    def setUp(self):
+        caches['default'].clear()
+        lookups.sizes.invalidate()
+        lookups.styles.invalidate()
+        self.addCleanup(lookups.sizes.invalidate)
+        self.addCleanup(lookups.styles.invalidate)
+        self.designers = [Designer.objects.create(name=f'Paged{i}', surname='Designer') for i in range(5)]
+        self.designer = self.designers[0]
+        size, style = Size.objects.create(name='S'), Style.objects.create(name='Boho')
+        for i in range(20):
+            dress = Dress.objects.create(item_code=f'PAGE{i:02}', color='red', designer=self.designer)
+            dress.sizes.add(size)
+            dress.styles.add(style)
+
+    def designers_page(self, page=None):
+        return self.client.get(reverse('designers-all'), {'page': page} if page is not None else {})
+
+    def designer_page(self, page=None):
+        return self.client.get(reverse('designer-one', args=(self.designer.pk,)),
+                               {'page': page} if page is not None else {})
+
+    def test_designers_are_paged(self):
+        response = self.designers_page()
+        self.assertEqual([designer.pk for designer in response.context['designers']],
+                         [designer.pk for designer in self.designers[:DESIGNERS_PER_PAGE]])
+        self.assertEqual(response.context['designers'].paginator.num_pages, 3)
+        self.assertEqual(list(self.designers_page(3).context['designers']), self.designers[4:])
+        for page in ('99', '-1', 'abc', ''):
+            with self.subTest(page=page):
+                self.assertEqual(self.designers_page(page).status_code, 200)
+        self.assertEqual(self.designers_page('99').context['designers'].number, 3)
+        self.assertEqual(self.designers_page('abc').context['designers'].number, 1)
+
+    def test_designer_dresses_are_paged(self):
+        response = self.designer_page()
+        dresses = response.context['dresses']
+        self.assertEqual([dress.item_code for dress in dresses], [f'PAGE{i:02}' for i in range(8)])
+        self.assertEqual(len(dresses), DESIGNER_DRESSES_PER_PAGE)
+        self.assertContains(response, 'Boho')
+        last = self.designer_page('99').context['dresses']
+        self.assertEqual((last.number, [dress.item_code for dress in last]), (3, [f'PAGE{i:02}' for i in range(16, 20)]))
+        self.assertEqual(self.designer_page('abc').context['dresses'].number, 1)
+        self.assertEqual(self.client.get(reverse('designer-one', args=(10 ** 6,))).status_code, 404)
+
+    def test_query_counts_do_not_grow_with_the_page_size(self):
+        self.designers_page()
+        self.designer_page()  # užpildomos lookups kopijos
+        with self.assertNumQueries(2):  # dizainerių skaičius ir puslapis
+            self.designers_page(2)
+        with self.assertNumQueries(5):  # dizaineris, suknelių skaičius, puslapis, dydžiai, stiliai
+            self.designer_page(2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRERENDER_ENABLED=False)
+class ReviewFragmentTests(TestCase):
+    """Podėlyje laikomas atsiliepimų fragmentas pasensta pakeitus, ištrynus atsiliepimą ar pervadinus autorių."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.reviewer = User.objects.create_user('original_reviewer', 'reviewer@example.com', 'pass')
+        designer = Designer.objects.create(name='Fragment', surname='Designer')
+        self.dress = Dress.objects.create(item_code='FRAG1', color='red', designer=designer)
+        self.review = DressReview.objects.create(dress=self.dress, reviewer=self.reviewer, content='Lovely dress')
+        self.url = reverse('dress-one', args=(self.dress.pk,))
+
+    def test_review_save_and_delete_bust_the_fragment(self):
+        self.assertContains(self.client.get(self.url), 'Lovely dress')
+        DressReview.objects.filter(pk=self.review.pk).update(content='Changed quietly')
+        self.assertContains(self.client.get(self.url), 'Lovely dress')  # fragmentas imamas iš podėlio
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.content = 'Even lovelier'
+            self.review.save()
+        self.assertContains(self.client.get(self.url), 'Even lovelier')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review.delete()
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Even lovelier')
+        self.assertContains(response, 'Dress does not have comments yet!')
+
+    def test_renaming_the_reviewer_busts_the_fragment(self):
+        self.assertContains(self.client.get(self.url), 'original_reviewer')
+        version = get_version(f'reviews:{self.dress.pk}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username='original_reviewer', password='pass')  # last_login
+            User.objects.get(pk=self.reviewer.pk).save()
+        self.assertEqual(get_version(f'reviews:{self.dress.pk}'), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(pk=self.reviewer.pk)
+            user.username = 'renamed_reviewer'
+            user.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'renamed_reviewer')
+        self.assertNotContains(response, 'original_reviewer')
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRERENDER_ENABLED=False)
+class TemplateProfilingTests(TestCase):
+    """Template._render apgaubiamas tik įjungus TEMPLATE_PROFILING; middleware prideda Server-Timing."""
+
+    def setUp(self):
+        caches['default'].clear()
+        profiling.uninstall()
+        self.addCleanup(profiling.uninstall)
+        self.original_render = Template._render
+        designer = Designer.objects.create(name='Profiled', surname='Designer')
+        self.url = reverse('dress-one', args=(Dress.objects.create(item_code='PROF1', designer=designer).pk,))
+
+    @override_settings(TEMPLATE_PROFILING=False)
+    def test_disabled_setting_leaves_templates_untouched(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertIs(Template._render, self.original_render)
+        with profiling.profile_templates() as stats:
+            render_to_string('review_delete.html', {'review_id': 1})
+        self.assertEqual(stats.rows(), [])
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_middleware_reports_template_timings(self):
+        response = self.client.get(self.url)
+        self.assertTrue(Template._render.profiled)
+        self.assertRegex(response.headers['Server-Timing'], r'tpl0;desc="[^"]+ x\d+";dur=[\d.]+')
+        self.assertIn('dress.html x1', response.headers['Server-Timing'])
+        self.assertIn('base.html x1', response.headers['Server-Timing'])
+
+        profiling.uninstall()
+        self.assertIs(Template._render, self.original_render)
+
+    def test_nested_sessions_add_up(self):
+        profiling.install()
+        profiling.install()
+        self.assertIs(Template._render.original, self.original_render)
+        with profiling.profile_templates() as outer:
+            render_to_string('review_delete.html', {'review_id': 1})
+            with profiling.profile_templates() as inner:
+                render_to_string('review_delete.html', {'review_id': 2})
+        self.assertEqual([row[:2] for row in inner.rows()], [('review_delete.html', 1)])
+        self.assertEqual([row[:2] for row in outer.rows()], [('review_delete.html', 2)])
+        name, count, total, self_ms = outer.rows()[0]
+        self.assertGreaterEqual(total, self_ms)
@@ -1,5 +1,7 @@
 from django.urls import path
 from . import views
+from .admission import Pool
+from .ratelimit import Rate
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -7,7 +9,10 @@ urlpatterns = [
     path('designers/<int:designer_id>', views.get_one_designer, name='designer-one'),
     path('dresses/', views.DressListView.as_view(), name='dresses-all'),
     path('dresses/<int:pk>', views.DressDetailView.as_view(), name='dress-one'),
+    path('dresses/<int:pk>/availability', views.dress_availability, name='dress-availability'),
     path('search/', views.search, name='search'),
+    path('search/autocomplete', views.autocomplete, name='search-autocomplete'),
+    path('fragments/', views.user_fragments, name='user-fragments'),
     path('mydresses/', views.RentedDressesByUserListView.as_view(), name='my-dresses'),
     path('register/', views.register_user, name='register'),
     path('profile/', views.get_user_profile, name='user-profile'),
@@ -19,3 +24,33 @@ urlpatterns = [
     path('rent/update/<int:pk>/', views.DressRentalUpdateView.as_view(), name='update-rent'),
 
 ]
+
+# Užklausų ribojimas pagal URL pavadinimą (dresscode.middleware.RateLimitMiddleware).
+ratelimits = {
+    'search': Rate('30/m', burst=10),
+    'search-autocomplete': Rate('10/s', burst=20),
+    'dress-one': Rate('5/m', burst=3, key='user', methods=('POST',)),
+    'register': Rate('5/h', burst=3, methods=('POST',)),
+    'login': Rate('10/m', burst=5, methods=('POST',)),
+}
+
+# Lygiagretumo ribojimas (dresscode.middleware.AdmissionControlMiddleware): kiek užklausų vienu metu
+# vykdo vienas darbinis procesas. Brangūs puslapiai turi atskiras, mažas grupes, kad užstrigę
+# neužimtų visų gijų; visi kiti puslapiai patenka į 'default'. WSGI serveryje eilėje laukianti
+# užklausa irgi užima giją, todėl brangių grupių limit + queue turi būti gerokai mažesnis už
+# proceso gijų skaičių, o 'default' limit - ne didesnis už jį.
+admission_pools = {
+    'reports': Pool(limit=2, queue=2, timeout=10),
+    'search': Pool(limit=4, queue=4, timeout=3),
+    'default': Pool(limit=12, queue=24, timeout=10),
+}
+
+# Peržiūros pavadinimas (view_name, galima su * šablonu) -> grupė admission_pools žodyne.
+admission_routes = {
+    'allrents': 'reports',
+    'admin:*_changelist': 'reports',
+    'search': 'search',
+}
+
+# Prisijungusių vartotojų užsakymai laukimo eilėje aplenkia naršymą.
+admission_priority = {'my-rented-new'}
@@ -1,3 +1,8 @@
+from datetime import date
+
+from .models import DressRental
+
+
 def check_password(password):
     """Tikrina, ar slaptažodis yra ilgesnis nei 7 simboliai,
     nes registracijos formoje yra paminėta, kad slaptažodis turi būti mažiausiai 8 simboliai."""
@@ -5,3 +10,29 @@ def check_password(password):
         return True
     else:
         return False
+
+
+def validate_rental(dress, size_id, start_date, return_date, rental_id=None, current_size_id=None):
+    """Tikrina nuomos datas, dydį ir ar suknelė tokio dydžio tuo metu neišnuomota.
+    Naudojama ir nuomos formoje, ir JSON užklausoje, kuri patikrina duomenis prieš pateikiant formą.
+    Redaguojant nuomą (rental_id) nepakeistas dydis (current_size_id) netikrinamas: jei jis vėliau
+    išimtas iš suknelės dydžių, nuomą vis tiek turi būti galima redaguoti.
+    Grąžina klaidų žodyną {laukas: pranešimas}; tuščias žodynas reiškia, kad nuomoti galima."""
+    errors = {}
+    if rental_id is None and start_date and start_date < date.today():
+        errors['start_date'] = 'Start day can not be in the past.'
+    if start_date and return_date and return_date < start_date:
+        errors['return_date'] = 'Return day must be after the start day.'
+    size_unchanged = rental_id is not None and size_id == current_size_id
+    if size_id is not None and not size_unchanged and size_id not in dress.related_ids('sizes'):
+        errors['size'] = 'This size is not available for this dress.'
+    if errors or not (start_date and return_date):
+        return errors
+
+    overlapping = DressRental.objects.filter(dress=dress, size_id=size_id, status__in=DressRental.ACTIVE_STATUSES,
+                                             start_date__lte=return_date, return_date__gte=start_date)
+    if rental_id is not None:
+        overlapping = overlapping.exclude(pk=rental_id)
+    if overlapping.exists():
+        errors['__all__'] = 'This dress is already rented for the selected days.'
+    return errors
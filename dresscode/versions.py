@@ -0,0 +1,26 @@
+from django.core.cache import cache
+
+
+def version_key(name):
+    """Grąžina podėlio raktą, kuriame saugoma nurodytų duomenų versija."""
+    return f"dresscode:version:{name}"
+
+
+def get_version(name):
+    """Grąžina dabartinę duomenų versiją iš bendro podėlio.
+    Jei versijos dar nėra, ji sukuriama lygi 1."""
+    version = cache.get(version_key(name))
+    if version is None:
+        cache.add(version_key(name), 1, timeout=None)
+        version = cache.get(version_key(name), 1)
+    return version
+
+
+def bump_version(name):
+    """Padidina duomenų versiją, kad visi procesai žinotų,
+    jog jų vietinės duomenų kopijos pasenusios. Grąžina naują versiją."""
+    try:
+        return cache.incr(version_key(name))
+    except ValueError:
+        cache.add(version_key(name), 1, timeout=None)
+        return cache.incr(version_key(name))
@@ -1,15 +1,58 @@
+from functools import wraps
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect, reverse
 from django.views import generic
+from django.db import transaction
 from django.db.models import Q
+from django.core.mail import send_mail
 from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.decorators import login_required
-
-from .models import Designer, Dress, DressRental, User, DressReview, Profile
+from django.template.loader import render_to_string
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from .models import ArchivedDressRental, Designer, Dress, DressRental, DressReview
+from .autocomplete import prefix_index
+from .facets import facet_index, facet_options, parse_filters
 from .forms import DressReviewForm, ProfileUpdateForm, UserUpdateForm, UserDressRentalCreateForm
-from .utils import check_password
+from .utils import check_password, validate_rental
+from .versions import get_version
+from . import lookups, registration
+
+DESIGNERS_PER_PAGE = 2
+DESIGNER_DRESSES_PER_PAGE = 8
+
+
+def public_page(view_func):
+    """
+        Rodinio GET atsakymas padaromas vienodu visiems vartotojams ir leidžiama jį saugoti
+        bendruose podėliuose (Cache-Control: public, max-age=0, s-maxage=PUBLIC_PAGE_MAX_AGE).
+        Naršyklė puslapį kaskart patikrina (ETag, Last-Modified), todėl vartotojas po savo
+        pakeitimo (pvz. parašyto atsiliepimo) nemato savo paties pasenusios kopijos.
+
+        Šablonai su request.public_shell nerodo asmeninių dalių (navigacijos, pranešimų,
+        nuomos ir komentaro formų, trynimo nuorodų), o palieka tuščius data-fragment
+        elementus, kuriuos naršyklė užpildo iš user_fragments. Vartotojas ir sesija
+        neskaitomi, todėl atsakymas negauna Vary: Cookie.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        request.public_shell = True
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PUBLIC_PAGE_MAX_AGE)
+        return response
+    return wrapper
 
 
 def index(request):
@@ -20,7 +63,8 @@ def index(request):
        Funkcijos logika:
            1. Tikrinama, ar vartotojas yra prisijungęs (request.user.is_authenticated).
            2. Jei vartotojas yra prisijungęs:
-               Skaičiuojamas dizainerių, suknelių, nuomos įrašų, išnuomotų ir grąžintų suknelių skaičius.
+               Skaičiuojamas dizainerių, suknelių, nuomos įrašų, išnuomotų ir grąžintų suknelių skaičius
+               (įskaitant archyvuotas nuomas).
                Sukuriamas kontekstas su šiais duomenimis.
                Atvaizduojamas 'index.html' šablonas su kontekstu.
            3. Jei vartotojas nėra prisijungęs:
@@ -29,9 +73,10 @@ def index(request):
     if request.user.is_authenticated:
         num_designers = Designer.objects.count()
         num_dresses = Dress.objects.count()
-        num_dress_rentals = DressRental.objects.count()
+        num_archived = ArchivedDressRental.objects.count()
+        num_dress_rentals = DressRental.objects.count() + num_archived
         num_dresses_rented = DressRental.objects.filter(status__exact='rented').count()
-        num_dresses_returned = DressRental.objects.filter(status__exact='returned').count()
+        num_dresses_returned = DressRental.objects.filter(status__exact='returned').count() + num_archived
 
         context = {'num_designers': num_designers,
                    'num_dresses': num_dresses,
@@ -46,6 +91,7 @@ def index(request):
         return redirect('register')
 
 
+@public_page
 def get_designers(request):
     """
         Gauna visus dizainerius, suskirsto juos į puslapius ir rodo dizainerių sąrašą.
@@ -59,30 +105,42 @@ def get_designers(request):
             6. Atvaizduojamas 'designers.html' šablonas su kontekstu.
     """
     designers = Designer.objects.all()
-    paginator = Paginator(designers, 2)
+    paginator = Paginator(designers, DESIGNERS_PER_PAGE)
     page_number = request.GET.get('page')
     paged_designers = paginator.get_page(page_number)
     context = {'designers': paged_designers}
     return render(request, 'designers.html', context=context)
 
 
+@public_page
 def get_one_designer(request, designer_id):
     """
-        Gauna vieną dizainerį pagal ID ir rodo jo informaciją.
+        Gauna vieną dizainerį pagal ID ir rodo jo informaciją bei suknelių portfelį puslapiais.
 
         Funkcijos logika:
             1. Gaunamas dizaineris iš duomenų bazės pagal ID (get_object_or_404(Designer, pk=designer_id)).
-            2. Sukuriamas kontekstas su dizainerio informacija.
-            3. Atvaizduojamas 'designer.html' šablonas su kontekstu.
+            2. Gaunamos dizainerio suknelės su iš anksto įkeltais dydžiais ir stiliais.
+            3. Suknelės suskirstomos į puslapius (Paginator), kad puslapio dydis nepriklausytų
+               nuo dizainerio suknelių skaičiaus.
+            4. Sukuriamas kontekstas su dizainerio informacija ir puslapiuotu suknelių sąrašu.
+            5. Atvaizduojamas 'designer.html' šablonas su kontekstu.
     """
     one_designer = get_object_or_404(Designer, pk=designer_id)
-    context = {'one_designer': one_designer}
+    dresses = one_designer.dress_set.prefetch_related('sizes', 'styles').order_by('item_code')
+    paginator = Paginator(dresses, DESIGNER_DRESSES_PER_PAGE)
+    page_number = request.GET.get('page')
+    paged_dresses = paginator.get_page(page_number)
+    context = {'one_designer': one_designer,
+               'dresses': paged_dresses,
+               'page_range': paginator.get_elided_page_range(paged_dresses.number)}
     return render(request, 'designer.html', context=context)
 
 
+@method_decorator(public_page, name='dispatch')
 class DressListView(generic.ListView):
     """
-       Rodo suknelių sąrašą, suskirstytą į puslapius.
+       Rodo suknelių sąrašą, suskirstytą į puslapius, ir leidžia jį filtruoti
+       pagal dydį, stilių, dizainerį ir spalvą.
 
        Klasės kintamieji:
            model (Model): Modelis, iš kurio gaunami objektai (Dress).
@@ -91,14 +149,35 @@ class DressListView(generic.ListView):
            paginate_by (int): Objektų skaičius viename puslapyje (4).
 
        Metodai:
-           get_queryset(): Gauna suknelių sąrašą iš duomenų bazės.
+           get_queryset(): Gauna suknelių sąrašą iš duomenų bazės arba filtrų indekso.
+           get_context_data(): Prideda filtrų reikšmes su suknelių skaičiais ir katalogo versiją.
     """
     model = Dress
     context_object_name = 'dress_list'
     template_name = 'dresses.html'
     paginate_by = 4
 
+    def get_queryset(self):
+        """Jei pasirinkti filtrai, suknelių ID apskaičiuojami bitų aibių sankirta atmintyje,
+        o iš duomenų bazės nuskaitomas tik rodomas puslapis."""
+        self.filters = parse_filters(self.request.GET)
+        if any(self.filters.values()):
+            return facet_index.select(self.filters)
+        return Dress.objects.select_related('designer').defer('description', 'description_html').order_by('id')
+
+    def get_context_data(self, **kwargs):
+        """Prideda filtrų reikšmes su suknelių skaičiais, užklausos parametrus puslapiavimui
+        ir katalogo versiją, pagal kurią podėlyje saugomos suknelių kortelės."""
+        context = super().get_context_data(**kwargs)
+        context['catalog_version'] = get_version('catalog')
+        context['facets'] = facet_options(self.filters, facet_index.counts(self.filters))
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['querystring'] = query.urlencode()
+        return context
+
 
+@method_decorator(public_page, name='dispatch')
 class DressDetailView(generic.edit.FormMixin, generic.DetailView):
     """
        Rodo suknelės detalę informaciją ir leidžia vartotojams palikti atsiliepimą.
@@ -110,6 +189,7 @@ class DressDetailView(generic.edit.FormMixin, generic.DetailView):
            form_class (Form): Atsiliepimo forma (DressReviewForm).
 
        Metodai:
+           get_context_data(): Prideda atsiliepimus, rekomendacijas ir jų podėlio raktams reikalingas reikšmes.
            post(): Apdoroja atsiliepimo formos pateikimą.
            form_valid(): Išsaugo atsiliepimą, susieja jį su suknele ir vartotoju.
            get_success_url(): Nukreipia į suknelės puslapį po sėkmingo atsiliepimo palikimo.
@@ -119,6 +199,22 @@ class DressDetailView(generic.edit.FormMixin, generic.DetailView):
     template_name = 'dress.html'
     form_class = DressReviewForm
 
+    def get_context_data(self, **kwargs):
+        """Prideda atsiliepimus su autoriais, jų versiją ir ar vartotojas priklauso 'staff' grupei
+        (viešame puslapyje - ne, trynimo nuorodos įkeliamos su user_fragments),
+        bei iš anksto apskaičiuotas rekomendacijas. Abu sąrašai podėlyje saugomi pagal šias reikšmes,
+        todėl jų užklausos vykdomos tik tada, kai sąrašo podėlyje nėra."""
+        context = super().get_context_data(**kwargs)
+        context['reviews'] = self.object.dressreview_set.select_related('reviewer').order_by('id')
+        context['reviews_version'] = get_version(f'reviews:{self.object.pk}')
+        user = self.request.user
+        context['is_staff_member'] = (not getattr(self.request, 'public_shell', False) and user.is_authenticated
+                                      and user.groups.filter(name='staff').exists())
+        context['recommendations'] = self.object.recommendations.select_related('recommended').order_by('rank')
+        context['recommendations_version'] = get_version('recommendations')
+        context['catalog_version'] = get_version('catalog')
+        return context
+
     def post(self, request, *args, **kwargs):
         """Apdoroja atsiliepimo formos pateikimą."""
         form = self.get_form()
@@ -147,15 +243,18 @@ def search(request):
         Funkcijos logika:
             1. Gaunamas paieškos tekstas iš užklausos (request.GET.get('search_text')).
             2. Ieškoma suknelių, kurių spalva, stilius arba prekės kodas atitinka paieškos tekstą.
+               Tinkami stiliai randami procese laikomoje Style lentelės kopijoje, todėl
+               užklausa nejungia Style lentelės.
             3. Sukuriamas kontekstas su paieškos tekstu ir rezultatais.
             4. Atvaizduojamas 'search_results.html' šablonas su kontekstu.
     """
-    query_text = request.GET.get('search_text')
+    query_text = request.GET.get('search_text') or ''
+    style_ids = [style.pk for style in lookups.styles.all() if query_text.lower() in style.name.lower()]
     search_results = Dress.objects.filter(
         Q(color__icontains=query_text)
-        | Q(styles__name__icontains=query_text)
+        | Q(styles__in=style_ids)
         | Q(item_code__icontains=query_text)
-    ).distinct()
+    ).select_related('designer').defer('description', 'description_html').distinct()
 
     context = {'query_text': query_text,
                'dress_list': search_results}
@@ -163,25 +262,84 @@ def search(request):
     return render(request, 'search_results.html', context=context)
 
 
+@require_GET
+def autocomplete(request):
+    """
+        Grąžina JSON su paieškos pasiūlymais įvedamam tekstui (parametras q).
+
+        Pasiūlymai imami iš procese laikomo prefiksų indekso (dresscode.autocomplete),
+        todėl užklausos kiekvienam klavišo paspaudimui nesikreipia į duomenų bazę.
+        Grąžinamas {'query': tekstas, 'suggestions': [{'kind', 'label', 'url'}]}.
+    """
+    query_text = request.GET.get('q', '')[:100]
+    suggestions = [{'kind': kind, 'label': label, 'url': prefix_index.url(kind, label, pk)}
+                   for kind, label, pk in prefix_index.suggest(query_text)]
+    return JsonResponse({'query': query_text, 'suggestions': suggestions})
+
+
+@never_cache
+@require_GET
+def user_fragments(request):
+    """
+        Grąžina JSON {pavadinimas: HTML} su asmeninėmis viešų puslapių (public_page) dalimis.
+        Naršyklė jas įterpia į elementus su atitinkamu data-fragment atributu (static/js/fragments.js).
+
+        Visada grąžinama navigacija ir pranešimai. Su parametru dress prisijungusiam vartotojui
+        grąžinamos ir suknelės nuomos bei komentaro formos, o 'staff' grupės nariui -
+        kiekvieno atsiliepimo trynimo nuoroda. Atsakymas podėlyje nesaugomas.
+    """
+    fragments = {'nav': render_to_string('user_nav.html', request=request),
+                 'messages': render_to_string('messages.html', request=request)}
+    dress_id = request.GET.get('dress', '')
+    if dress_id.isdigit() and request.user.is_authenticated:
+        dress = get_object_or_404(Dress.objects.only('id'), pk=dress_id)
+        fragments['dress-actions'] = render_to_string('dress_actions.html', {'dress': dress, 'form': DressReviewForm()},
+                                                      request)
+        if request.user.groups.filter(name='staff').exists():
+            for review_id in dress.dressreview_set.values_list('id', flat=True):
+                fragments[f'review-delete-{review_id}'] = render_to_string('review_delete.html',
+                                                                           {'review_id': review_id})
+    return JsonResponse(fragments)
+
+
 class RentedDressesByUserListView(LoginRequiredMixin, generic.ListView):
     """
-        Rodo prisijungusio vartotojo išsinuomotas sukneles.
+        Rodo prisijungusio vartotojo aktyvias nuomas ir puslapiuotą grąžintų suknelių istoriją.
 
         Klasės kintamieji:
             model (Model): Modelis, iš kurio gaunami objektai (DressRental).
             context_object_name (str): Konteksto kintamojo pavadinimas ('dressrental_list').
             template_name (str): Šablono pavadinimas ('user_dresses.html').
+            paginate_by (int): Istorijos įrašų skaičius viename puslapyje (10).
 
         Metodai:
-            get_queryset(): Gauna prisijungusio vartotojo išsinuomotas sukneles.
+            get_queryset(): Gauna grąžintų suknelių istoriją (arba archyvą, jei ?archive=1).
+            get_context_data(): Prideda aktyvias vartotojo nuomas.
     """
     model = DressRental
     context_object_name = 'dressrental_list'
     template_name = 'user_dresses.html'
+    paginate_by = 10
 
     def get_queryset(self):
-        """Gauna prisijungusio vartotojo išsinuomotas sukneles."""
-        return DressRental.objects.filter(user=self.request.user)
+        """Gauna grąžintas vartotojo sukneles naujausias pirmiau. Senos nuomos, perkeltos
+        komanda archive_rentals, rodomos atskirai iš ArchivedDressRental lentelės."""
+        self.archive = self.request.GET.get('archive') == '1'
+        if self.archive:
+            history = ArchivedDressRental.objects.filter(user=self.request.user)
+        else:
+            history = DressRental.objects.filter(user=self.request.user, status='returned')
+        return history.select_related('dress__designer').order_by('-return_date', '-id')
+
+    def get_context_data(self, **kwargs):
+        """Prideda aktyvias (laukiančias, patvirtintas, išnuomotas) vartotojo nuomas.
+        Jų nedaug, todėl jos rodomos visos, su suknele ir dizaineriu ta pačia užklausa."""
+        context = super().get_context_data(**kwargs)
+        context['archive'] = self.archive
+        context['active_rentals'] = DressRental.objects.filter(
+            user=self.request.user, status__in=DressRental.ACTIVE_STATUSES
+        ).select_related('dress__designer').order_by('return_date', 'id')
+        return context
 
 
 @csrf_protect
@@ -197,15 +355,16 @@ def register_user(request):
                 Tikrinama, ar slaptažodžiai sutampa, ar neegzistuoja jau toks vartotojo vardas
                   arba el. paštas, ar IBAN laukelis nėra tuščias.
                 Jei yra klaidų, rodomi pranešimai ir nukreipiama atgal į registracijos puslapį.
-                Jei nėra klaidų, sukuriamas naujas vartotojas ir jo profilis.
+                Jei nėra klaidų, registration.register() viena užklausa patikrina vardo ir el. pašto
+                  unikalumą ir vienoje transakcijoje sukuria vartotoją bei jo profilį su IBAN.
                 Rodomas pranešimas apie sėkmingą registraciją ir nukreipiama į prisijungimo puslapį.
     """
     if request.method == 'GET':
         return render(request, 'registration/registration.html')
 
     elif request.method == 'POST':
-        first_name = request.POST.get('first_name')
-        last_name = request.POST.get('last_name')
+        first_name = request.POST.get('first_name', '')
+        last_name = request.POST.get('last_name', '')
         username = request.POST.get('username')
         email = request.POST.get('email')
         iban = request.POST.get('iban')
@@ -220,26 +379,18 @@ def register_user(request):
             messages.error(request, 'Passwords do not match, please retype passwords!')
             return redirect('register')
 
-        if User.objects.filter(username=username).exists():
-            messages.error(request, f'Username {username} already exists')
-            return redirect('register')
-
-        if User.objects.filter(email=email).exists():
-            messages.error(request, f'Email {email} already exists')
-            return redirect('register')
-
         if not iban:
             messages.error(request, 'You must enter IBAN number!')
             return redirect('register')
 
-        user = User.objects.create_user(username=username, email=email, password=password, first_name=first_name,
-                                        last_name=last_name)
-
-        profile = Profile.objects.get(user=user)
-        profile.iban = iban
-        profile.save()
+        try:
+            user = registration.register(username=username, email=email, password=password, iban=iban,
+                                         first_name=first_name, last_name=last_name)
+        except registration.RegistrationError as error:
+            messages.error(request, str(error))
+            return redirect('register')
 
-        messages.info(request, f'Username {username} is successfully registered!')
+        messages.info(request, f'Username {user.username} is successfully registered!')
         return redirect('login')
 
 
@@ -294,7 +445,9 @@ class DressRentalByUserCreateView(LoginRequiredMixin, generic.CreateView):
             success_url (str): URL, į kurį nukreipiama po sėkmingo sukūrimo.
 
         Metodai:
-            get_form_kwargs(): Gauna suknelės ID ir perduoda jį formai.
+            get_dress(): Gauna suknelę su jos dydžiais pagal ID.
+            get(), post(): Nukreipia į suknelių sąrašą, jei suknelė nepasirinkta.
+            get_form_kwargs(): Perduoda suknelę formai.
             form_valid(): Nustato prisijungusį vartotoją ir nuomos statusą.
     """
     model = DressRental
@@ -302,15 +455,34 @@ class DressRentalByUserCreateView(LoginRequiredMixin, generic.CreateView):
     template_name = 'user_dress_form_create.html'
     success_url = '/dresscode/mydresses'
 
-    def get_form_kwargs(self):
-        """Gauna suknelės ID ir perduoda jį formai,
-        kad būtų iš anksto užpildyta suknelės informacija."""
+    def get_dress(self):
+        """Gauna suknelės ID iš URL arba užklausos parametro ir grąžina suknelę
+        su iš anksto įkeltais dydžiais (dviem užklausomis). Jei suknelės nėra, grąžina None."""
+        if not hasattr(self, 'dress'):
+            dress_id = str(self.kwargs.get('pk') or self.request.GET.get('dress_id') or '')
+            self.dress = None
+            if dress_id.isdigit():
+                self.dress = Dress.objects.prefetch_related('sizes').filter(id=dress_id).first()
+        return self.dress
+
+    def get(self, request, *args, **kwargs):
+        """Nuomos forma rodoma tik pasirinktai suknelei, todėl visas katalogas formoje niekada nerodomas."""
+        if self.get_dress() is None:
+            messages.info(request, 'Choose a dress to rent first.')
+            return redirect('dresses-all')
+        return super().get(request, *args, **kwargs)
 
+    def post(self, request, *args, **kwargs):
+        if self.get_dress() is None:
+            return redirect('dresses-all')
+        return super().post(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        """Perduoda suknelę formai, kad būtų iš anksto užpildyta suknelės informacija
+        ir dydžių pasirinkimai."""
         kwargs = super().get_form_kwargs()  # Iškviečia get_form_kwargs() iš tėvinės klasės CreateView
-        dress_id = self.kwargs.get('pk') or self.request.GET.get('dress_id')  # Bandome gauti suknelės ID
-        if dress_id:  # Tikrinam, ar gautas dress_id nėra None
-            kwargs['dress'] = Dress.objects.prefetch_related('sizes').get(id=dress_id)  # Gaunam suknelės dress_id
-        return kwargs  # Grąžina kwargs su papildomu 'dress' rakto įrašu
+        kwargs['dress'] = self.get_dress()
+        return kwargs
 
     def form_valid(self, form):
         """Nustato prisijungusį vartotoją, taip pat nustato
@@ -331,6 +503,8 @@ class DressRentalByUserUpdateView(LoginRequiredMixin, UserPassesTestMixin, gener
             success_url (str): URL, į kurį nukreipiama po sėkmingo atnaujinimo.
 
         Metodai:
+            get_queryset(): Nuomos įrašas įkeliamas kartu su suknele.
+            get_object(): Įsimena nuomos įrašą, kad jis nebūtų įkeliamas kelis kartus.
             form_valid(): Nustato prisijungusį vartotoją ir nuomos statusą.
             test_func(): Tikrina, ar vartotojas yra nuomos įrašo savininkas.
     """
@@ -339,6 +513,16 @@ class DressRentalByUserUpdateView(LoginRequiredMixin, UserPassesTestMixin, gener
     template_name = 'user_dress_form_update.html'
     success_url = '/dresscode/mydresses'
 
+    def get_queryset(self):
+        """Nuomos įrašas įkeliamas kartu su suknele, kurią rodo forma."""
+        return DressRental.objects.select_related('dress')
+
+    def get_object(self, queryset=None):
+        """Įsimena nuomos įrašą: jį naudoja ir test_func(), ir formos atvaizdavimas."""
+        if not hasattr(self, '_object'):
+            self._object = super().get_object(queryset)
+        return self._object
+
     def form_valid(self, form):
         """Nustato prisijungusį vartotoją ir nuomos statusą 'pending' atnaujinant suknelės įrašą."""
         form.instance.user = self.request.user
@@ -349,7 +533,36 @@ class DressRentalByUserUpdateView(LoginRequiredMixin, UserPassesTestMixin, gener
         """Tikrina, ar prisijungęs vartotojas yra suknelės nuomos įrašo savininkas,
         kad leistų jam redaguoti."""
         dressrental_object = self.get_object()
-        return dressrental_object.user == self.request.user
+        return dressrental_object.user_id == self.request.user.id
+
+
+@login_required
+@require_GET
+def dress_availability(request, pk):
+    """
+        Grąžina JSON su nuomos duomenų patikra, kad forma galėtų parodyti klaidas prieš pateikiant.
+
+        Funkcijos logika:
+            1. Gaunama suknelė su dydžiais ir užklausos parametrai (size, start_date, return_date, rental).
+               Redaguojama nuoma (rental) įkeliama tik jei ji priklauso vartotojui.
+            2. Tikrinama ta pačia funkcija kaip ir nuomos formoje (validate_rental).
+            3. Grąžinamas {'available': bool, 'errors': {laukas: pranešimas}}.
+    """
+    dress = get_object_or_404(Dress.objects.prefetch_related('sizes'), pk=pk)
+    size_id = request.GET.get('size', '')
+    rental_id = request.GET.get('rental', '')
+    try:
+        start_date = parse_date(request.GET.get('start_date', '')) if request.GET.get('start_date') else None
+        return_date = parse_date(request.GET.get('return_date', '')) if request.GET.get('return_date') else None
+    except ValueError:
+        return JsonResponse({'available': False, 'errors': {'__all__': 'Enter a valid date.'}}, status=400)
+    rental = None
+    if rental_id.isdigit():
+        rental = DressRental.objects.filter(pk=rental_id, user=request.user).only('size_id').first()
+    errors = validate_rental(dress, int(size_id) if size_id.isdigit() else None, start_date, return_date,
+                             rental_id=rental.pk if rental else None,
+                             current_size_id=rental.size_id if rental else None)
+    return JsonResponse({'available': not errors, 'errors': errors})
 
 
 class DressReviewDeleteView(LoginRequiredMixin, UserPassesTestMixin, generic.DeleteView):
@@ -455,7 +668,8 @@ class DressRentalUpdateView(LoginRequiredMixin, UserPassesTestMixin, generic.Upd
 
         Metodai:
             test_func(): Tikrina, ar vartotojas priklauso 'moderators' grupei.
-            form_valid(): Nukreipia atgal į nuomų įrašų puslapį po įrašo atnaujinimo.
+            form_valid(): Išsaugo statusą, įrašo pranešimą vartotojui į laiškų eilę
+                          ir nukreipia atgal į nuomų įrašų puslapį.
     """
     model = DressRental
     fields = ['status']
@@ -471,6 +685,13 @@ class DressRentalUpdateView(LoginRequiredMixin, UserPassesTestMixin, generic.Upd
         return check
 
     def form_valid(self, form):
-        """Nukreipia atgal į nuomų įrašų puslapį po įrašo atnaujinimo"""
-        form.save()
+        """Išsaugo naują statusą ir toje pačioje transakcijoje įrašo pranešimą vartotojui
+        į siunčiamų laiškų eilę. Nukreipia atgal į nuomų įrašų puslapį po įrašo atnaujinimo"""
+        with transaction.atomic():
+            dressrental = form.save()
+            if 'status' in form.changed_data and dressrental.user and dressrental.user.email:
+                context = {'dressrental': dressrental, 'user': dressrental.user}
+                send_mail(subject=render_to_string('emails/rental_status_subject.txt', context).strip(),
+                          message=render_to_string('emails/rental_status.txt', context),
+                          from_email=None, recipient_list=[dressrental.user.email])
         return redirect('allrents')
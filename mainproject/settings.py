@@ -10,8 +10,31 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
-from .secret import SECRET_KEY, EMAIL, EMAIL_PASSWORD, HOST
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from . import secret
+except ImportError:
+    secret = None
+
+
+def env(name, fallback=None, default=None):
+    """Reads a setting from the environment, then from the local mainproject/secret.py."""
+    if name in os.environ:
+        return os.environ[name]
+    return getattr(secret, fallback or name, default)
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,11 +42,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = env('DJANGO_SECRET_KEY', 'SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY or create mainproject/secret.py.')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # Application definition
@@ -43,21 +70,53 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dresscode.middleware.AdmissionControlMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'dresscode.middleware.RateLimitMiddleware',
+    'dresscode.middleware.PrerenderedPageMiddleware',
+    'dresscode.middleware.TemplateProfilingMiddleware',
 ]
 
+# Per-URL rate limits are defined in dresscode/urls.py (ratelimits). Buckets live in RATELIMIT_CACHE,
+# which has to be shared by all workers (see CACHES below). Behind a reverse proxy set
+# DJANGO_RATELIMIT_IP_HEADER=HTTP_X_FORWARDED_FOR and DJANGO_RATELIMIT_TRUSTED_PROXIES to the number of
+# proxies that append to it: the client address is the one added by the outermost trusted proxy, since
+# everything to its left is supplied by the client and can be forged.
+RATELIMIT_ENABLED = env_bool('DJANGO_RATELIMIT_ENABLED', True)
+RATELIMIT_CACHE = 'default'
+RATELIMIT_IP_HEADER = os.environ.get('DJANGO_RATELIMIT_IP_HEADER', 'REMOTE_ADDR')
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('DJANGO_RATELIMIT_TRUSTED_PROXIES', 1))
+
+# Per-process concurrency limits with bounded wait queues for groups of views are defined in dresscode/urls.py
+# (admission_pools). Requests that cannot get a slot in time get a fast 503 with Retry-After.
+ADMISSION_ENABLED = env_bool('DJANGO_ADMISSION_ENABLED', True)
+
+# Catalog pages (views decorated with dresscode.views.public_page) are the same for every user, the
+# personal parts are fetched from /dresscode/fragments/. Shared caches may keep them for this many seconds
+# (s-maxage); browsers get max-age=0 and revalidate, so users see their own changes right away.
+PUBLIC_PAGE_MAX_AGE = 60
+
+# Public catalog pages are written to PRERENDER_ROOT as static HTML by `manage.py prerender` and served
+# by PrerenderedPageMiddleware (or directly by the front server). Signals remove the
+# pages affected by a change and re-render them in a background thread when PRERENDER_IN_BACKGROUND.
+# Off in development so template edits show up immediately.
+PRERENDER_ENABLED = env_bool('DJANGO_PRERENDER_ENABLED', not DEBUG)
+PRERENDER_ROOT = Path(os.environ.get('DJANGO_PRERENDER_ROOT', BASE_DIR / 'prerendered'))
+PRERENDER_IN_BACKGROUND = env_bool('DJANGO_PRERENDER_IN_BACKGROUND', True)
+
 ROOT_URLCONF = 'mainproject.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -65,24 +124,110 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory in every environment.
+            # runserver still picks up edited templates, its autoreloader resets this cache.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Report per-template render times in the Server-Timing header (see dresscode.middleware).
+TEMPLATE_PROFILING = DEBUG
+
 WSGI_APPLICATION = 'mainproject.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite (default) uses a busy timeout. With several worker processes on one node set DJANGO_SQLITE_WAL=1:
+# connections then switch the file to WAL mode, so readers never block the writer (see
+# dresscode.signals.configure_sqlite). WAL is stored in the database file itself and leaves -wal/-shm
+# files next to it, so it is off by default and the checked-in development database stays untouched.
+# For several nodes use PostgreSQL:
+# DJANGO_DB_ENGINE=postgresql plus DJANGO_DB_NAME/USER/PASSWORD/HOST/PORT (requires psycopg).
+
+if os.environ.get('DJANGO_DB_ENGINE', 'sqlite3') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'dresscode'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': env('DJANGO_DB_PASSWORD', default=''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
+    }
+
+SQLITE_WAL = env_bool('DJANGO_SQLITE_WAL', False)
+
+# `manage.py maintain_db` writes online SQLite backups here (keep it off the database's disk if possible).
+DB_BACKUP_DIR = Path(os.environ.get('DJANGO_DB_BACKUP_DIR', BASE_DIR / 'backups'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Version stamps (dresscode.versions) and fragments must be shared by all workers, so with more
+# than one process use a shared backend: DJANGO_CACHE_BACKEND=redis (DJANGO_CACHE_LOCATION=redis://...),
+# file (a directory shared by the workers) or db (run `manage.py createcachetable`).
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': '',
+    'file': str(BASE_DIR / 'cache'),
+    'db': 'dresscode_cache',
+    'redis': 'redis://127.0.0.1:6379',
+    'memcached': '127.0.0.1:11211',
+}
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]),
+        'TIMEOUT': 3600,
     }
 }
 
 
+# Upper bound on the in-memory search autocomplete index (dresscode.autocomplete), in entries.
+AUTOCOMPLETE_MAX_ENTRIES = 200000
+
+# Two dress photos are reported as near-duplicates when both their pHash and dHash (64 bits each,
+# dresscode.photohash) differ in at most this many bits. Resized or recompressed copies differ in 0-6.
+PHOTO_HASH_MAX_DISTANCE = 10
+
+
+# Sessions and messages are kept in signed cookies, so any worker can serve any request.
+
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+SESSION_COOKIE_HTTPONLY = True
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -101,6 +246,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# Argon2 is preferred when argon2-cffi is installed; older hashes are upgraded on login.
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, 'dresscode.hashers.TunedArgon2PasswordHasher')
+
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 19456  # KiB
+PASSWORD_ARGON2_PARALLELISM = 1
+
+# Maximum number of password hashes computed at the same time
+PASSWORD_HASHING_WORKERS = os.cpu_count() or 1
+
+AUTHENTICATION_BACKENDS = ['dresscode.hashers.PooledModelBackend']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -119,7 +284,8 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-MEDIA_ROOT = Path(BASE_DIR, 'dresscode/media')
+# With several nodes, point DJANGO_MEDIA_ROOT at a directory all of them mount (e.g. NFS).
+MEDIA_ROOT = Path(os.environ.get('DJANGO_MEDIA_ROOT', BASE_DIR / 'dresscode/media'))
 MEDIA_URL = '/media/'
 
 # Default primary key field type
@@ -130,14 +296,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-
-EMAIL_HOST = HOST
-EMAIL_PORT = 587
-EMAIL_USE_TLS = False
-EMAIL_HOST_USER = EMAIL
-EMAIL_HOST_PASSWORD = EMAIL_PASSWORD
-DEFAULT_FROM_EMAIL = EMAIL
+# Emails are queued in the OutboundEmail table and delivered by `manage.py send_outbox`
+# through OUTBOX_EMAIL_BACKEND, so requests never wait for the mail server.
+EMAIL_BACKEND = 'dresscode.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_RETRY_DELAY_MAX = 3600
+# A batch claimed by send_outbox is handed to another sender if it is not finished within this many seconds.
+OUTBOX_CLAIM_TIMEOUT = 600
+
+EMAIL_HOST = env('EMAIL_HOST', 'HOST', 'localhost')
+EMAIL_PORT = int(env('EMAIL_PORT', default=587))
+EMAIL_USE_TLS = env_bool('EMAIL_USE_TLS', False)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', 'EMAIL', '')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', 'EMAIL_PASSWORD', '')
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', 'EMAIL', 'webmaster@localhost')
 
 
 TINYMCE_DEFAULT_CONFIG = {
@@ -3,10 +3,16 @@ WSGI config for mainproject project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+For fork-based servers the module can also warm up the process before workers are
+forked, see ``preload()``. It is opt-in: set DJANGO_PRELOAD=1 together with a server
+that imports the application once in the parent (e.g. ``gunicorn --preload``). Without
+a pre-fork import it would only slow down every worker's start.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +20,39 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mainproject.settings')
 
 application = get_wsgi_application()
+
+
+def preload():
+    """Loads what every worker needs once, in the parent process, so forked workers share it.
+
+    URL patterns, compiled templates and lazily imported libraries (Pillow) are loaded here.
+    Database connections are closed so that no worker inherits the parent's socket, and the
+    remaining objects are moved out of the garbage collector's reach (gc.freeze) so that
+    collections in the workers do not write to, and copy, the shared memory pages.
+    """
+    from django.db import connections
+    from django.template import TemplateSyntaxError, engines
+    from django.template.loaders.app_directories import get_app_template_dirs
+    from django.urls import get_resolver
+
+    import PIL.Image  # noqa: F401
+
+    get_resolver().url_patterns
+    for engine in engines.all():
+        for template_dir in (*engine.dirs, *get_app_template_dirs('templates')):
+            for root, _, files in os.walk(template_dir):
+                for name in files:
+                    if not name.endswith(('.html', '.txt')):
+                        continue
+                    try:
+                        engine.get_template(os.path.relpath(os.path.join(root, name), template_dir))
+                    except TemplateSyntaxError:
+                        pass  # Reported when the template is actually used.
+
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+if os.environ.get('DJANGO_PRELOAD', '0') == '1':
+    preload()